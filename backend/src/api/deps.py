@@ -1,5 +1,5 @@
-from typing import Type, TypeVar, Generic, List
-from fastapi import APIRouter, Depends, HTTPException, Body
+from typing import Type, TypeVar, Generic, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Body, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from src.crud.base import CRUDBase
@@ -11,6 +11,9 @@ ModelType = TypeVar("ModelType", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)  # 用于创建的 Pydantic 模型
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)  # 用于更新的 Pydantic 模型
 
+# 列表接口通过该响应头返回下一页的游标
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 class CRUDRouter(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     通用异步 CRUD 路由类
@@ -69,9 +72,31 @@ class CRUDRouter(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         
         return await self.crud.remove(db=db, id=item_id)
 
-    async def read_items(self, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+    async def read_items(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        db: AsyncSession = Depends(get_db),
+        *,
+        cursor: Optional[str] = None,
+        order_by: str = "id",
+        descending: bool = False,
+        response: Optional[Response] = None,
+    ):
         """
-        获取项目列表
+        获取项目列表，有下一页时在响应头 X-Next-Cursor 中返回其游标
         """
-        items = await self.crud.get_multi(db=db, skip=skip, limit=limit)
+        try:
+            items, next_cursor = await self.crud.get_page(
+                db=db,
+                cursor=cursor,
+                skip=skip,
+                limit=limit,
+                order_by=order_by,
+                descending=descending,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if next_cursor and response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return items
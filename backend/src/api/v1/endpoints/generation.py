@@ -2,11 +2,17 @@
 Endpoints for prompt and keywords generation route
 """
 
-from typing import Optional
+import json
+from typing import AsyncIterator, Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from src.services.gpt_service import gpt_service
-from src.utils.image_utils import process_image
-from src.schemas.generation import PromptGenerationResponse, KeywordGenerationResponse
+from src.services.image_preprocess_service import image_preprocess_service
+from src.schemas.generation import (
+    PromptGenerationResponse,
+    KeywordGenerationResponse,
+    ImageAnalysisResponse,
+)
 
 router = APIRouter()
 router.description = (
@@ -23,19 +29,63 @@ async def generate_prompt(
     description: str = Form(...),
     image: Optional[UploadFile] = File(None),
     image_url: Optional[str] = Form(None),
+    use_cache: bool = Form(True),
+    stream: bool = Form(False),
 ):
     """
     Generate a prompt based on description and optional image input.
+    Set use_cache to false to force a fresh completion, e.g. when regenerating.
+    Set stream to true to receive the prompt as Server-Sent Events while it is generated.
     """
     try:
-        image_base64 = await process_image(image) if image else None
-        output = gpt_service.create_prompt(description, image_base64, image_url)
+        image_base64 = await image_preprocess_service.process_upload(image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if stream:
+        try:
+            # Validate the input while a proper error status can still be sent
+            deltas = await gpt_service.stream_prompt(
+                description, image_base64, image_url, use_cache=use_cache
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        except Exception as e:
+            print(f"Error in generate_prompt: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e)) from e
+        return StreamingResponse(
+            _prompt_events(deltas),
+            media_type="text/event-stream",
+            # Keep proxies such as nginx from buffering the events
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    try:
+        output = await gpt_service.create_prompt(
+            description, image_base64, image_url, use_cache=use_cache
+        )
         return PromptGenerationResponse(generated_prompt=output)
     except Exception as e:
         print(f"Error in generate_prompt: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+async def _prompt_events(deltas: AsyncIterator[str]):
+    """
+    Relay prompt tokens as SSE: delta events while generating, then a done event
+    with the full prompt, or an error event if the completion fails midway.
+    """
+    parts = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+        done = PromptGenerationResponse(generated_prompt="".join(parts))
+        yield f"event: done\ndata: {done.model_dump_json()}\n\n"
+    except Exception as e:
+        # Headers are already sent, so the failure has to travel in the stream
+        print(f"Error in generate_prompt stream: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+
 @router.post(
     "/keywords/",
     response_model=KeywordGenerationResponse,
@@ -44,15 +94,54 @@ async def generate_prompt(
 async def generate_keywords(
     image: Optional[UploadFile] = File(None),
     image_url: Optional[str] = Form(None),
+    use_cache: bool = Form(True),
 ):
     """
     Extract keywords from provided image.
+    Set use_cache to false to force a fresh completion.
     """
     try:
-        image_base64 = await process_image(image) if image else None
-        keywords = gpt_service.extract_keywords(image_base64, image_url)
+        image_base64 = await image_preprocess_service.process_upload(image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    try:
+        keywords = await gpt_service.extract_keywords(
+            image_base64, image_url, use_cache=use_cache
+        )
         return KeywordGenerationResponse(keywords=keywords)
 
     except Exception as e:
         print(f"Error in extract_keywords: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@router.post(
+    "/analyze/",
+    response_model=ImageAnalysisResponse,
+    summary="Generate Prompt and Extract Keywords from one reference Image",
+)
+async def analyze_image(
+    description: str = Form(""),
+    image: Optional[UploadFile] = File(None),
+    image_url: Optional[str] = Form(None),
+    use_cache: bool = Form(True),
+):
+    """
+    Generate a prompt and extract keywords from the same image in one vision call,
+    replacing separate calls to /prompt/ and /keywords/ with the same image.
+    Set use_cache to false to force a fresh completion.
+    """
+    try:
+        image_base64 = await image_preprocess_service.process_upload(image)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if not (image_base64 or image_url):
+        raise HTTPException(status_code=400, detail="An image or image_url is required")
+    try:
+        analysis = await gpt_service.analyze_image(
+            description, image_base64, image_url, use_cache=use_cache
+        )
+        return ImageAnalysisResponse(**analysis)
+    except Exception as e:
+        print(f"Error in analyze_image: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e)) from e
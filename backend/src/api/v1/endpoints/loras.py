@@ -0,0 +1,120 @@
+"""
+Endpoints for the LoRA registry
+Inherent from CRUD router
+"""
+
+from typing import List, Optional
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.lora import lora as lora_crud
+from src.schemas.lora import Lora as LoraSchema, LoraBase, LoraUpdate, LoraPage
+from src.services.lora_registry_service import lora_registry_service
+from src.api.deps import CRUDRouter, get_db
+
+# Use CRUDRouter to create basic CRUD routes
+lora_router = CRUDRouter[LoraSchema, LoraBase, LoraUpdate](lora_crud)
+router = lora_router.router
+
+# Add route description
+router.description = (
+    "LoRA Registry API, "
+    "providing functions for searching LoRAs and editing their generation metadata"
+)
+
+
+@router.get("/", response_model=LoraPage, summary="Search LoRAs")
+async def read_loras(
+    q: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    available: Optional[bool] = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get one page of LoRAs ordered by name
+
+    - **q**: Part of the LoRA name, case-insensitive
+    - **tag**: Only LoRAs with this tag, repeat to require several tags
+    - **available**: true for LoRAs ComfyUI still lists, false for removed ones, omit for all
+    - **skip**, **limit**: Pagination, at most 200 LoRAs per page
+
+    Returns the page and the total number of matching LoRAs.
+    """
+    try:
+        items, total = await lora_crud.search(
+            db, q=q, tags=tag, available=available, skip=skip, limit=limit
+        )
+        return LoraPage(
+            items=[LoraSchema.model_validate(item) for item in items],
+            total=total,
+            skip=skip,
+            limit=limit,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to get LoRA list: {str(e)}"
+        ) from e
+
+
+@router.post("/sync", summary="Sync LoRAs with ComfyUI")
+async def sync_loras():
+    """
+    Reconcile the registry with the ComfyUI LoRA list now instead of waiting
+    for the background reconciler.
+
+    Returns the number of LoRAs added and of LoRAs whose availability changed.
+    """
+    try:
+        added, changed = await lora_registry_service.reconcile()
+        return {"added": added, "availability_changed": changed}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to sync LoRAs: {str(e)}"
+        ) from e
+
+
+@router.get("/{item_id}", response_model=LoraSchema, summary="Read a Single LoRA")
+async def read_lora(item_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Get LoRA by ID
+
+    - **item_id**: The ID of the LoRA to retrieve
+
+    Returns the LoRA information if found, otherwise returns a 404 error.
+    """
+    try:
+        return await lora_router.read_item(item_id, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to find LoRA: {str(e)}"
+        ) from e
+
+
+@router.put("/{item_id}", response_model=LoraSchema, summary="Update LoRA Metadata")
+async def update_lora(
+    item_id: int, item_in: LoraUpdate, db: AsyncSession = Depends(get_db)
+):
+    """
+    Update LoRA metadata
+
+    All fields are optional:
+    - **trigger_words**: Comma separated words added to prompts using the LoRA
+    - **clip_skip**: CLIP skip to render with
+    - **base_strength**: Default strength offered by the style picker
+    - **description**: Free text description
+    - **tags**: Tags to filter by
+    """
+    try:
+        lora = await lora_router.update_item(item_id, item_in, db)
+        lora_registry_service.update_entry(lora)
+        return lora
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update LoRA: {str(e)}"
+        ) from e
@@ -0,0 +1,105 @@
+"""
+Endpoints for runtime metrics
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.services.gpt_service import gpt_service
+from src.services.llm_cache_service import llm_cache_service
+from src.services.image_preprocess_service import image_preprocess_service
+from src.services.llm_usage_service import llm_usage_service, GROUP_COLUMNS
+from src.db.instrumentation import query_metrics
+from src.db.session import get_pool_metrics, get_db
+from src.api.v1.endpoints.auth import get_current_user
+from src.crud.team import team_member as team_member_crud
+from src.models.user import User
+from src.schemas.usage import UsageRollupResponse
+
+router = APIRouter()
+router.description = "Metrics API, providing runtime metrics of the LLM integration and the database"
+
+
+async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+    """Only let superusers read the runtime metrics."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only superusers can read metrics")
+    return current_user
+
+
+@router.get("/llm", summary="LLM Call Metrics")
+async def get_llm_metrics(current_user: User = Depends(get_current_superuser)):
+    """
+    Return metrics of the LLM cache, request coalescing, routing, usage accounting
+    and image pre-processing.
+
+    This endpoint requires superuser privileges.
+    """
+    return {
+        "cache": llm_cache_service.get_metrics(),
+        "coalescing": gpt_service.singleflight.get_metrics(),
+        "routing": gpt_service.router.get_metrics(),
+        "usage": llm_usage_service.get_metrics(),
+        "image_preprocess": image_preprocess_service.get_metrics(),
+    }
+
+
+@router.get("/db", summary="Database Query Metrics")
+async def get_db_metrics(top: int = 20, current_user: User = Depends(get_current_superuser)):
+    """
+    Return the connection pool state and query latency histograms.
+
+    - **top**: Number of statements to list, by total time spent
+
+    This endpoint requires superuser privileges.
+    """
+    return {"pool": get_pool_metrics(), "queries": query_metrics.get_metrics(top=top)}
+
+
+@router.get("/llm/usage", response_model=UsageRollupResponse, summary="LLM Token Usage Rollup")
+async def get_llm_usage(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: str = "team",
+    team_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Sum LLM token usage, latency and estimated cost per day.
+
+    - **start**, **end**: Inclusive UTC day range, defaults to the last 7 days
+    - **group_by**: team, user, endpoint, backend or model
+    - **team_id**: Only count calls made for this team (sent as the X-Team-Id header)
+
+    Superusers can read every team's usage; other users must pass the ID of a
+    team they are a member of.
+    """
+    if group_by not in GROUP_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by must be one of {', '.join(GROUP_COLUMNS)}",
+        )
+    if not current_user.is_superuser:
+        member = (
+            await team_member_crud.get_by_team_and_user(
+                db, team_id=team_id, user_id=current_user.id
+            )
+            if team_id is not None
+            else None
+        )
+        if member is None:
+            raise HTTPException(
+                status_code=403,
+                detail="Only members of the team or superusers can read its usage",
+            )
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=6)
+    try:
+        rows = await llm_usage_service.rollup(start, end, group_by, team_id)
+        return UsageRollupResponse(
+            group_by=group_by, start=start, end=end, team_id=team_id, rows=rows
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
@@ -3,8 +3,8 @@ Endpoints for prompt route
 Inherent from CRUD router
 """
 
-from typing import List
-from fastapi import Depends, HTTPException
+from typing import List, Optional
+from fastapi import Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.crud.prompt import prompt as prompt_crud
@@ -106,21 +106,41 @@ async def delete_prompt(item_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.get("/", response_model=List[PromptSchema], summary="Read Prompt List")
 async def read_prompts(
-    skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Get list of prompts
 
-    - **skip**: Number of prompts to skip (pagination)
+    - **cursor**: Cursor of the next page, from the X-Next-Cursor header of the previous page
     - **limit**: Maximum number of prompts to return (pagination)
+    - **order_by**: Sort by id or created_at
+    - **descending**: Newest first
+    - **skip**: Number of prompts to skip, only used without a cursor (deprecated)
 
-    Returns a list of prompts, paginated according to skip and limit parameters.
+    Returns a list of prompts. When more prompts follow, the X-Next-Cursor
+    response header holds the cursor of the next page.
     """
     try:
         # Get list of ORM objects
-        prompts = await prompt_router.read_items(skip=skip, limit=limit, db=db)
+        prompts = await prompt_router.read_items(
+            skip=skip,
+            limit=limit,
+            db=db,
+            cursor=cursor,
+            order_by=order_by,
+            descending=descending,
+            response=response,
+        )
         prompts = [PromptSchema.model_validate(prompt) for prompt in prompts]
         return prompts
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to get prompt list: {str(e)}"
@@ -2,16 +2,12 @@
 Endpoint for getting styles
 """
 
-from fastapi import APIRouter, HTTPException
-import requests
-import os
-from dotenv import load_dotenv
-from src.services.file_service import file_service
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Response
+from src.services.art_style_service import art_style_service
+from src.services.lora_catalog_service import lora_catalog_service
 
 
-load_dotenv(override=False)
-LORA_URL = os.getenv("LORA_URL")
-
 router = APIRouter()
 router.description = (
     "Retrive styles API, "
@@ -20,19 +16,27 @@ router.description = (
 
 
 @router.get("/")
-async def get_styles():
-    """Method to get Lora and Art styles."""
+async def get_styles(response: Response, if_none_match: Optional[str] = Header(None)):
+    """
+    Method to get Lora and Art styles.
+    The LoRA list is served from a cached copy; catalogAge tells how many seconds
+    ago ComfyUI last confirmed it. Send the ETag back as If-None-Match to get a
+    304 while neither catalog changed.
+    """
     try:
-        response = requests.get(LORA_URL)
-        loras = response.json()
-        lora_styles = [
-            {"id": lora, "name": lora, "styleType": "lora"} for lora in loras
-        ]
-        if response.status_code != 200:
-            raise ConnectionError("Could not connect to ComfyUI server")
-
-        art_styles = file_service.read_art_file()
-        return {"loraStyles": lora_styles, "artStyles": art_styles}
+        lora_styles = await lora_catalog_service.get_styles()
+        art_styles = art_style_service.get_styles()
     except Exception as e:
         print(f"Error fetching styles: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+    etag = f'"{lora_catalog_service.etag}-{art_style_service.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {
+        "loraStyles": lora_styles,
+        "artStyles": art_styles,
+        "catalogAge": round(lora_catalog_service.age, 1),
+    }
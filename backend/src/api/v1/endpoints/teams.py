@@ -3,14 +3,14 @@ Endpoints for team routes
 Inherent from CRUD router
 '''
 from typing import List, Optional
-from fastapi import Depends, HTTPException, Path, Body, status
+from fastapi import Depends, HTTPException, Path, Body, Query, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.crud.team import team as team_crud, team_member as team_member_crud
 from src.schemas.team import Team as TeamSchema, TeamCreate, TeamUpdate
 from src.schemas.team import TeamMember as TeamMemberSchema, TeamMemberCreate, TeamMemberUpdate
-from src.api.deps import CRUDRouter, get_db
+from src.api.deps import CRUDRouter, get_db, NEXT_CURSOR_HEADER
 from src.models.user import User
 from src.api.v1.endpoints.auth import get_current_user
 from src.utils.permission import check_team_permission
@@ -170,18 +170,40 @@ async def delete_team(
         ) from e
 
 @router.get("/", response_model=List[TeamSchema], summary="Read Team List")
-async def read_teams(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_teams(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get list of teams
     
-    - **skip**: Number of teams to skip (pagination)
+    - **cursor**: Cursor of the next page, from the X-Next-Cursor header of the previous page
     - **limit**: Maximum number of teams to return (pagination)
+    - **order_by**: Sort by id or created_at
+    - **descending**: Newest first
+    - **skip**: Number of teams to skip, only used without a cursor (deprecated)
     
-    Returns a list of teams, paginated according to skip and limit parameters.
+    Returns a list of teams. When more teams follow, the X-Next-Cursor
+    response header holds the cursor of the next page.
     """
     try:
-        teams = await team_router.read_items(skip=skip, limit=limit, db=db)
+        teams = await team_router.read_items(
+            skip=skip,
+            limit=limit,
+            db=db,
+            cursor=cursor,
+            order_by=order_by,
+            descending=descending,
+            response=response,
+        )
         return teams
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -246,19 +268,23 @@ async def add_team_member(
 
 @router.get("/{team_id}/members", response_model=List[TeamMemberSchema], summary="Get Team Members")
 async def get_team_members(
+    response: Response,
     team_id: int = Path(..., description="The ID of the team"),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get all members of a team
     
     - **team_id**: The ID of the team
-    - **skip**: Number of members to skip (pagination)
+    - **cursor**: Cursor of the next page, from the X-Next-Cursor header of the previous page
     - **limit**: Maximum number of members to return (pagination)
+    - **skip**: Number of members to skip, only used without a cursor (deprecated)
     
-    Returns a list of team members, paginated according to skip and limit parameters.
+    Returns a list of team members ordered by when they were added. When more
+    members follow, the X-Next-Cursor response header holds the cursor of the next page.
     """
     try:
         # Check if team exists
@@ -270,9 +296,14 @@ async def get_team_members(
             )
         
         # Get team members
-        team_members = await team_member_crud.get_team_members(
-            db, team_id=team_id, skip=skip, limit=limit
-        )
+        try:
+            team_members, next_cursor = await team_member_crud.get_team_members(
+                db, team_id=team_id, skip=skip, limit=limit, cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return team_members
     except HTTPException:
         raise
@@ -2,13 +2,17 @@
 Endpoint for generating templates
 """
 
-from typing import Optional
+from typing import List, Optional
 import os
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+import zipfile
+from io import BytesIO
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
 
-from src.services.file_service import file_service
-from src.services.image_service import image_service
+from src.services.image_service import image_service, OUTPUT_FORMATS, FORMAT_ALIASES, FIT_MODES
+from src.services.template_service import template_service, THUMBNAIL_FORMATS, THUMBNAIL_SIZES
+from src.schemas.template import TemplateListResponse
 
 router = APIRouter()
 router.description = (
@@ -17,17 +21,75 @@ router.description = (
 )
 
 
-@router.get("/psd-templates/")
-async def get_psd_templates():
-    """List available PSD templates."""
+@router.get("/psd-templates/", response_model=TemplateListResponse)
+async def get_psd_templates(
+    family: Optional[str] = None,
+    aspect: Optional[str] = None,
+):
+    """
+    List available PSD templates.
+
+    - **family**: Only return templates of this family, e.g. choices
+    - **aspect**: Only return templates with this aspect ratio, e.g. 16:9
+    """
     try:
-        templates = file_service.fetch_psd_templates()
-        return {"templates": templates}
+        templates = template_service.list_templates(family=family, aspect=aspect)
+        return TemplateListResponse(templates=templates)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
-from typing import List
+@router.get("/psd-templates/{template_name}/thumbnail")
+async def get_psd_template_thumbnail(
+    template_name: str,
+    request: Request,
+    size: int = 256,
+    format: str = "webp",
+):
+    """
+    Serve a downscaled preview of a template for the gallery.
+
+    - **size**: Longest edge in pixels, one of 64, 128, 256 or 512
+    - **format**: webp or png
+    """
+    # Checked before the ETag so an invalid request never gets a 304
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported thumbnail size {size}, "
+            f"expected one of {', '.join(map(str, THUMBNAIL_SIZES))}",
+        )
+    if format not in THUMBNAIL_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported thumbnail format '{format}', "
+            f"expected one of {', '.join(THUMBNAIL_FORMATS)}",
+        )
+
+    entry = template_service.get_template(template_name)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    etag = f'"{entry.stem}-{entry.mtime}-{size}-{format}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        # Rendering only happens on a cache miss but can take a while for large templates
+        thumb_path = await run_in_threadpool(
+            template_service.get_thumbnail, entry, size, format
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Thumbnail generation failed: {str(e)}"
+        ) from e
+
+    return FileResponse(
+        thumb_path, media_type=THUMBNAIL_FORMATS[format][1], headers=headers
+    )
 
 
 @router.post("/generate-template/")
@@ -35,11 +97,47 @@ async def generate_template(
     base_images: List[UploadFile] = File(...),
     template_image: Optional[UploadFile] = File(None),
     template_name: Optional[str] = Form(None),
+    output_format: str = Form("png"),
+    quality: Optional[int] = Form(None),
+    compress_level: Optional[int] = Form(None),
+    response_mode: str = Form("json"),
+    fit_mode: str = Form("stretch"),
 ):
     """
     Generate a list of composited template images and return as base64 strings.
-    Accepts multiple base images and either a template image upload or a template name (from fetch_psd_templates).
+    Accepts multiple base images and either a template image upload or a template name (from /psd-templates/).
+
+    - **output_format**: png, webp or jpeg (jpg is accepted too)
+    - **quality**: WebP/JPEG quality (1-100)
+    - **compress_level**: PNG compress level (0-9), lower is faster to encode
+    - **response_mode**: json for base64 data URIs, zip for a binary ZIP of the outputs
+    - **fit_mode**: how the base image is fitted to the template: stretch (default) resizes
+      the template to the base image, cover crops the base to the template, pad letterboxes
+      the base inside the template and fit letterboxes the template inside the base
     """
+    output_format = output_format.lower()
+    output_format = FORMAT_ALIASES.get(output_format, output_format)
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported output format, expected one of {', '.join(OUTPUT_FORMATS)}",
+        )
+    if quality is not None and not 1 <= quality <= 100:
+        raise HTTPException(status_code=400, detail="quality must be between 1 and 100")
+    if compress_level is not None and not 0 <= compress_level <= 9:
+        raise HTTPException(
+            status_code=400, detail="compress_level must be between 0 and 9"
+        )
+    if fit_mode not in FIT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported fit mode, expected one of {', '.join(FIT_MODES)}",
+        )
+    if response_mode not in ("json", "zip"):
+        raise HTTPException(
+            status_code=400, detail="response_mode must be either json or zip"
+        )
+
     try:
         # Get template image path
         if template_image:
@@ -50,20 +148,13 @@ async def generate_template(
             )
             with open(template_path, "wb") as f:
                 f.write(await template_image.read())
+            alpha_regions = None
         elif template_name:
-            templates = file_service.fetch_psd_templates()
-            match = next(
-                (
-                    t
-                    for t in templates
-                    if t["name"] == template_name
-                    or os.path.splitext(t["name"])[0] == template_name
-                ),
-                None,
-            )
+            match = template_service.get_template(template_name)
             if not match:
                 raise HTTPException(status_code=404, detail="Template not found")
-            template_path = match["path"]
+            template_path = match.path
+            alpha_regions = template_service.get_alpha_regions(match)
         else:
             raise HTTPException(
                 status_code=400, detail="No template image or name provided"
@@ -78,12 +169,60 @@ async def generate_template(
             )
             with open(base_path, "wb") as f:
                 f.write(await base_image.read())
-            img_b64 = image_service.layer_template_over_base(base_path, template_path)
-            result_images.append(
-                {"imageBase64": img_b64, "filename": base_image.filename}
+            # Decoding, compositing and encoding would block the event loop
+            encoded, mime_type = await run_in_threadpool(
+                image_service.render_template_over_base,
+                base_path,
+                template_path,
+                output_format,
+                quality,
+                compress_level,
+                fit_mode,
+                alpha_regions,
             )
-        return JSONResponse({"images": result_images})
+            result_images.append((base_image.filename, encoded, mime_type))
+
+        if response_mode == "zip":
+            return await run_in_threadpool(_zip_response, result_images, output_format)
+
+        return JSONResponse(
+            {
+                "images": [
+                    {
+                        "imageBase64": image_service.to_data_uri(encoded, mime_type),
+                        "filename": filename,
+                    }
+                    for filename, encoded, mime_type in result_images
+                ]
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Generation failed: {str(e)}"
         ) from e
+
+
+def _zip_response(result_images, output_format: str) -> StreamingResponse:
+    """Pack encoded images into a ZIP archive and stream it back."""
+    extension = OUTPUT_FORMATS[output_format][2]
+    buffer = BytesIO()
+    # Images are already compressed, so store them without deflating again
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        used_names = set()
+        for filename, encoded, _ in result_images:
+            stem = os.path.splitext(os.path.basename(filename or "image"))[0]
+            name = f"{stem}{extension}"
+            index = 1
+            while name in used_names:
+                name = f"{stem}_{index}{extension}"
+                index += 1
+            used_names.add(name)
+            archive.writestr(name, encoded)
+    buffer.seek(0)
+    return StreamingResponse(
+        buffer,
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="templates.zip"'},
+    )
@@ -2,8 +2,8 @@
 Endpoints for user rout
 Inherent from CRUD router
 '''
-from typing import List
-from fastapi import Depends, HTTPException
+from typing import List, Optional
+from fastapi import Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.crud.user import user as user_crud
@@ -88,21 +88,43 @@ async def delete_user(item_id: int, db: AsyncSession = Depends(get_db)):
         ) from e
 
 @router.get("/", response_model=List[UserSchema], summary="Read User List")
-async def read_users(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    descending: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get list of users
     
-    - **skip**: Number of users to skip (pagination)
+    - **cursor**: Cursor of the next page, from the X-Next-Cursor header of the previous page
     - **limit**: Maximum number of users to return (pagination)
+    - **order_by**: Sort by id or created_at
+    - **descending**: Newest first
+    - **skip**: Number of users to skip, only used without a cursor (deprecated)
     
-    Returns a list of users, paginated according to skip and limit parameters.
+    Returns a list of users. When more users follow, the X-Next-Cursor
+    response header holds the cursor of the next page.
     """
     try:
-        users = await user_router.read_items(skip=skip, limit=limit, db=db)
+        users = await user_router.read_items(
+            skip=skip,
+            limit=limit,
+            db=db,
+            cursor=cursor,
+            order_by=order_by,
+            descending=descending,
+            response=response,
+        )
         users = [UserSchema.model_validate(user) for user in users]
         return users
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to get user list: {str(e)+str(users)}"
+            detail=f"Failed to get user list: {str(e)}"
         ) from e
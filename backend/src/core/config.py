@@ -0,0 +1,25 @@
+"""Application configuration loaded from the environment"""
+
+import threading
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env() -> None:
+    """
+    Load .env files into os.environ once per process; real environment
+    variables always win. Modules call this before reading their settings
+    instead of each parsing the files again at import.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv, find_dotenv
+
+        # Nearest .env walking up from this package, e.g. the project root
+        load_dotenv(find_dotenv(), override=False)
+        _env_loaded = True
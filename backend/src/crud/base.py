@@ -1,7 +1,11 @@
-from typing import Generic, Type, TypeVar, Optional, List
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Generic, Type, TypeVar, Optional, List, Sequence, Tuple
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select, tuple_
 from src.db.base import Base
 
 # 定义模型类型和创建/更新模型类型
@@ -9,9 +13,55 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# 列表可用的排序方式，均以 id 结尾保证顺序唯一且稳定
+SORT_KEYS = {
+    "id": ("id",),
+    "created_at": ("created_at", "id"),
+}
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析，或与当前排序方式不匹配"""
+
+
+def encode_cursor(order_by: str, descending: bool, values: Sequence[Any]) -> str:
+    """
+    把最后一行的排序键编码为不透明的游标
+    """
+    payload = {
+        "o": order_by,
+        "d": descending,
+        "v": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, descending: bool) -> dict:
+    """
+    解析游标，返回其中的排序方式和排序键
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+    if not isinstance(payload, dict) or not isinstance(payload.get("v"), list):
+        raise InvalidCursorError("Invalid pagination cursor")
+    if payload.get("o") != order_by or payload.get("d") != descending:
+        raise InvalidCursorError("Pagination cursor was issued for a different sort order")
+    return payload
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        # 只提供模型中存在对应列的排序方式
+        self.sort_keys = {
+            name: columns
+            for name, columns in SORT_KEYS.items()
+            if all(hasattr(model, column) for column in columns)
+        }
 
     async def get(self, db: AsyncSession, id: int) -> Optional[ModelType]:
         """
@@ -23,12 +73,103 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             return db_obj
         return None
 
-    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[ModelType]:
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        *,
+        cursor: Optional[str] = None,
+        order_by: str = "id",
+        descending: bool = False,
+    ) -> List[ModelType]:
+        """
+        获取多个对象，按 order_by 稳定排序
+        """
+        items, _ = await self.get_page(
+            db, skip=skip, limit=limit, cursor=cursor, order_by=order_by, descending=descending
+        )
+        return items
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "id",
+        descending: bool = False,
+        filters: Sequence[Any] = (),
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        键集分页获取一页对象，返回对象列表和下一页的游标（没有下一页时为 None）
+
+        传入上一页返回的 cursor 时，从游标之后开始读取，借助 (排序列, id) 索引直接定位，
+        翻页深度不影响查询耗时；skip 仅为兼容旧的偏移分页保留，传入 cursor 时忽略。
+        """
+        if order_by not in self.sort_keys:
+            raise ValueError(f"order_by must be one of {', '.join(self.sort_keys)}")
+        columns = [getattr(self.model, name) for name in self.sort_keys[order_by]]
+
+        stmt = select(self.model).where(*filters)
+        if cursor:
+            payload = decode_cursor(cursor, order_by, descending)
+            values = payload["v"]
+            if len(values) != len(columns):
+                raise InvalidCursorError("Invalid pagination cursor")
+            try:
+                values = [
+                    datetime.fromisoformat(v)
+                    if v is not None and column.type.python_type is datetime
+                    else v
+                    for column, v in zip(columns, values)
+                ]
+            except (TypeError, ValueError) as e:
+                raise InvalidCursorError("Invalid pagination cursor") from e
+            stmt = stmt.where(self._after_cursor(columns, values, descending))
+        elif skip:
+            stmt = stmt.offset(skip)
+
+        # 多取一行用来判断是否还有下一页；NULL 排在所有值之后，与 PostgreSQL 默认一致，
+        # 正序和倒序都能直接扫描 (排序列, id) 索引
+        stmt = stmt.order_by(
+            *[
+                column.desc().nulls_first() if descending else column.asc().nulls_last()
+                for column in columns
+            ]
+        ).limit(limit + 1)
+        result = await db.execute(stmt)
+        items = list(result.scalars().all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(
+                order_by, descending, [getattr(last, name) for name in self.sort_keys[order_by]]
+            )
+        return items, next_cursor
+
+    @staticmethod
+    def _after_cursor(columns: Sequence[Any], values: Sequence[Any], descending: bool) -> Any:
         """
-        获取多个对象
+        游标之后各行的过滤条件，可为空的排序列（如 created_at）中 NULL 视为大于任何值
         """
-        result = await db.execute(select(self.model).offset(skip).limit(limit))
-        return result.scalars().all()
+        # 行值比较可以直接使用 (排序列, id) 复合索引
+        key = tuple_(*columns)
+        after = key < tuple_(*values) if descending else key > tuple_(*values)
+        first = columns[0]
+        if len(columns) == 1 or not first.nullable:
+            return after
+        # 行值比较遇到 NULL 结果为 NULL，所以 NULL 行要单独按 id 续读
+        rest = tuple_(*columns[1:])
+        rest_after = rest < tuple_(*values[1:]) if descending else rest > tuple_(*values[1:])
+        if values[0] is None:
+            if descending:
+                return or_(and_(first.is_(None), rest_after), first.isnot(None))
+            return and_(first.is_(None), rest_after)
+        return after if descending else or_(after, first.is_(None))
 
     async def create(self, db: AsyncSession, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = obj_in.model_dump()
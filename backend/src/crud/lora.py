@@ -0,0 +1,110 @@
+from typing import List, Optional, Tuple, Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
+from src.crud.base import CRUDBase
+from src.models.lora import Lora as LoraModel
+from src.schemas.lora import LoraBase, LoraUpdate
+
+class CRUDLora(CRUDBase[LoraModel, LoraBase, LoraUpdate]):
+    """
+    CRUD operations for the LoRA registry
+    """
+    async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[LoraModel]:
+        """
+        Get LoRA by its ComfyUI file name
+        """
+        result = await db.execute(select(LoraModel).filter(LoraModel.name == name))
+        return result.scalars().first()
+
+    async def search(
+        self,
+        db: AsyncSession,
+        *,
+        q: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        available: Optional[bool] = True,
+        skip: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[LoraModel], int]:
+        """
+        Get one page of LoRAs matching the filters, ordered by name, and the total count
+
+        Args:
+            db: Database session
+            q: Case-insensitive part of the name
+            tags: Only LoRAs carrying all of these tags
+            available: Filter on whether ComfyUI still lists the LoRA, None for all
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+        """
+        filters = []
+        if q:
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            filters.append(LoraModel.name.ilike(f"%{escaped}%", escape="\\"))
+        if tags:
+            filters.append(LoraModel.tags.contains(tags))
+        if available is not None:
+            filters.append(LoraModel.available == available)
+
+        total = await db.scalar(select(func.count()).select_from(LoraModel).filter(*filters))
+        result = await db.execute(
+            select(LoraModel)
+            .filter(*filters)
+            .order_by(LoraModel.name)
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all(), total
+
+    async def update(self, db: AsyncSession, db_obj: LoraModel, obj_in: LoraUpdate) -> LoraModel:
+        """
+        Update LoRA metadata and its updated_at time
+
+        Fields sent as null are skipped for columns that cannot be NULL, such as
+        tags, instead of failing the whole update
+        """
+        columns = LoraModel.__table__.columns
+        for field, value in obj_in.model_dump(exclude_unset=True).items():
+            if value is None and not columns[field].nullable:
+                continue
+            setattr(db_obj, field, value)
+        db_obj.updated_at = func.now()
+
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def sync_names(self, db: AsyncSession, *, names: Iterable[str]) -> Tuple[int, int]:
+        """
+        Insert LoRAs ComfyUI lists for the first time and flag the ones it no
+        longer lists as unavailable, keeping their metadata
+
+        Returns:
+            The number of LoRAs added and the number whose availability changed
+        """
+        names = sorted(set(names))
+        added = 0
+        if names:
+            result = await db.execute(
+                insert(LoraModel)
+                .values([{"name": name} for name in names])
+                .on_conflict_do_nothing(index_elements=[LoraModel.name])
+                .returning(LoraModel.id)
+            )
+            added = len(result.all())
+        changed = 0
+        for available, condition in (
+            (True, LoraModel.name.in_(names)),
+            (False, LoraModel.name.not_in(names)),
+        ):
+            result = await db.execute(
+                update(LoraModel)
+                .where(condition, LoraModel.available != available)
+                .values(available=available, updated_at=func.now())
+            )
+            changed += result.rowcount
+        await db.commit()
+        return added, changed
+
+lora = CRUDLora(LoraModel)
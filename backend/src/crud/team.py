@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Union, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from src.crud.base import CRUDBase
@@ -90,50 +90,64 @@ class CRUDTeamMember(CRUDBase[TeamMemberModel, TeamMemberCreate, TeamMemberUpdat
         return result.scalars().first()
     
     async def get_team_members(
-        self, db: AsyncSession, *, team_id: int, skip: int = 0, limit: int = 100
-    ) -> List[TeamMemberModel]:
+        self,
+        db: AsyncSession,
+        *,
+        team_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[TeamMemberModel], Optional[str]]:
         """
-        Get all members of a team
+        Get all members of a team, ordered by membership ID
         
         Args:
             db: Database session
             team_id: Team ID
-            skip: Number of records to skip
+            skip: Number of records to skip, ignored when a cursor is given
             limit: Maximum number of records to return
+            cursor: Cursor returned with the previous page
             
         Returns:
-            List of TeamMember objects
+            List of TeamMember objects and the cursor of the next page, if any
         """
-        result = await db.execute(
-            select(TeamMemberModel)
-            .filter(TeamMemberModel.team_id == team_id)
-            .offset(skip)
-            .limit(limit)
+        return await self.get_page(
+            db,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            filters=(TeamMemberModel.team_id == team_id,),
         )
-        return result.scalars().all()
     
     async def get_user_teams(
-        self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
-    ) -> List[TeamMemberModel]:
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[TeamMemberModel], Optional[str]]:
         """
-        Get all teams a user is a member of
+        Get all teams a user is a member of, ordered by membership ID
         
         Args:
             db: Database session
             user_id: User ID
-            skip: Number of records to skip
+            skip: Number of records to skip, ignored when a cursor is given
             limit: Maximum number of records to return
+            cursor: Cursor returned with the previous page
             
         Returns:
-            List of TeamMember objects
+            List of TeamMember objects and the cursor of the next page, if any
         """
-        result = await db.execute(
-            select(TeamMemberModel)
-            .filter(TeamMemberModel.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
+        return await self.get_page(
+            db,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+            filters=(TeamMemberModel.user_id == user_id,),
         )
-        return result.scalars().all()
     
     async def is_team_admin(
         self, db: AsyncSession, *, team_id: int, user_id: int
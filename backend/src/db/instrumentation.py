@@ -0,0 +1,156 @@
+"""Query latency metrics and slow query logging through SQLAlchemy engine events"""
+
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.core.config import load_env
+
+load_env()
+
+# Upper bounds of the latency histogram buckets in milliseconds; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+OTHER_STATEMENTS = "<other>"
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists and multi-row VALUES differ only in their number of placeholders
+_PLACEHOLDER_RUN = re.compile(r"(\$\d+|\?|%\(\w+\)s)(\s*,\s*(\$\d+|\?|%\(\w+\)s))+")
+_VALUES_RUN = re.compile(r"(VALUES \([^()]*\))(\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Collapse whitespace and placeholder lists so one query shape gets one entry."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PLACEHOLDER_RUN.sub(r"\1, ...", statement)
+    return _VALUES_RUN.sub(r"\1, ...", statement)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram, cheap enough to update on every query."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile, in milliseconds."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {
+                **{f"le_{bound}ms": n for bound, n in zip(BUCKETS_MS, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class QueryMetrics:
+    """
+    Time every statement an engine runs and keep a latency histogram per query
+    shape. Only statements slower than slow_query_ms are logged, without their
+    parameters, replacing SQL echo in production.
+    """
+
+    def __init__(self):
+        self.slow_query_ms = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+        # Distinct query shapes tracked; the rest are counted under "<other>"
+        self.max_statements = int(os.getenv("DB_METRICS_MAX_STATEMENTS", "200"))
+        self.overall = LatencyHistogram()
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.recent_slow = deque(maxlen=20)
+        self.metrics = {"errors": 0, "slow": 0}
+
+    def instrument(self, engine: Engine) -> None:
+        """Attach the timing hooks; pass engine.sync_engine for an async engine."""
+        if not event.contains(engine, "before_cursor_execute", self._before_execute):
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # A stack, since a connection can run a statement from inside another's events
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if started:
+            self.record(statement, (time.perf_counter() - started.pop()) * 1000)
+
+    def _on_error(self, exception_context) -> None:
+        self.metrics["errors"] += 1
+        conn = exception_context.connection
+        started = conn.info.get("query_started") if conn is not None else None
+        if started:
+            started.pop()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        """Add one execution to the overall and per-statement histograms."""
+        key = normalize_statement(statement)
+        histogram = self.statements.get(key)
+        if histogram is None:
+            if len(self.statements) >= self.max_statements:
+                key = OTHER_STATEMENTS
+                histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = LatencyHistogram()
+        histogram.observe(elapsed_ms)
+        self.overall.observe(elapsed_ms)
+
+        if elapsed_ms >= self.slow_query_ms:
+            self.metrics["slow"] += 1
+            self.recent_slow.append(
+                {"statement": key[:500], "ms": round(elapsed_ms, 1), "at": time.time()}
+            )
+            print(f"Slow query ({elapsed_ms:.0f} ms): {key[:500]}")
+
+    def reset(self) -> None:
+        self.overall = LatencyHistogram()
+        self.statements.clear()
+        self.recent_slow.clear()
+        self.metrics = {"errors": 0, "slow": 0}
+
+    def get_metrics(self, top: int = 20) -> Dict[str, Any]:
+        """Return the overall histogram and the statements with the most total time."""
+        slowest: List[Dict[str, Any]] = [
+            {"statement": statement[:500], **histogram.to_dict()}
+            for statement, histogram in sorted(
+                self.statements.items(), key=lambda item: item[1].total_ms, reverse=True
+            )[:top]
+        ]
+        return {
+            **self.metrics,
+            "slow_query_ms": self.slow_query_ms,
+            "overall": self.overall.to_dict(),
+            "statements": slowest,
+            "recent_slow": list(self.recent_slow),
+        }
+
+
+query_metrics = QueryMetrics()
@@ -1,14 +1,15 @@
 import os
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from dotenv import load_dotenv
+from src.core.config import load_env
+from src.db.instrumentation import query_metrics
 
 # 加载.env文件中的环境变量
-load_dotenv(override=False)
+load_env()
 
 # 从环境变量中获取数据库配置
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
@@ -20,8 +21,56 @@ POSTGRES_DB = os.getenv("POSTGRES_DB_Test", "testdb")
 # 构建数据库URL（使用异步驱动）
 SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+
+def engine_options() -> Dict[str, Any]:
+    """
+    从环境变量中读取连接池和 asyncpg 的配置
+
+    返回:
+        Dict[str, Any]: create_async_engine 的关键字参数
+    """
+    # 使用 PgBouncer 事务模式时需设置 DB_STATEMENT_CACHE_SIZE=0
+    statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    return {
+        # SQL 日志只用于本地调试，生产环境由慢查询日志代替
+        "echo": os.getenv("DB_ECHO", "false").lower() == "true",
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # 取用连接前先检测，避免使用已被数据库或防火墙断开的连接
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "connect_args": {
+            # asyncpg 连接级别的预编译语句缓存
+            "statement_cache_size": statement_cache_size,
+            # SQLAlchemy asyncpg 方言自己的预编译语句缓存
+            "prepared_statement_cache_size": statement_cache_size,
+        },
+    }
+
+
 # 创建异步数据库引擎
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **engine_options())
+
+# 记录每条语句的耗时，并只输出慢查询
+query_metrics.instrument(engine.sync_engine)
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """
+    获取连接池的当前状态
+
+    返回:
+        Dict[str, Any]: 连接池大小及已签出、空闲和溢出的连接数
+    """
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "timeout": pool.timeout(),
+    }
 
 # 创建异步会话工厂
 AsyncSessionLocal = sessionmaker(
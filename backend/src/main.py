@@ -9,6 +9,8 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.append(str(ROOT_DIR))
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.v1.endpoints import (
@@ -17,9 +19,43 @@ from src.api.v1.endpoints import (
     generation,
     image_generation,
     templates,
+    metrics,
+    loras,
 )
+from src.services import comfy_service
+from src.services.template_service import template_service
+from src.services.gpt_service import gpt_service
+from src.services.instruction_service import instruction_service
+from src.services.art_style_service import art_style_service
+from src.services.lora_catalog_service import lora_catalog_service
+from src.services.lora_registry_service import lora_registry_service
+from src.services.image_preprocess_service import image_preprocess_service
+from src.services.llm_usage_service import llm_usage_service, UsageContextMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in-memory catalogs and shared clients before serving requests."""
+    template_service.refresh(force=True)
+    instruction_service.load()
+    art_style_service.reload_if_changed()
+    await gpt_service.startup()
+    await image_preprocess_service.startup()
+    await llm_usage_service.startup()
+    await lora_catalog_service.startup()
+    await lora_registry_service.startup()
+    # Connecting to ComfyUI can take a while, so do it without delaying startup
+    comfy_warm_up = asyncio.create_task(comfy_service.warm_up())
+    yield
+    comfy_warm_up.cancel()
+    await lora_registry_service.shutdown()
+    await lora_catalog_service.shutdown()
+    await llm_usage_service.shutdown()
+    await image_preprocess_service.shutdown()
+    await gpt_service.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS to allow requests from frontend
 app.add_middleware(
@@ -38,12 +74,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser read the cursor of the next list page
+    expose_headers=["X-Next-Cursor"],
 )
+# Attribute LLM token usage to the calling endpoint, user and team
+app.add_middleware(UsageContextMiddleware)
 
 app.include_router(prompts.router, prefix="/api/prompts", tags=["Prompts"])
 app.include_router(generation.router, prefix="/api/generate", tags=["Generation"])
 app.include_router(templates.router, prefix="/api", tags=["Templates"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 # Comment this out if no comfyui running
 app.include_router(styles.router, prefix="/api/styles", tags=["Styles"])
+app.include_router(loras.router, prefix="/api/loras", tags=["Loras"])
 app.include_router(image_generation.router, prefix="/api", tags=["Image Generation"])
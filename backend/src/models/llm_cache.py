@@ -0,0 +1,18 @@
+'''
+LLM response cache models
+'''
+from sqlalchemy import Column, String, Text, DateTime
+import sqlalchemy.sql.functions
+from src.db.base import Base
+
+class LLMCacheEntry(Base):
+    """
+    Persistent tier of the LLM response cache
+    """
+    __tablename__ = "responses"
+    __table_args__ = {"schema": "llm"}
+
+    key = Column(String(64), primary_key=True)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=sqlalchemy.sql.functions.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
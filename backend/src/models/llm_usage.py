@@ -0,0 +1,31 @@
+'''
+LLM usage accounting models
+'''
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Date, DateTime
+import sqlalchemy.sql.functions
+from src.db.base import Base
+
+class LLMUsageDaily(Base):
+    """
+    Token usage per day, team, user, endpoint, backend and model
+    """
+    __tablename__ = "usage_daily"
+    __table_args__ = {"schema": "llm"}
+
+    day = Column(Date, primary_key=True)
+    team_id = Column(Integer, primary_key=True, index=True)  # 0 when no team was given
+    user_id = Column(String(64), primary_key=True)  # empty for anonymous calls
+    endpoint = Column(String(255), primary_key=True)
+    backend = Column(String(32), primary_key=True)
+    model = Column(String(64), primary_key=True)
+    calls = Column(BigInteger, nullable=False, default=0)
+    estimated_calls = Column(BigInteger, nullable=False, default=0)  # no usage block returned
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    image_tokens = Column(BigInteger, nullable=False, default=0)
+    cached_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    latency_ms_total = Column(Float, nullable=False, default=0)
+    latency_ms_max = Column(Float, nullable=False, default=0)
+    cost = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=sqlalchemy.sql.functions.now())
@@ -0,0 +1,29 @@
+'''
+LoRA registry models
+'''
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+import sqlalchemy.sql.functions
+from src.db.base import Base
+
+class Lora(Base):
+    """
+    LoRA models known to ComfyUI, with the metadata used when generating
+    """
+    __tablename__ = "loras"
+    __table_args__ = (
+        # Tag filters use the @> operator, which a GIN index serves
+        Index("ix_loras_tags", "tags", postgresql_using="gin"),
+        {"schema": "lora"},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False, unique=True)  # file name as listed by ComfyUI
+    trigger_words = Column(String(255))  # comma separated, added to prompts using the LoRA
+    clip_skip = Column(Integer)
+    base_strength = Column(Float)  # default strength offered by the style picker
+    description = Column(Text)
+    tags = Column(ARRAY(String(64)), nullable=False, server_default="{}")
+    available = Column(Boolean, nullable=False, server_default="true", index=True)  # still listed by ComfyUI
+    created_at = Column(DateTime(timezone=True), server_default=sqlalchemy.sql.functions.now())
+    updated_at = Column(DateTime(timezone=True), server_default=sqlalchemy.sql.functions.now())
@@ -1,7 +1,7 @@
 '''
 Prompt models
 '''
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 import sqlalchemy.sql.functions
 from src.db.base import Base
 
@@ -10,7 +10,11 @@ class Prompt(Base):
     Prompt Models
     """
     __tablename__ = "prompts"  # 明确指定表名
-    __table_args__ = {"schema": "prompt"}  # 指定schema为prompt
+    __table_args__ = (
+        # 按创建时间键集分页
+        Index("ix_prompt_prompts_created_at_id", "created_at", "id"),
+        {"schema": "prompt"},  # 指定schema为prompt
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     prompt_name = Column(String(255), nullable=False)
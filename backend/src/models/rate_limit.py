@@ -0,0 +1,17 @@
+'''
+Rate limit models
+'''
+from sqlalchemy import Column, String, Float, DateTime
+import sqlalchemy.sql.functions
+from src.db.base import Base
+
+class RateLimitBucket(Base):
+    """
+    Token bucket shared by every worker process
+    """
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"schema": "llm"}
+
+    name = Column(String(64), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=sqlalchemy.sql.functions.now())
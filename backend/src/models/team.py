@@ -1,7 +1,7 @@
 '''
 Team models
 '''
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 import sqlalchemy.sql.functions
 from src.db.base import Base
 
@@ -10,7 +10,11 @@ class Team(Base):
     Team Models
     """
     __tablename__ = "team"  # Table name
-    __table_args__ = {"schema": "team"}  # Specify schema as team
+    __table_args__ = (
+        # Keyset pagination by creation time
+        Index("ix_team_team_created_at_id", "created_at", "id"),
+        {"schema": "team"},  # Specify schema as team
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
@@ -24,6 +28,9 @@ class TeamMember(Base):
     __tablename__ = "team_members"  # Table name
     __table_args__ = (
         UniqueConstraint("team_id", "user_id", name="uq_team_member"),
+        # Keyset pagination of a team's members and of a user's teams
+        Index("ix_team_team_members_team_id_id", "team_id", "id"),
+        Index("ix_team_team_members_user_id_id", "user_id", "id"),
         {"schema": "team"}  # Specify schema as team
     )
     
@@ -2,7 +2,7 @@
 User models
 '''
 import uuid
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Index
 import sqlalchemy.sql.functions
 from src.db.base import Base
 
@@ -11,7 +11,11 @@ class User(Base):
     User Models
     """
     __tablename__ = "users"
-    __table_args__ = {"schema": "user"}
+    __table_args__ = (
+        # Keyset pagination by creation time
+        Index("ix_user_users_created_at_id", "created_at", "id"),
+        {"schema": "user"},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, unique=True, index=True, nullable=False,
@@ -7,3 +7,8 @@ class PromptGenerationResponse(BaseModel):
 
 class KeywordGenerationResponse(BaseModel):
     keywords: list
+
+
+class ImageAnalysisResponse(BaseModel):
+    generated_prompt: str
+    keywords: list
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class LoraBase(BaseModel):
+    name: str
+    trigger_words: Optional[str] = None
+    clip_skip: Optional[int] = None
+    base_strength: Optional[float] = None
+    description: Optional[str] = None
+    tags: List[str] = []
+
+
+# LoRAs are created by the registry sync, so only their metadata is edited
+class LoraUpdate(BaseModel):
+    trigger_words: Optional[str] = None
+    clip_skip: Optional[int] = None
+    base_strength: Optional[float] = None
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+
+class Lora(LoraBase):
+    id: int
+    available: bool
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LoraPage(BaseModel):
+    items: List[Lora]
+    total: int
+    skip: int
+    limit: int
@@ -0,0 +1,18 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class TemplateInfo(BaseModel):
+    name: str
+    path: str
+    stem: str
+    family: str
+    aspect: str
+    width: int
+    height: int
+    size: int
+    mtime: int
+
+
+class TemplateListResponse(BaseModel):
+    templates: List[TemplateInfo]
@@ -0,0 +1,26 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class UsageRollupRow(BaseModel):
+    day: date
+    group: str
+    calls: int
+    estimated_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    image_tokens: int
+    cached_tokens: int
+    total_tokens: int
+    avg_latency_ms: float
+    max_latency_ms: float
+    cost: float
+
+
+class UsageRollupResponse(BaseModel):
+    group_by: str
+    start: date
+    end: date
+    team_id: Optional[int] = None
+    rows: List[UsageRollupRow]
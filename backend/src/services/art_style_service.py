@@ -0,0 +1,54 @@
+"""Module for the cached art style catalog"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional, Tuple
+from src.services.file_service import file_service
+
+
+class ArtStyleService:
+    """Art styles read once from CSV and reloaded when the file changes."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        # Hot path only compares timestamps; the file is re-checked at most this often
+        self.reload_interval = float(os.getenv("ART_STYLES_RELOAD_INTERVAL", "5"))
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._styles: Tuple[Dict[str, str], ...] = ()
+        self._next_check = 0.0
+
+    def get_styles(self) -> Tuple[Dict[str, str], ...]:
+        """Return the art styles; the tuple is replaced, never modified, on reload."""
+        if self._mtime is None or time.monotonic() >= self._next_check:
+            self.reload_if_changed()
+        return self._styles
+
+    @property
+    def version(self) -> str:
+        """Changes whenever a different version of the file was loaded."""
+        return str(self._mtime)
+
+    def reload_if_changed(self) -> None:
+        """Re-read the CSV if its mtime changed, keeping the last good copy on errors."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.reload_interval
+            try:
+                mtime = os.stat(self.file_path).st_mtime_ns
+                if mtime == self._mtime:
+                    return
+                styles = tuple(file_service.read_art_file(self.file_path))
+            except Exception as e:
+                if self._mtime is None:
+                    raise
+                # A half-written file must not break live requests
+                print(f"Keeping previous art styles: {str(e)}")
+                return
+            self._styles = styles
+            self._mtime = mtime
+
+
+art_style_service = ArtStyleService(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "styles", "game_art_styles.csv")
+)
@@ -2,20 +2,60 @@
 
 import random
 import os
-from dotenv import load_dotenv
+import asyncio
+from src.core.config import load_env
 from src.utils import file_utils
-from comfy_script.runtime import *
 import threading
 
 # Global lock to serialize all ComfyUI Workflow calls
 comfy_lock = threading.Lock()
 
-load_dotenv(override=False)
+load_env()
 COMFY_URL = os.getenv("COMFY_URL")
 
-load(COMFY_URL)
-from comfy_script.runtime.nodes import *
-from comfy_script.runtime import util
+_runtime_lock = threading.Lock()
+_runtime_loaded = False
+
+
+def load_runtime():
+    """
+    Connect to ComfyUI and bring the ComfyScript runtime and node names into
+    this module. Loading connects to the server and builds the node classes from
+    its node list, so it happens on the first workflow instead of at import.
+    """
+    global _runtime_loaded
+    if _runtime_loaded:
+        return
+    with _runtime_lock:
+        if _runtime_loaded:
+            return
+        from comfy_script import runtime
+
+        runtime.load(COMFY_URL)
+        from comfy_script.runtime import nodes, util
+
+        # Same names the former star imports provided, e.g. Workflow and UNETLoader
+        for module in (runtime, nodes):
+            names = getattr(module, "__all__", None) or dir(module)
+            globals().update(
+                {name: getattr(module, name) for name in names if not name.startswith("_")}
+            )
+        globals()["util"] = util
+        _runtime_loaded = True
+
+
+async def warm_up():
+    """
+    Load the runtime in a worker thread, started in the background from the app
+    lifespan so neither startup nor the first workflow waits on ComfyUI.
+    """
+    if not COMFY_URL:
+        return
+    try:
+        await asyncio.to_thread(load_runtime)
+    except Exception as e:
+        # The first workflow tries again
+        print(f"Error loading ComfyScript runtime: {str(e)}")
 
 
 def comfy_call_single_lora(prompt_name, prompt, lora, batch_size, style_strength):
@@ -28,6 +68,7 @@ def comfy_call_single_lora(prompt_name, prompt, lora, batch_size, style_strength
 
 
 def single_lora(prompt_name, prompt, lora, style_strength):
+    load_runtime()
     prompt_name = file_utils.sanitize_filename(prompt_name)
     clean_prompt_name = prompt_name.replace(".txt", "")
     with comfy_lock:
@@ -70,6 +111,7 @@ def comfy_call_stacked_lora(prompt_name, prompt, lora_list, batch_size):
 
 
 def stacked_lora(prompt_name, prompt, lora_list):
+    load_runtime()
     prompt_name = file_utils.sanitize_filename(prompt_name)
     clean_prompt_name = prompt_name.replace(".txt", "")
     with comfy_lock:
@@ -111,6 +153,7 @@ def comfy_call_single_art(prompt_name, prompt, art, batch_size):
 
 
 def single_art(prompt_name, prompt, art):
+    load_runtime()
     prompt_name = file_utils.sanitize_filename(prompt_name)
     clean_prompt_name = prompt_name.replace(".txt", "")
     with comfy_lock:
@@ -150,6 +193,7 @@ def comfy_call_stacked_art(prompt_name, prompt, batch_size):
 
 
 def stacked_art(prompt_name, prompt):
+    load_runtime()
     prompt_name = file_utils.sanitize_filename(prompt_name)
     clean_prompt_name = prompt_name.replace(".txt", "")
     with comfy_lock:
@@ -1,8 +1,8 @@
 """Module for file operations"""
 
 import os
-from typing import List, Dict
-import pandas as pd
+import csv
+from typing import List, Dict, Optional
 
 
 class FileService:
@@ -15,16 +15,6 @@ class FileService:
             project_root, "backend", "src", "templates"
         )
 
-    def fetch_psd_templates(self):
-        """List all PSD files in the templates directory."""
-        psd_files = []
-        for fname in os.listdir(self.psd_templates_dir):
-            if fname.lower().endswith(".png"):
-                psd_files.append(
-                    {"name": fname, "path": os.path.join(self.psd_templates_dir, fname)}
-                )
-        return psd_files
-
     def load_prompt_from_file(self, file_path: str) -> str:
         """Load prompt from file"""
         try:
@@ -38,15 +28,15 @@ class FileService:
                 f"Unable to load the file at {file_path} due to : {str(e)}"
             ) from e
 
-    def read_art_file(self) -> List[Dict[str, str]]:
-        """Read art styles from CSV"""
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        template_path = os.path.join(base_dir, "styles", "game_art_styles.csv")
-        df = pd.read_csv(template_path, header=None)
-        return [
-            {"id": row[0], "name": row[0], "styleType": "art"}
-            for index, row in df.iterrows()
-        ]
+    def read_art_file(self, file_path: Optional[str] = None) -> List[Dict[str, str]]:
+        """Read art styles from CSV, one style name in the first column of each row"""
+        if file_path is None:
+            base_dir = os.path.dirname(os.path.dirname(__file__))
+            file_path = os.path.join(base_dir, "styles", "game_art_styles.csv")
+        # utf-8-sig drops the byte order mark the file was saved with
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as file:
+            names = [row[0].strip() for row in csv.reader(file) if row and row[0].strip()]
+        return [{"id": name, "name": name, "styleType": "art"} for name in names]
 
 
 file_service = FileService()
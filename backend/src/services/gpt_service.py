@@ -2,15 +2,23 @@
 
 import os
 import json
-from typing import Optional, Dict, Any, Union, List
-import requests
-from dotenv import load_dotenv
-from src.services.file_service import file_service
+import time
+import asyncio
+from typing import Optional, Dict, Any, Union, List, AsyncIterator
+import httpx
+from src.core.config import load_env
+from src.services.instruction_service import instruction_service
 from src.services.llm_service import llm_service
+from src.services.llm_cache_service import llm_cache_service
+from src.services.llm_usage_service import llm_usage_service
+from src.services.image_preprocess_service import image_preprocess_service
+from src.services.llm_backends import LLMBackend, LLMRouter
+from src.utils.resilience import ResilientCaller
+from src.utils.rate_limiter import RateLimiter
+from src.utils.singleflight import SingleFlight
 
 # Load env variables
-env_path = os.path.join(os.path.dirname(__file__), "../.env")
-load_dotenv(dotenv_path=env_path, override=False)
+load_env()
 
 
 class GPTService:
@@ -23,41 +31,244 @@ class GPTService:
             "model": "gpt-4o-mini",
             "api-version": "2024-02-01",
         }
+        # Connection pool settings for the shared HTTP clients
+        self.http2 = os.getenv("LLM_HTTP2", "false").lower() == "true"
+        self.max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = int(
+            os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10")
+        )
+        self.keepalive_expiry = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "25"))
+        self.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        # Styles per structured prompt expansion call, bounded by max_tokens
+        self.style_batch_size = int(os.getenv("LLM_STYLE_BATCH_SIZE", "10"))
 
-    def make_api_call(self, data: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
-        """Make API call to GPT service."""
-        try:
-            response = requests.post(
-                self.api_endpoint, headers=self.headers, json=data, timeout=25
+        # Backends in order of preference, e.g. "azure,lm_studio" to fall back to LM Studio
+        backends = []
+        for name in os.getenv("LLM_BACKENDS", "azure").split(","):
+            backend = self._create_backend(name.strip())
+            if backend:
+                backends.append(backend)
+        self.router = LLMRouter(
+            backends or [self._create_backend("azure")],
+            slow_threshold=float(os.getenv("LLM_SLOW_THRESHOLD", "15")),
+            max_error_rate=float(os.getenv("LLM_MAX_ERROR_RATE", "0.5")),
+            recovery_seconds=float(os.getenv("LLM_ROUTING_RECOVERY_SECONDS", "30")),
+        )
+        # Concurrent identical requests share one upstream call
+        self.coalesce = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+        self.singleflight = SingleFlight(timeout=float(os.getenv("LLM_COALESCE_TIMEOUT", "60")))
+        # Shortcuts to the preferred backend
+        self.resilience = self.router.primary.resilience
+        self.rate_limiter = self.router.primary.rate_limiter
+
+    def _create_backend(self, name: str) -> Optional[LLMBackend]:
+        """Build a backend from its environment settings."""
+        pool = {
+            "timeout": self.timeout,
+            "connect_timeout": self.connect_timeout,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "http2": self.http2,
+        }
+        breaker = {
+            "base_delay": float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            "max_delay": float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+            "max_retry_after": float(os.getenv("LLM_RETRY_AFTER_CAP", "30")),
+            "failure_threshold": int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            "reset_timeout": float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", "30")),
+        }
+        if name == "azure":
+            return LLMBackend(
+                "azure",
+                self.api_endpoint,
+                self.headers,
+                # Retries, circuit breaker and hedging around every completion request
+                resilience=ResilientCaller(
+                    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+                    hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "0")),
+                    **breaker,
+                ),
+                # Shared quota for every caller, off unless LLM_RPM_LIMIT or LLM_TPM_LIMIT
+                # is set. Azure grants 6 RPM per 1000 TPM and counts max_tokens against TPM
+                rate_limiter=RateLimiter(
+                    "azure",
+                    requests_per_minute=float(os.getenv("LLM_RPM_LIMIT", "0")),
+                    tokens_per_minute=float(os.getenv("LLM_TPM_LIMIT", "0")),
+                    burst_seconds=float(os.getenv("LLM_RATE_LIMIT_BURST_SECONDS", "10")),
+                    max_wait=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "30")),
+                    shared=os.getenv("LLM_RATE_LIMIT_SHARED", "false").lower() == "true",
+                ),
+                # List prices of gpt-4o-mini per 1000 tokens
+                prompt_price=float(os.getenv("LLM_PROMPT_PRICE_PER_1K", "0.00015")),
+                completion_price=float(os.getenv("LLM_COMPLETION_PRICE_PER_1K", "0.0006")),
+                **pool,
+            )
+        if name in ("lm_studio", "ollama"):
+            # Local OpenAI-compatible servers; most local models cannot read images
+            prefix = name.upper()
+            default_url = (
+                "http://localhost:1234/v1" if name == "lm_studio" else "http://localhost:11434/v1"
             )
-            response.raise_for_status()
-            response_data = response.json()
+            base_url = os.getenv(f"{prefix}_BASE_URL", default_url)
+            api_key = os.getenv(f"{prefix}_API_KEY")
+            return LLMBackend(
+                name,
+                base_url.rstrip("/") + "/chat/completions",
+                {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {api_key}" if api_key else None,
+                },
+                resilience=ResilientCaller(
+                    max_retries=int(os.getenv("LLM_FALLBACK_MAX_RETRIES", "1")), **breaker
+                ),
+                model=os.getenv(f"{prefix}_MODEL"),
+                vision=os.getenv(f"{prefix}_VISION", "false").lower() == "true",
+                **pool,
+            )
+        print(f"Unknown LLM backend {name!r} in LLM_BACKENDS, ignoring it")
+        return None
+
+    async def startup(self):
+        """Open the shared HTTP clients, called from the app lifespan."""
+        await self.router.startup()
 
-            if "choices" not in response_data:
-                raise ValueError("The response does not contain 'choices'")
+    async def shutdown(self):
+        """Close the shared HTTP clients and their pooled connections."""
+        await self.router.shutdown()
 
-            return response_data["choices"][0]["message"]["content"]
+    def _cache_key(self, data: Dict[str, Any]) -> str:
+        primary = self.router.primary
+        return llm_cache_service.make_key(primary.endpoint, primary.headers, data)
 
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"API request failed: {e}") from e
-        except Exception as e:
-            raise RuntimeError(f"Error processing response: {e}") from e
+    async def make_api_call(
+        self, data: Dict[str, Any], use_cache: bool = True
+    ) -> Union[str, Dict[str, Any]]:
+        """
+        Make API call to GPT service.
+        Identical requests are answered from the response cache, or share the call
+        already in flight, unless use_cache is False.
+        """
+        if not use_cache:
+            content, _ = await self.router.complete(data)
+            return content
 
-    def generate_with_template(
+        cache_key = self._cache_key(data)
+        if llm_cache_service.enabled:
+            cached = await llm_cache_service.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if self.coalesce:
+            return await self.singleflight.do(cache_key, lambda: self._complete(data, cache_key))
+        return await self._complete(data, cache_key)
+
+    async def _complete(self, data: Dict[str, Any], cache_key: str) -> str:
+        """Call the backends and cache the answer of the preferred one."""
+        content, backend = await self.router.complete(data)
+
+        # Fallback answers are not kept, so the preferred model replaces them once healthy
+        if llm_cache_service.enabled and backend is self.router.primary:
+            await llm_cache_service.set(cache_key, content)
+        return content
+
+    async def stream_api_call(
+        self, data: Dict[str, Any], use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+        Shares cache entries with make_api_call, so a cached prompt is sent in one piece.
+        """
+        cache_key = None
+        if use_cache and llm_cache_service.enabled:
+            cache_key = self._cache_key(data)
+            cached = await llm_cache_service.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        start = time.monotonic()
+        # Only opening the stream is retried; once tokens reach the client it cannot restart
+        response, backend = await self.router.open_stream(data)
+
+        parts = []
+        completed = False
+        usage = None
+        model = None
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    completed = True
+                    break
+                chunk = json.loads(payload)
+                # Servers that report usage for streams send it with the last chunk
+                usage = chunk.get("usage") or usage
+                model = chunk.get("model") or model
+                # Azure sends content filter results in chunks without choices
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"API stream failed: {e}") from e
+        finally:
+            await response.aclose()
+            # Tokens generated before a disconnect are billed as well
+            if parts or completed:
+                llm_usage_service.record(
+                    backend.name,
+                    model or backend.model_name,
+                    data,
+                    "".join(parts),
+                    usage,
+                    time.monotonic() - start,
+                    backend.prices,
+                )
+
+        # Never cache a completion cut short by a dropped connection
+        if cache_key and completed and parts and backend is self.router.primary:
+            await llm_cache_service.set(cache_key, "".join(parts))
+
+    async def generate_with_template(
         self,
         description: str,
         template_name: str,
         image_base64: Optional[str] = None,
         image_url: Optional[str] = None,
         response_format: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
     ) -> Union[str, Dict[str, Any]]:
         """
         Generate content using a template with optional image input.
         """
-        # Load template
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        template_path = os.path.join(base_dir, "instructions", template_name)
-        prompt = file_service.load_prompt_from_file(template_path)
+        data = await self._build_template_request(
+            description, template_name, image_base64, image_url, response_format
+        )
+
+        # Make API call
+        return await self.make_api_call(data, use_cache=use_cache)
+
+    async def _build_template_request(
+        self,
+        description: str,
+        template_name: str,
+        image_base64: Optional[str] = None,
+        image_url: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build the request body for a template prompt with optional image input."""
+        if image_url:
+            await image_preprocess_service.validate_url(image_url)
+
+        # Load template from the preloaded registry
+        prompt = instruction_service.get(template_name)
 
         # Add description if provided
         if description:
@@ -67,29 +278,48 @@ class GPTService:
         messages = llm_service.create_message(prompt, image_url, image_base64)
 
         # Prepare request data
-        data = llm_service.prepare_request_data(messages, response_format)
-
-        # Make API call
-        return self.make_api_call(data)
+        return llm_service.prepare_request_data(messages, response_format)
 
-    def create_prompt(
+    async def create_prompt(
         self,
         description: str,
         image_base64: Optional[str] = None,
         image_url: Optional[str] = None,
+        use_cache: bool = True,
     ) -> str:
         """Generate prompt with optional image."""
         template_name = (
             "image_prompt.txt" if (image_base64 or image_url) else "text_prompt.txt"
         )
-        return self.generate_with_template(
+        return await self.generate_with_template(
+            description, template_name, image_base64, image_url, use_cache=use_cache
+        )
+
+    async def stream_prompt(
+        self,
+        description: str,
+        image_base64: Optional[str] = None,
+        image_url: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Generate prompt with optional image, returning an iterator over the text as
+        it is produced. The input is validated before this returns, so a bad image
+        URL raises ValueError here rather than once the stream has started.
+        """
+        template_name = (
+            "image_prompt.txt" if (image_base64 or image_url) else "text_prompt.txt"
+        )
+        data = await self._build_template_request(
             description, template_name, image_base64, image_url
         )
+        return self.stream_api_call(data, use_cache=use_cache)
 
-    def generate_with_prompt(
+    async def generate_with_prompt(
         self,
         description: str,
         response_format: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
     ) -> Union[str, Dict[str, Any]]:
         """
         Generate image prompt with template prompt
@@ -104,10 +334,153 @@ class GPTService:
         data = llm_service.prepare_request_data(messages, response_format)
 
         # Make API call
-        return self.make_api_call(data)
+        return await self.make_api_call(data, use_cache=use_cache)
+
+    async def expand_style_prompts(
+        self,
+        prompt_content: str,
+        styles: List[str],
+        use_cache: bool = True,
+    ) -> List[str]:
+        """
+        Generate one image prompt per style, asking for up to style_batch_size
+        styles in a single structured call. Returns the prompts in style order.
+        """
+        labels = list(dict.fromkeys(styles))
+        chunks = [
+            labels[i : i + self.style_batch_size]
+            for i in range(0, len(labels), self.style_batch_size)
+        ]
+        expanded = await asyncio.gather(
+            *(self._expand_style_chunk(prompt_content, chunk, use_cache) for chunk in chunks)
+        )
+        by_style = {label: text for result in expanded for label, text in result.items()}
+        return [by_style[style] for style in styles]
+
+    async def _expand_style_chunk(
+        self, prompt_content: str, labels: List[str], use_cache: bool
+    ) -> Dict[str, str]:
+        """Expand one chunk of styles, falling back to one call per style it missed."""
+        json_schema = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "style_prompts",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "prompts": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "style": {"type": "string", "enum": labels},
+                                    "prompt": {"type": "string"},
+                                },
+                                "required": ["style", "prompt"],
+                                "additionalProperties": False,
+                            },
+                        }
+                    },
+                    "required": ["prompts"],
+                    "additionalProperties": False,
+                },
+                "strict": True,
+            },
+        }
+        prompt = prompt_content.replace("{art_style_list}", " ".join(labels))
+        prompt += (
+            "\n\nWrite a separate image prompt for each of the following styles "
+            "and return them as JSON, with each style copied exactly as given:\n"
+            + "\n".join(f"- {label}" for label in labels)
+        )
+
+        by_style = {}
+        try:
+            response = await self.generate_with_prompt(
+                prompt, response_format=json_schema, use_cache=use_cache
+            )
+            for item in json.loads(response).get("prompts", []):
+                if item.get("style") in labels and item.get("prompt"):
+                    by_style.setdefault(item["style"], item["prompt"])
+        except (ValueError, AttributeError) as e:
+            # e.g. a fallback backend that ignored the schema
+            print(f"Error parsing style prompts, expanding styles one by one: {str(e)}")
+
+        missing = [label for label in labels if label not in by_style]
+        if missing:
+            outputs = await asyncio.gather(
+                *(
+                    self.generate_with_prompt(
+                        prompt_content.replace("{art_style_list}", label), use_cache=use_cache
+                    )
+                    for label in missing
+                )
+            )
+            by_style.update(zip(missing, outputs))
+        return by_style
+
+    async def analyze_image(
+        self,
+        description: str = "",
+        image_base64: Optional[str] = None,
+        image_url: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Generate the prompt and extract the keywords of one image in a single
+        structured vision call, so the image is sent only once.
+        """
+        json_schema = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "image_analysis",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "generated_prompt": {"type": "string"},
+                        "keywords": {"type": "array", "items": {"type": "string"}},
+                    },
+                    "required": ["generated_prompt", "keywords"],
+                    "additionalProperties": False,
+                },
+                "strict": True,
+            },
+        }
+        if not (image_base64 or image_url):
+            raise ValueError("An image or image URL is required for the analysis")
+        # Both instructions in one request, each answer in its own JSON field
+        instructions = (
+            (description + "\n\n" if description else "")
+            + "Return your answer as JSON. Put the master prompt in generated_prompt. "
+            + "Also extract keywords from the image following the instructions below "
+            + "and put them in keywords as a list of short strings.\n\n"
+            + instruction_service.get("keyword_prompt.txt")
+        )
+        data = await self._build_template_request(
+            instructions, "image_prompt.txt", image_base64, image_url, json_schema
+        )
+        response = await self.make_api_call(data, use_cache=use_cache)
 
-    def extract_keywords(
-        self, image_base64: Optional[str] = None, image_url: Optional[str] = None
+        try:
+            analysis = json.loads(response)
+            return {
+                "generated_prompt": analysis["generated_prompt"],
+                "keywords": analysis.get("keywords", []),
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            # e.g. a fallback backend that ignored the schema
+            print(f"Error parsing image analysis, using separate calls: {str(e)}")
+        generated_prompt, keywords = await asyncio.gather(
+            self.create_prompt(description, image_base64, image_url, use_cache),
+            self.extract_keywords(image_base64, image_url, use_cache),
+        )
+        return {"generated_prompt": generated_prompt, "keywords": keywords}
+
+    async def extract_keywords(
+        self,
+        image_base64: Optional[str] = None,
+        image_url: Optional[str] = None,
+        use_cache: bool = True,
     ) -> List[str]:
         """Extract keywords from image."""
         json_schema = {
@@ -126,12 +499,13 @@ class GPTService:
             },
         }
 
-        response = self.generate_with_template(
+        response = await self.generate_with_template(
             description="",
             template_name="keyword_prompt.txt",
             image_base64=image_base64,
             image_url=image_url,
             response_format=json_schema,
+            use_cache=use_cache,
         )
 
         extracted_data = json.loads(response)
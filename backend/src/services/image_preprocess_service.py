@@ -0,0 +1,241 @@
+"""Module for preparing uploaded images for vision LLM calls"""
+
+import os
+import time
+import base64
+import asyncio
+import hashlib
+from io import BytesIO
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from fastapi import UploadFile
+
+# Formats the vision endpoint accepts as they are
+PASSTHROUGH_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+# Largest image the vision endpoint accepts by URL
+MAX_IMAGE_URL_BYTES = 20 * 1024 * 1024
+
+
+class ImagePreprocessService:
+    """
+    Prepare image inputs for vision requests.
+    Uploads are downscaled and re-encoded to what the vision model actually looks
+    at: in high detail mode images are fitted into 2048x2048 and then scaled so
+    the short side is at most 768px, so anything larger only costs upload time.
+    Image URLs are checked once and the result is cached.
+    """
+
+    def __init__(self):
+        self.max_long_edge = int(os.getenv("VISION_MAX_LONG_EDGE", "2048"))
+        self.max_short_edge = int(os.getenv("VISION_MAX_SHORT_EDGE", "768"))
+        self.jpeg_quality = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+        # Small, supported uploads are sent untouched to avoid a lossy round trip
+        self.passthrough_bytes = int(os.getenv("VISION_PASSTHROUGH_BYTES", "524288"))
+        self.max_entries = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "64"))
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        # Image URL checks, remembered per URL including failures
+        self.url_timeout = float(os.getenv("IMAGE_URL_TIMEOUT", "3"))
+        self.url_ttl = float(os.getenv("IMAGE_URL_TTL", "600"))
+        self.url_negative_ttl = float(os.getenv("IMAGE_URL_NEGATIVE_TTL", "60"))
+        # Past the TTL a known good URL is still used while it is checked again
+        self.url_stale_ttl = float(os.getenv("IMAGE_URL_STALE_TTL", "86400"))
+        self.url_max_entries = int(os.getenv("IMAGE_URL_CACHE_MAX_ENTRIES", "4096"))
+        self._urls: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "passthrough": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "url_hits": 0,
+            "url_negative_hits": 0,
+            "url_checks": 0,
+            "url_revalidations": 0,
+            "url_failures": 0,
+        }
+
+    async def process_upload(self, image: Optional[UploadFile]) -> Optional[str]:
+        """Read an upload and return it as compact base64 for a vision request."""
+        if not image:
+            return None
+        return await self.prepare(await image.read())
+
+    async def prepare(self, contents: bytes) -> str:
+        """Return the processed base64 image, reusing earlier results for identical bytes."""
+        key = hashlib.sha256(contents).hexdigest()
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return cached
+
+        self.metrics["misses"] += 1
+        # Decoding and resizing a 20 MB photo would block the event loop
+        encoded = await asyncio.to_thread(self._preprocess, contents)
+        self.metrics["bytes_in"] += len(contents)
+        self.metrics["bytes_out"] += len(encoded) * 3 // 4
+
+        self._entries[key] = encoded
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return encoded
+
+    def _preprocess(self, contents: bytes) -> str:
+        """Sniff, downscale and re-encode one image."""
+        # Imported here so PIL is only loaded once an image is uploaded
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        try:
+            img = Image.open(BytesIO(contents))
+            with img:
+                width, height = img.size
+                scale = min(
+                    1.0,
+                    self.max_long_edge / max(width, height),
+                    self.max_short_edge / min(width, height),
+                )
+                if (
+                    scale == 1.0
+                    and img.format in PASSTHROUGH_FORMATS
+                    and len(contents) <= self.passthrough_bytes
+                ):
+                    self.metrics["passthrough"] += 1
+                    return base64.b64encode(contents).decode("utf-8")
+
+                # Let the JPEG decoder skip resolution we are about to throw away
+                img.draft("RGB", (round(width * scale), round(height * scale)))
+                frame = ImageOps.exif_transpose(img)
+                frame_width, frame_height = frame.size
+                scale = min(
+                    1.0,
+                    self.max_long_edge / max(frame_width, frame_height),
+                    self.max_short_edge / min(frame_width, frame_height),
+                )
+                if scale < 1.0:
+                    frame = frame.resize(
+                        (max(1, round(frame_width * scale)), max(1, round(frame_height * scale))),
+                        Image.Resampling.BICUBIC,
+                        reducing_gap=2.0,
+                    )
+
+                buffer = BytesIO()
+                if "A" in frame.getbands() or "transparency" in frame.info:
+                    frame.convert("RGBA").save(buffer, format="PNG", compress_level=6)
+                else:
+                    frame.convert("RGB").save(
+                        buffer, format="JPEG", quality=self.jpeg_quality, optimize=True
+                    )
+        except UnidentifiedImageError as e:
+            raise ValueError("The uploaded file is not a supported image") from e
+        except Image.DecompressionBombError as e:
+            raise ValueError("The uploaded image has too many pixels") from e
+        except OSError as e:
+            # Pixels are decoded lazily, so a truncated file only fails while resizing
+            raise ValueError("The uploaded image is truncated or corrupt") from e
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+    async def validate_url(self, image_url: str) -> None:
+        """
+        Raise ValueError if an image URL is inaccessible or too large.
+        Fresh results are answered from the cache; a known good URL past its TTL
+        is used right away and checked again in the background.
+        """
+        entry = self._urls.get(image_url)
+        if entry is not None:
+            checked_at, error = entry
+            age = time.monotonic() - checked_at
+            if error is not None and age < self.url_negative_ttl:
+                self.metrics["url_negative_hits"] += 1
+                raise ValueError(error)
+            if error is None and age < self.url_ttl:
+                self.metrics["url_hits"] += 1
+                return
+            if error is None and age < self.url_stale_ttl:
+                self.metrics["url_hits"] += 1
+                if image_url not in self._revalidating:
+                    self.metrics["url_revalidations"] += 1
+                    task = asyncio.ensure_future(self._check_url(image_url))
+                    self._revalidating[image_url] = task
+                    task.add_done_callback(
+                        lambda _: self._revalidating.pop(image_url, None)
+                    )
+                return
+
+        error = await self._check_url(image_url)
+        if error is not None:
+            raise ValueError(error)
+
+    async def _check_url(self, image_url: str) -> Optional[str]:
+        """Check an image URL within the deadline, cache and return the error if any."""
+        if self.client is None or self.client.is_closed:
+            await self.startup()
+        self.metrics["url_checks"] += 1
+        try:
+            # One deadline for the whole check, including redirects
+            error = await asyncio.wait_for(self._fetch_url_error(image_url), self.url_timeout)
+        except asyncio.TimeoutError:
+            error = f"Image URL did not respond within {self.url_timeout}s"
+
+        if error is not None:
+            self.metrics["url_failures"] += 1
+        self._urls[image_url] = (time.monotonic(), error)
+        self._urls.move_to_end(image_url)
+        while len(self._urls) > self.url_max_entries:
+            self._urls.popitem(last=False)
+        return error
+
+    async def _fetch_url_error(self, image_url: str) -> Optional[str]:
+        """Request the headers of an image URL and describe what is wrong with it."""
+        try:
+            response = await self.client.head(image_url)
+            if response.status_code == 405:
+                # Some CDNs refuse HEAD; read only the headers of a GET instead
+                async with self.client.stream("GET", image_url) as response:
+                    pass
+            response.raise_for_status()
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            return f"Invalid or inaccessible image URL: {e}"
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) > MAX_IMAGE_URL_BYTES:
+            return "The image size is larger than 20 MB."
+        return None
+
+    async def startup(self):
+        """Open the HTTP client used for image URL checks."""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.url_timeout), follow_redirects=True
+            )
+
+    async def shutdown(self):
+        """Cancel background checks and close the HTTP client."""
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def clear(self) -> None:
+        """Drop every cached image and URL check."""
+        self._entries.clear()
+        self._urls.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return cache counters and the payload reduction achieved."""
+        return {
+            **self.metrics,
+            "size": len(self._entries),
+            "url_cache_size": len(self._urls),
+            "reduction_ratio": (
+                1 - self.metrics["bytes_out"] / self.metrics["bytes_in"]
+                if self.metrics["bytes_in"]
+                else 0.0
+            ),
+        }
+
+
+image_preprocess_service = ImagePreprocessService()
@@ -1,13 +1,37 @@
 """Module for image processing function"""
 
+import os
 import json
+import asyncio
 from io import BytesIO
 import base64
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from src.services.gpt_service import gpt_service
 from src.services.file_service import file_service
+from src.services.lora_registry_service import lora_registry_service
 from src.services import comfy_service
-from PIL import Image
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Supported output encodings: format key -> (PIL format, mime type, file extension)
+OUTPUT_FORMATS = {
+    "png": ("PNG", "image/png", ".png"),
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+# Other names accepted for the output encodings
+FORMAT_ALIASES = {"jpg": "jpeg"}
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+DEFAULT_QUALITY = 80
+
+# How the base image is fitted to the template:
+#   cover   - fill the template frame, cropping the overflow of the base image
+#   pad     - fit the base image inside the template frame, padding the rest
+#   fit     - keep the base image, letterbox the template inside it
+#   stretch - resize the template to the base image, ignoring aspect ratio
+FIT_MODES = ("cover", "pad", "fit", "stretch")
+DEFAULT_PAD_COLOR = (0, 0, 0, 255)
 
 
 class ImageService:
@@ -16,29 +40,226 @@ class ImageService:
     def __init__(self):
         self.gpt_service = gpt_service
         self.file_service = file_service
+        # Expand all per-style prompts of a base prompt in one structured LLM call
+        self.batch_style_prompts = (
+            os.getenv("LLM_BATCH_STYLE_PROMPTS", "true").lower() == "true"
+        )
+        # Prompt calls in flight per generate_images request, so large batches are
+        # paced instead of tripping the rate limiter or the circuit breaker
+        self.prompt_concurrency = int(os.getenv("LLM_RENDER_PROMPT_CONCURRENCY", "4"))
 
     def layer_template_over_base(
-        self, base_image_path: str, template_png_path: str
+        self,
+        base_image_path: str,
+        template_png_path: str,
+        output_format: str = "png",
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+        fit_mode: str = "stretch",
+        alpha_regions: Optional[List[Tuple[int, int, int, int]]] = None,
     ) -> str:
         """
-        Composite a PNG template over a base PNG image and return the result as a base64 PNG string.
+        Composite a PNG template over a base PNG image and return the result as a base64 data URI.
         """
-        # Open both images as RGBA
-        base_img = Image.open(base_image_path).convert("RGBA")
-        template_img = (
-            Image.open(template_png_path).convert("RGBA").resize(base_img.size)
+        encoded, mime_type = self.render_template_over_base(
+            base_image_path,
+            template_png_path,
+            output_format,
+            quality,
+            compress_level,
+            fit_mode,
+            alpha_regions,
         )
+        return self.to_data_uri(encoded, mime_type)
+
+    def render_template_over_base(
+        self,
+        base_image_path: str,
+        template_png_path: str,
+        output_format: str = "png",
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+        fit_mode: str = "stretch",
+        alpha_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+    ) -> Tuple[bytes, str]:
+        """
+        Composite a PNG template over a base image and return the encoded bytes and mime type.
+        """
+        result_img = self.composite_template(
+            base_image_path, template_png_path, fit_mode, alpha_regions
+        )
+        return self.encode_image(result_img, output_format, quality, compress_level)
+
+    def composite_template(
+        self,
+        base_image_path: str,
+        template_png_path: str,
+        fit_mode: str = "stretch",
+        alpha_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+    ) -> "Image.Image":
+        """
+        Composite a template over a base image using the given fit mode.
+        Geometry is worked out from the image headers so each image is decoded
+        once, already at (or close to) its target size. When the template is
+        drawn at its native size and precomputed alpha_regions are given, only
+        those non-transparent regions are blended.
+        """
+        if fit_mode not in FIT_MODES:
+            raise ValueError(
+                f"Unsupported fit mode '{fit_mode}', expected one of {', '.join(FIT_MODES)}"
+            )
+
+        from PIL import Image
+
+        with Image.open(base_image_path) as base_src, Image.open(
+            template_png_path
+        ) as template_src:
+            base_w, base_h = base_src.size
+            template_w, template_h = template_src.size
+
+            if fit_mode == "stretch":
+                canvas = self._load_scaled(base_src, (base_w, base_h))
+                template_img = self._load_scaled(template_src, (base_w, base_h))
+                return Image.alpha_composite(canvas, template_img)
+
+            if fit_mode == "fit":
+                scale = min(base_w / template_w, base_h / template_h)
+                size = (round(template_w * scale), round(template_h * scale))
+                canvas = self._load_scaled(base_src, (base_w, base_h))
+                template_img = self._load_scaled(template_src, size)
+                offset = ((base_w - size[0]) // 2, (base_h - size[1]) // 2)
+                canvas.alpha_composite(template_img, dest=offset)
+                return canvas
+
+            template_img = self._load_scaled(template_src, (template_w, template_h))
+
+            if fit_mode == "cover":
+                # Only the centred crop of the base image is decoded into the canvas
+                scale = max(template_w / base_w, template_h / base_h)
+                crop_w, crop_h = template_w / scale, template_h / scale
+                left, top = (base_w - crop_w) / 2, (base_h - crop_h) / 2
+                canvas = self._load_scaled(
+                    base_src,
+                    (template_w, template_h),
+                    box=(left, top, left + crop_w, top + crop_h),
+                )
+                return self._composite_regions(canvas, template_img, alpha_regions)
+
+            # pad
+            scale = min(template_w / base_w, template_h / base_h)
+            size = (round(base_w * scale), round(base_h * scale))
+            canvas = Image.new("RGBA", (template_w, template_h), DEFAULT_PAD_COLOR)
+            canvas.paste(
+                self._load_scaled(base_src, size),
+                ((template_w - size[0]) // 2, (template_h - size[1]) // 2),
+            )
+            return self._composite_regions(canvas, template_img, alpha_regions)
 
-        # Composite the template over the base image
-        result_img = Image.alpha_composite(base_img, template_img)
+    def _composite_regions(
+        self,
+        canvas: "Image.Image",
+        template_img: "Image.Image",
+        alpha_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+    ) -> "Image.Image":
+        """Blend a same-sized template onto the canvas in place, one region at a time."""
+        if alpha_regions is None:
+            # Detecting regions costs more than one full-frame blend, so it only
+            # pays off for catalog templates whose regions are cached
+            canvas.alpha_composite(template_img)
+            return canvas
+        for region in alpha_regions:
+            canvas.alpha_composite(template_img, dest=region[:2], source=region)
+        return canvas
+
+    def _load_scaled(
+        self,
+        img: "Image.Image",
+        size: Tuple[int, int],
+        box: Optional[Tuple[float, float, float, float]] = None,
+    ) -> "Image.Image":
+        """
+        Decode an opened image straight to the requested size as RGBA.
+        JPEGs are decoded at a reduced DCT scale via draft, and large downscales
+        go through reduce before the final resample.
+        """
+        src_w, src_h = img.size
+        if box is None:
+            box = (0, 0, src_w, src_h)
+
+        if img.format == "JPEG":
+            # Ask libjpeg for the smallest scale that still covers the target region
+            box_w, box_h = box[2] - box[0], box[3] - box[1]
+            img.draft(
+                "RGB",
+                (
+                    int(src_w * size[0] / box_w) + 1,
+                    int(src_h * size[1] / box_h) + 1,
+                ),
+            )
+            if img.size != (src_w, src_h):
+                ratio_w, ratio_h = img.size[0] / src_w, img.size[1] / src_h
+                box = (
+                    box[0] * ratio_w,
+                    box[1] * ratio_h,
+                    box[2] * ratio_w,
+                    box[3] * ratio_h,
+                )
+
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+
+        if size != img.size or box != (0, 0, *img.size):
+            from PIL import Image
+
+            img = img.resize(
+                size, Image.Resampling.BICUBIC, box=box, reducing_gap=2.0
+            )
+        return img.convert("RGBA") if img.mode != "RGBA" else img.copy()
+
+    def encode_image(
+        self,
+        image: "Image.Image",
+        output_format: str = "png",
+        quality: Optional[int] = None,
+        compress_level: Optional[int] = None,
+    ) -> Tuple[bytes, str]:
+        """
+        Encode an image as PNG, WebP or JPEG and return the bytes and mime type.
+        """
+        output_format = output_format.lower()
+        output_format = FORMAT_ALIASES.get(output_format, output_format)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unsupported output format '{output_format}', "
+                f"expected one of {', '.join(OUTPUT_FORMATS)}"
+            )
+        pil_format, mime_type, _ = OUTPUT_FORMATS[output_format]
+
+        save_kwargs: Dict[str, Any] = {}
+        if output_format == "png":
+            # Lower compress levels trade payload size for much faster encoding
+            save_kwargs["compress_level"] = (
+                DEFAULT_PNG_COMPRESS_LEVEL if compress_level is None else compress_level
+            )
+        elif output_format == "webp":
+            save_kwargs["quality"] = DEFAULT_QUALITY if quality is None else quality
+            save_kwargs["method"] = 4
+        else:
+            # JPEG has no alpha channel
+            image = image.convert("RGB")
+            save_kwargs["quality"] = DEFAULT_QUALITY if quality is None else quality
+            save_kwargs["optimize"] = True
 
-        # Encode as base64 PNG
         buffer = BytesIO()
-        result_img.save(buffer, format="PNG")
-        img_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        return f"data:image/png;base64,{img_b64}"
+        image.save(buffer, format=pil_format, **save_kwargs)
+        return buffer.getvalue(), mime_type
+
+    def to_data_uri(self, encoded: bytes, mime_type: str) -> str:
+        """Wrap encoded image bytes in a base64 data URI."""
+        img_b64 = base64.b64encode(encoded).decode("utf-8")
+        return f"data:{mime_type};base64,{img_b64}"
 
-    def process_lora_styles(
+    async def process_lora_styles(
         self,
         prompt_content: str,
         prompt_name: str,
@@ -50,25 +271,29 @@ class ImageService:
         if stack_loras:
             style_str = " ".join([f"{l['id']}:{l['styleStrength']}" for l in lora_list])
             prompt = prompt_content.replace("{art_style_list}", style_str)
-            output = self.gpt_service.generate_with_prompt(prompt)
-            output += keywords
+            output = await self.gpt_service.generate_with_prompt(prompt, use_cache=False)
+            output = self._with_trigger_words(output + keywords, lora_list)
             first_style = lora_list[0]
             batch_size = int(first_style["batchSize"])
 
-            comfy_service.comfy_call_stacked_lora(
-                prompt_name, output, lora_list, batch_size
+            await asyncio.to_thread(
+                comfy_service.comfy_call_stacked_lora,
+                prompt_name,
+                output,
+                lora_list,
+                batch_size,
             )
         else:
-            for l in lora_list:
-                prompt = prompt_content.replace(
-                    "{art_style_list}", f"{l['id']}:{l['styleStrength']}"
-                )
-                output = self.gpt_service.generate_with_prompt(prompt)
-                output += keywords
+            outputs = await self._style_prompts(
+                prompt_content, [self._style_label(l) for l in lora_list]
+            )
+            for l, output in zip(lora_list, outputs):
+                output = self._with_trigger_words(output + keywords, [l])
                 batch_size = int(l["batchSize"])
                 style_strength = float(l["styleStrength"])
 
-                comfy_service.comfy_call_single_lora(
+                await asyncio.to_thread(
+                    comfy_service.comfy_call_single_lora,
                     prompt_name,
                     output,
                     l["id"],
@@ -76,7 +301,7 @@ class ImageService:
                     style_strength,
                 )
 
-    def process_art_styles(
+    async def process_art_styles(
         self,
         prompt_content: str,
         prompt_name: str,
@@ -88,32 +313,62 @@ class ImageService:
         if stack_loras:
             style_str = " ".join([f"{a['id']}:{a['styleStrength']}" for a in art_list])
             prompt = prompt_content.replace("{art_style_list}", style_str)
-            output = self.gpt_service.generate_with_prompt(prompt)
+            output = await self.gpt_service.generate_with_prompt(prompt, use_cache=False)
             output += keywords
             first_style = art_list[0]
             batch_size = int(first_style["batchSize"])
 
-            comfy_service.comfy_call_stacked_art(
+            await asyncio.to_thread(
+                comfy_service.comfy_call_stacked_art,
                 prompt_name,
                 output,
                 batch_size,
             )
         else:
-            for a in art_list:
-                prompt = prompt_content.replace(
-                    "{art_style_list}", f"{a['id']}:{a['styleStrength']}"
-                )
-                output = self.gpt_service.generate_with_prompt(prompt)
+            outputs = await self._style_prompts(
+                prompt_content, [self._style_label(a) for a in art_list]
+            )
+            for a, output in zip(art_list, outputs):
                 output += keywords
                 batch_size = int(a["batchSize"])
 
-                comfy_service.comfy_call_single_art(
+                await asyncio.to_thread(
+                    comfy_service.comfy_call_single_art,
                     prompt_name,
                     output,
                     a["id"],
                     batch_size,
                 )
 
+    @staticmethod
+    def _with_trigger_words(prompt: str, loras: List[Dict[str, Any]]) -> str:
+        """Append the registered trigger words of the LoRAs to a prompt."""
+        trigger_words = lora_registry_service.trigger_words([l["id"] for l in loras])
+        return f"{prompt}, {trigger_words}" if trigger_words else prompt
+
+    @staticmethod
+    def _style_label(style: Dict[str, Any]) -> str:
+        return f"{style['id']}:{style['styleStrength']}"
+
+    async def _style_prompts(self, prompt_content: str, labels: List[str]) -> List[str]:
+        """
+        Return one LLM image prompt per style label, in order.
+        Render prompts are sampled, so they bypass the response cache and a
+        regenerate gets fresh text.
+        """
+        if self.batch_style_prompts:
+            return await self.gpt_service.expand_style_prompts(
+                prompt_content, labels, use_cache=False
+            )
+        return await asyncio.gather(
+            *(
+                self.gpt_service.generate_with_prompt(
+                    prompt_content.replace("{art_style_list}", label), use_cache=False
+                )
+                for label in labels
+            )
+        )
+
     async def generate_images(
         self, prompts: str, style_settings: str, keywords: str, stack_loras: bool
     ) -> list:
@@ -125,48 +380,71 @@ class ImageService:
         lora_list = [l for l in style_settings_list if l["styleType"] == "lora"]
         art_list = [l for l in style_settings_list if l["styleType"] == "art"]
 
-        results = []
+        # Every render gets its own LLM call with the prompt content as is; the calls
+        # are issued concurrently up front, at most prompt_concurrency at a time, and
+        # the ComfyUI calls, which are serialized anyway, are kept in order
+        jobs = []
         for prompt in prompt_list:
-            prompt_content = prompt["content"]
-            prompt_name = prompt["name"]
-
             if stack_loras:
-                if lora_list:
-                    gpt_prompt = self.gpt_service.generate_with_prompt(prompt_content)
-                    gpt_prompt += keywords
-                    images = comfy_service.comfy_call_stacked_lora(
-                        prompt_name,
-                        gpt_prompt,
-                        lora_list,
-                        batch_size=lora_list[0]["batchSize"],
-                    )
-                    results.extend(images)
-                if art_list:
-                    gpt_prompt = self.gpt_service.generate_with_prompt(prompt_content)
-                    gpt_prompt += keywords
-                    images = comfy_service.comfy_call_stacked_art(
-                        prompt_name, gpt_prompt, batch_size=art_list[0]["batchSize"]
-                    )
-                    results.extend(images)
+                kinds = [("stacked_lora", None)] if lora_list else []
+                kinds += [("stacked_art", None)] if art_list else []
+            else:
+                kinds = [("single_lora", l) for l in lora_list]
+                kinds += [("single_art", a) for a in art_list]
+            jobs.extend((prompt, kind, style) for kind, style in kinds)
+
+        semaphore = asyncio.Semaphore(max(1, self.prompt_concurrency))
+
+        async def render_prompt(content: str) -> str:
+            async with semaphore:
+                # Uncached, so identical requests are sampled independently
+                return await self.gpt_service.generate_with_prompt(content, use_cache=False)
+
+        gpt_prompts = await asyncio.gather(
+            *(render_prompt(prompt["content"]) for prompt, _, _ in jobs)
+        )
+
+        results = []
+        for (prompt, kind, style), gpt_prompt in zip(jobs, gpt_prompts):
+            prompt_name = prompt["name"]
+            gpt_prompt += keywords
+            if kind in ("stacked_lora", "single_lora"):
+                gpt_prompt = self._with_trigger_words(
+                    gpt_prompt, lora_list if kind == "stacked_lora" else [style]
+                )
+            if kind == "stacked_lora":
+                images = await asyncio.to_thread(
+                    comfy_service.comfy_call_stacked_lora,
+                    prompt_name,
+                    gpt_prompt,
+                    lora_list,
+                    batch_size=lora_list[0]["batchSize"],
+                )
+            elif kind == "stacked_art":
+                images = await asyncio.to_thread(
+                    comfy_service.comfy_call_stacked_art,
+                    prompt_name,
+                    gpt_prompt,
+                    batch_size=art_list[0]["batchSize"],
+                )
+            elif kind == "single_lora":
+                images = await asyncio.to_thread(
+                    comfy_service.comfy_call_single_lora,
+                    prompt_name,
+                    gpt_prompt,
+                    style["id"],
+                    batch_size=style["batchSize"],
+                    style_strength=style["styleStrength"],
+                )
             else:
-                for l in lora_list:
-                    gpt_prompt = self.gpt_service.generate_with_prompt(prompt_content)
-                    gpt_prompt += keywords
-                    images = comfy_service.comfy_call_single_lora(
-                        prompt_name,
-                        gpt_prompt,
-                        l["id"],
-                        batch_size=l["batchSize"],
-                        style_strength=l["styleStrength"],
-                    )
-                    results.extend(images)
-                for a in art_list:
-                    gpt_prompt = self.gpt_service.generate_with_prompt(prompt_content)
-                    gpt_prompt += keywords
-                    images = comfy_service.comfy_call_single_art(
-                        prompt_name, gpt_prompt, a["id"], batch_size=a["batchSize"]
-                    )
-                    results.extend(images)
+                images = await asyncio.to_thread(
+                    comfy_service.comfy_call_single_art,
+                    prompt_name,
+                    gpt_prompt,
+                    style["id"],
+                    batch_size=style["batchSize"],
+                )
+            results.extend(images)
         return results
 
 
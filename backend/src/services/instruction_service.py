@@ -0,0 +1,94 @@
+"""Module for the preloaded LLM instruction templates"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional, Tuple
+from src.services.file_service import file_service
+
+# Instruction files the generation endpoints rely on
+REQUIRED_INSTRUCTIONS = ("image_prompt.txt", "text_prompt.txt", "keyword_prompt.txt")
+
+
+class InstructionService:
+    """Registry of instruction templates loaded once and reloaded when files change."""
+
+    def __init__(self, instructions_dir: str):
+        self.instructions_dir = instructions_dir
+        # Hot path only compares timestamps; files are re-checked at most this often
+        self.reload_interval = float(os.getenv("INSTRUCTIONS_RELOAD_INTERVAL", "5"))
+        self._lock = threading.Lock()
+        self._instructions: Dict[str, Tuple[int, str]] = {}
+        self._next_check = 0.0
+
+    def load(self) -> None:
+        """Load and validate every instruction file, raising if a required one is unusable."""
+        with self._lock:
+            self._instructions = self._scan(strict=True)
+            self._next_check = time.monotonic() + self.reload_interval
+
+    def get(self, name: str) -> str:
+        """Return the instruction text for a file name such as image_prompt.txt."""
+        if not self._instructions or time.monotonic() >= self._next_check:
+            self.reload_if_changed()
+        entry = self._instructions.get(name)
+        if entry is None:
+            raise Exception(f"Instruction template {name} was not found.")
+        return entry[1]
+
+    def reload_if_changed(self) -> None:
+        """Re-read instruction files whose mtime changed, keeping the last good copy on errors."""
+        with self._lock:
+            if not self._instructions:
+                self._instructions = self._scan(strict=True)
+            else:
+                self._instructions = self._scan(strict=False)
+            self._next_check = time.monotonic() + self.reload_interval
+
+    def _scan(self, strict: bool) -> Dict[str, Tuple[int, str]]:
+        """Read changed instruction files from disk and validate them."""
+        instructions = {}
+        for fname in os.listdir(self.instructions_dir):
+            if not fname.endswith(".txt"):
+                continue
+            path = os.path.join(self.instructions_dir, fname)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                # Deleted or renamed between listing the directory and reading it
+                continue
+            previous = self._instructions.get(fname)
+            if previous and previous[0] == mtime:
+                instructions[fname] = previous
+                continue
+            error = None
+            try:
+                text = file_service.load_prompt_from_file(path)
+                if not text.strip():
+                    error = f"Instruction template {fname} is empty."
+            except Exception as e:
+                error = str(e)
+            if error is None:
+                instructions[fname] = (mtime, text)
+            elif strict:
+                raise Exception(error)
+            else:
+                # A half-written file must not break live requests
+                print(f"Keeping previous instruction template: {error}")
+                if previous:
+                    instructions[fname] = previous
+
+        missing = [name for name in REQUIRED_INSTRUCTIONS if name not in instructions]
+        if missing:
+            if strict:
+                raise Exception(f"Missing instruction templates: {', '.join(missing)}")
+            print(f"Missing instruction templates: {', '.join(missing)}")
+            for name in missing:
+                if name in self._instructions:
+                    instructions[name] = self._instructions[name]
+        return instructions
+
+
+instruction_service = InstructionService(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "instructions")
+)
@@ -0,0 +1,330 @@
+"""Chat completion backends and latency-based routing between them"""
+
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+import httpx
+from src.services.llm_service import llm_service
+from src.services.llm_usage_service import llm_usage_service
+from src.utils.resilience import (
+    ResilientCaller,
+    RetryableError,
+    CircuitOpenError,
+    parse_retry_after,
+)
+from src.utils.rate_limiter import RateLimiter, RateLimitExceeded
+
+# Responses that are worth retrying: throttling and transient upstream errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Failures after which another backend may still answer the request
+FALLBACK_ERRORS = (RetryableError, CircuitOpenError, RateLimitExceeded)
+
+
+class LLMBackend:
+    """
+    One OpenAI-compatible chat completions endpoint, e.g. Azure or a local
+    LM Studio/Ollama server, with its own connection pool, retries and health stats.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        endpoint: str,
+        headers: Dict[str, Any],
+        resilience: ResilientCaller,
+        model: Optional[str] = None,
+        vision: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        timeout: float = 25.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        prompt_price: float = 0.0,
+        completion_price: float = 0.0,
+    ):
+        self.name = name
+        self.endpoint = endpoint
+        self.headers = headers
+        self.resilience = resilience
+        # OpenAI-compatible servers pick the model from the body, Azure from the deployment
+        self.model = model
+        self.vision = vision
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        # Price per 1000 tokens, used for cost accounting
+        self.prices = (prompt_price, completion_price)
+        self.client: Optional[httpx.AsyncClient] = None
+        # Exponentially weighted latency of successful calls and failure rate
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.last_observed = 0.0
+        self.metrics = {"requests": 0, "failures": 0}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled keep-alive client used for every call to this backend."""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        # Unset values such as a missing api key are left out, as requests used to do
+        headers = {k: v for k, v in self.headers.items() if v is not None}
+        try:
+            return httpx.AsyncClient(
+                headers=headers, limits=limits, timeout=timeout, http2=self.http2
+            )
+        except ImportError:
+            # HTTP/2 needs the optional h2 package
+            print("LLM_HTTP2 is enabled but h2 is not installed, using HTTP/1.1")
+            return httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout)
+
+    async def startup(self):
+        """Open the HTTP client of this backend."""
+        if self.client is None or self.client.is_closed:
+            self.client = self._create_client()
+
+    async def shutdown(self):
+        """Close the HTTP client and its pooled connections."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """The configured model, used when a response does not name one."""
+        return self.model or self.headers.get("model")
+
+    def _body(self, data: Dict[str, Any], **extra) -> Dict[str, Any]:
+        if self.model:
+            return {**data, "model": self.model, **extra}
+        return {**data, **extra}
+
+    async def complete(self, data: Dict[str, Any]) -> str:
+        """Send a chat completion request through the resilience layer."""
+        if self.client is None or self.client.is_closed:
+            # Scripts and tests may call the service without the app lifespan
+            await self.startup()
+        await self._acquire_quota(data)
+        start = time.monotonic()
+        try:
+            content, usage, model = await self.resilience.call(lambda: self._send_once(data))
+        except FALLBACK_ERRORS:
+            self.record(time.monotonic() - start, ok=False)
+            raise
+        latency = time.monotonic() - start
+        self.record(latency, ok=True)
+        llm_usage_service.record(
+            self.name, model or self.model_name, data, content, usage, latency, self.prices
+        )
+        return content
+
+    async def open_stream(self, data: Dict[str, Any]) -> httpx.Response:
+        """Open a streaming chat completion through the resilience layer."""
+        if self.client is None or self.client.is_closed:
+            await self.startup()
+        await self._acquire_quota(data)
+        start = time.monotonic()
+        try:
+            # A response that loses a hedge race must be closed to free its connection
+            response = await self.resilience.call(
+                lambda: self._open_stream_once(data), discard=lambda r: r.aclose()
+            )
+        except FALLBACK_ERRORS:
+            self.record(time.monotonic() - start, ok=False)
+            raise
+        # Time to headers is the latency a streaming caller waits before the first token
+        self.record(time.monotonic() - start, ok=True)
+        return response
+
+    def record(self, latency: Optional[float], ok: bool, alpha: float = 0.3) -> None:
+        """Fold one observation into the latency and error averages."""
+        self.metrics["requests"] += 1
+        if not ok:
+            self.metrics["failures"] += 1
+        self.error_ewma = (1 - alpha) * self.error_ewma + alpha * (0.0 if ok else 1.0)
+        if ok and latency is not None:
+            self.latency_ewma = (
+                latency
+                if self.latency_ewma is None
+                else (1 - alpha) * self.latency_ewma + alpha * latency
+            )
+        self.last_observed = time.monotonic()
+
+    async def _acquire_quota(self, data: Dict[str, Any]) -> None:
+        if self.rate_limiter is not None:
+            # Charged once per logical request; retries and hedged duplicates
+            # of it are not queued again
+            await self.rate_limiter.acquire(llm_service.estimate_tokens(data))
+
+    def _raise_if_retryable(self, response: httpx.Response) -> None:
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(
+                f"{self.name} request failed with status {response.status_code}",
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                counts_as_failure=response.status_code != 429,
+            )
+
+    async def _send_once(
+        self, data: Dict[str, Any]
+    ) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """Send one chat completion request and return the content, usage and model."""
+        try:
+            response = await self.client.post(self.endpoint, json=self._body(data))
+        except httpx.TransportError as e:
+            # Timeouts and connection errors are transient
+            raise RetryableError(f"{self.name} request failed: {e}") from e
+
+        self._raise_if_retryable(response)
+
+        try:
+            response.raise_for_status()
+            response_data = response.json()
+
+            if "choices" not in response_data:
+                raise ValueError("The response does not contain 'choices'")
+
+            return (
+                response_data["choices"][0]["message"]["content"],
+                response_data.get("usage"),
+                response_data.get("model"),
+            )
+
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"API request failed: {e}") from e
+        except Exception as e:
+            raise RuntimeError(f"Error processing response: {e}") from e
+
+    async def _open_stream_once(self, data: Dict[str, Any]) -> httpx.Response:
+        """Send a streaming chat completion request and return the open response."""
+        request = self.client.build_request(
+            "POST", self.endpoint, json=self._body(data, stream=True)
+        )
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.TransportError as e:
+            raise RetryableError(f"{self.name} request failed: {e}") from e
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            await response.aclose()
+            self._raise_if_retryable(response)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            raise RuntimeError(
+                f"API request failed with status {response.status_code}: {response.text}"
+            )
+        return response
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return health stats plus the resilience and rate limit metrics."""
+        return {
+            **self.metrics,
+            "latency_ewma_seconds": self.latency_ewma,
+            "error_rate": self.error_ewma,
+            "vision": self.vision,
+            "resilience": self.resilience.get_metrics(),
+            "rate_limit": self.rate_limiter.get_metrics() if self.rate_limiter else None,
+        }
+
+
+class LLMRouter:
+    """
+    Pick backends by observed latency and error rate.
+    Backends are listed by preference; a preferred backend that became slow,
+    error-prone or whose circuit is open is tried after the healthy ones, and
+    is given traffic again once its stats are older than recovery_seconds.
+    """
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        slow_threshold: float = 15.0,
+        max_error_rate: float = 0.5,
+        recovery_seconds: float = 30.0,
+    ):
+        self.backends = backends
+        self.slow_threshold = slow_threshold
+        self.max_error_rate = max_error_rate
+        self.recovery_seconds = recovery_seconds
+        self.metrics = {"fallbacks": 0, "rerouted": 0}
+
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+
+    def is_healthy(self, backend: LLMBackend) -> bool:
+        """Return whether a backend should get traffic at its preferred position."""
+        if backend.resilience.breaker.is_open():
+            return False
+        if time.monotonic() - backend.last_observed > self.recovery_seconds:
+            # Old observations say little; let a request probe the backend again
+            return True
+        if backend.error_ewma > self.max_error_rate:
+            return False
+        return backend.latency_ewma is None or backend.latency_ewma <= self.slow_threshold
+
+    def candidates(self, data: Dict[str, Any]) -> List[LLMBackend]:
+        """Order the backends able to serve a request, healthy ones first."""
+        needs_vision = llm_service.has_image(data)
+        eligible = [b for b in self.backends if b.vision or not needs_vision]
+        healthy = [b for b in eligible if self.is_healthy(b)]
+        degraded = sorted(
+            (b for b in eligible if b not in healthy),
+            key=lambda b: (b.error_ewma, b.latency_ewma or 0.0),
+        )
+        ordered = healthy + degraded
+        if ordered and eligible and ordered[0] is not eligible[0]:
+            self.metrics["rerouted"] += 1
+        return ordered
+
+    async def complete(self, data: Dict[str, Any]) -> Tuple[str, LLMBackend]:
+        """Return the completion and the backend that produced it."""
+        return await self._first_success(data, lambda b: b.complete(data))
+
+    async def open_stream(self, data: Dict[str, Any]) -> Tuple[httpx.Response, LLMBackend]:
+        """Open a streaming completion on the first backend that accepts it."""
+        return await self._first_success(data, lambda b: b.open_stream(data))
+
+    async def _first_success(
+        self, data: Dict[str, Any], call: Callable[[LLMBackend], Awaitable[Any]]
+    ) -> Tuple[Any, LLMBackend]:
+        backends = self.candidates(data)
+        if not backends:
+            raise RuntimeError("No LLM backend can serve this request")
+        error = None
+        for index, backend in enumerate(backends):
+            if index:
+                self.metrics["fallbacks"] += 1
+            try:
+                return await call(backend), backend
+            except FALLBACK_ERRORS as e:
+                # Client errors such as a 400 are not retried elsewhere
+                print(f"LLM backend {backend.name} failed: {str(e)}")
+                error = e
+        raise error
+
+    async def startup(self):
+        for backend in self.backends:
+            await backend.startup()
+
+    async def shutdown(self):
+        for backend in self.backends:
+            await backend.shutdown()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return routing counters and per-backend health."""
+        return {
+            **self.metrics,
+            "backends": {
+                backend.name: {**backend.get_metrics(), "healthy": self.is_healthy(backend)}
+                for backend in self.backends
+            },
+        }
@@ -0,0 +1,150 @@
+"""Module for caching LLM responses"""
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from src.models.llm_cache import LLMCacheEntry
+
+
+class LLMCacheService:
+    """In-memory LRU cache with TTL and an optional Postgres-backed tier."""
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.ttl = float(os.getenv("LLM_CACHE_TTL", "3600"))
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+        self.persistent = os.getenv("LLM_CACHE_PERSISTENT", "false").lower() == "true"
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # The llm.responses table is created by utils/create_tables.py
+        self._purged = False
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "persistent_hits": 0,
+            "stores": 0,
+            "evictions": 0,
+            "persistent_errors": 0,
+        }
+
+    def make_key(self, endpoint: str, headers: Dict[str, Any], data: Dict[str, Any]) -> str:
+        """Hash the endpoint, model and request body into a canonical cache key."""
+        canonical = json.dumps(
+            {"endpoint": endpoint, "model": headers.get("model"), "data": data},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, falling back to the persistent tier on a memory miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.metrics["hits"] += 1
+                return value
+            del self._entries[key]
+
+        if self.persistent:
+            value = await self._get_persistent(key)
+            if value is not None:
+                self.metrics["persistent_hits"] += 1
+                self._store_memory(key, value)
+                return value
+
+        self.metrics["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a response in memory and, when enabled, in Postgres."""
+        self._store_memory(key, value)
+        self.metrics["stores"] += 1
+        if self.persistent:
+            await self._set_persistent(key, value)
+
+    def clear(self) -> None:
+        """Drop every in-memory entry."""
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current cache size."""
+        lookups = self.metrics["hits"] + self.metrics["persistent_hits"] + self.metrics["misses"]
+        hits = self.metrics["hits"] + self.metrics["persistent_hits"]
+        return {
+            **self.metrics,
+            "size": len(self._entries),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    def _store_memory(self, key: str, value: str) -> None:
+        """Insert into the LRU, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    async def _purge_expired(self, db) -> None:
+        """Delete expired rows once per process; reads skip them anyway."""
+        if self._purged:
+            return
+        await db.execute(
+            delete(LLMCacheEntry).where(
+                LLMCacheEntry.expires_at < datetime.now(timezone.utc)
+            )
+        )
+        await db.commit()
+        self._purged = True
+
+    async def _get_persistent(self, key: str) -> Optional[str]:
+        """Read a non-expired response from Postgres."""
+        # Imported lazily so the database engine is only built when the tier is used
+        from src.db.session import AsyncSessionLocal
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await self._purge_expired(db)
+                result = await db.execute(
+                    select(LLMCacheEntry.response).where(
+                        LLMCacheEntry.key == key,
+                        LLMCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+                return result.scalars().first()
+        except Exception as e:
+            # The cache must never fail the LLM call itself
+            self.metrics["persistent_errors"] += 1
+            print(f"Error reading LLM cache: {str(e)}")
+            return None
+
+    async def _set_persistent(self, key: str, value: str) -> None:
+        """Upsert a response into Postgres."""
+        from src.db.session import AsyncSessionLocal
+
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = insert(LLMCacheEntry).values(
+                    key=key, response=value, expires_at=expires_at
+                )
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[LLMCacheEntry.key],
+                        set_={"response": value, "expires_at": expires_at},
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            self.metrics["persistent_errors"] += 1
+            print(f"Error writing LLM cache: {str(e)}")
+
+
+llm_cache_service = LLMCacheService()
@@ -1,7 +1,10 @@
 """Module for LLM service"""
 
 from typing import Optional, Dict, Any, List
-from src.utils.image_utils import validate_image_url
+from src.utils.image_utils import image_mime_type
+
+# Rough cost of one high-detail image input, used for quota estimates
+IMAGE_TOKEN_ESTIMATE = 765
 
 
 class LLMService:
@@ -21,6 +24,7 @@ class LLMService:
     ) -> List[Dict[str, Any]]:
         """
         Create messages for LLM requests with optional image content.
+        Image URLs are expected to be validated by the caller.
         """
         messages = [
             {"role": "system", "content": system_prompt},
@@ -28,7 +32,6 @@ class LLMService:
         ]
 
         if image_url:
-            validate_image_url(image_url)
             messages[1]["content"].append(
                 {"type": "image_url", "image_url": {"url": image_url, "detail": "high"}}
             )
@@ -36,7 +39,9 @@ class LLMService:
             messages[1]["content"].append(
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
+                    "image_url": {
+                        "url": f"data:{image_mime_type(image_base64)};base64,{image_base64}"
+                    },
                 }
             )
 
@@ -58,5 +63,40 @@ class LLMService:
 
         return data
 
+    def count_images(self, data: Dict[str, Any]) -> int:
+        """Count the image inputs of a request."""
+        return sum(
+            1
+            for message in data.get("messages", [])
+            if isinstance(message.get("content"), list)
+            for part in message["content"]
+            if part.get("type") == "image_url"
+        )
+
+    def has_image(self, data: Dict[str, Any]) -> bool:
+        """Return whether a request contains image input."""
+        return self.count_images(data) > 0
+
+    def estimate_prompt_tokens(self, data: Dict[str, Any]) -> int:
+        """Estimate the input tokens of a request."""
+        chars = 0
+        for message in data.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, str):
+                chars += len(content)
+                continue
+            for part in content or []:
+                if part.get("type") == "text":
+                    chars += len(part.get("text", ""))
+        # Roughly four characters per token for English text
+        return chars // 4 + self.count_images(data) * IMAGE_TOKEN_ESTIMATE
+
+    def estimate_tokens(self, data: Dict[str, Any]) -> int:
+        """
+        Estimate the tokens a request counts against a TPM quota.
+        Azure reserves max_tokens up front, so it is included with the prompt.
+        """
+        return self.estimate_prompt_tokens(data) + int(data.get("max_tokens", 0))
+
 
 llm_service = LLMService()
@@ -0,0 +1,379 @@
+"""Module for accounting LLM token usage"""
+
+import os
+import asyncio
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from typing import Optional, Dict, Any, List, Set, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from src.models.llm_usage import LLMUsageDaily
+from src.services.llm_service import llm_service, IMAGE_TOKEN_ESTIMATE
+
+KEY_COLUMNS = ("day", "team_id", "user_id", "endpoint", "backend", "model")
+COUNTERS = (
+    "calls",
+    "estimated_calls",
+    "prompt_tokens",
+    "completion_tokens",
+    "image_tokens",
+    "cached_tokens",
+    "total_tokens",
+    "latency_ms_total",
+    "cost",
+)
+GROUP_COLUMNS = {
+    "team": "team_id",
+    "user": "user_id",
+    "endpoint": "endpoint",
+    "backend": "backend",
+    "model": "model",
+}
+# Keep each upsert well below the Postgres bind parameter limit
+FLUSH_CHUNK_ROWS = 500
+
+# Who triggered the current LLM call, set for every request by UsageContextMiddleware
+usage_context: ContextVar[Optional[Dict[str, str]]] = ContextVar(
+    "llm_usage_context", default=None
+)
+
+
+class UsageContextMiddleware:
+    """
+    Remember the path, bearer token and X-Team-Id header of each request so LLM
+    calls can be attributed. The token is only decoded when a call is recorded,
+    and the claimed team is checked against the user's memberships before the
+    usage is stored or reported.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        token = usage_context.set(
+            {
+                "endpoint": scope.get("path", ""),
+                "authorization": headers.get(b"authorization", b"").decode("latin-1"),
+                "team_id": headers.get(b"x-team-id", b"").decode("latin-1"),
+            }
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            usage_context.reset(token)
+
+
+class LLMUsageService:
+    """
+    Aggregate token usage in memory and flush it to Postgres in batches.
+    The llm.usage_daily table is created by utils/create_tables.py.
+    """
+
+    def __init__(self):
+        self.persistent = os.getenv("LLM_USAGE_PERSISTENT", "false").lower() == "true"
+        self.flush_interval = float(os.getenv("LLM_USAGE_FLUSH_INTERVAL", "30"))
+        # Upper bound on the rows kept in memory while flushes keep failing
+        self.max_pending_rows = int(os.getenv("LLM_USAGE_MAX_PENDING_ROWS", "10000"))
+        self._pending: Dict[Tuple, Dict[str, float]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.metrics = {
+            "recorded": 0,
+            "flushes": 0,
+            "flushed_rows": 0,
+            "flush_errors": 0,
+            "dropped_rows": 0,
+        }
+
+    def record(
+        self,
+        backend: str,
+        model: Optional[str],
+        data: Dict[str, Any],
+        content: str,
+        usage: Optional[Dict[str, Any]],
+        latency: float,
+        prices: Tuple[float, float] = (0.0, 0.0),
+    ) -> None:
+        """
+        Add one completed call to the in-memory aggregate.
+        Without a usage block, e.g. for streams, tokens are estimated from the text.
+        """
+        images = llm_service.count_images(data)
+        if usage:
+            prompt_tokens = int(usage.get("prompt_tokens") or 0)
+            completion_tokens = int(usage.get("completion_tokens") or 0)
+            total_tokens = int(usage.get("total_tokens") or prompt_tokens + completion_tokens)
+            details = usage.get("prompt_tokens_details") or {}
+            cached_tokens = int(details.get("cached_tokens") or 0)
+            # Azure folds image input into prompt_tokens, so estimate its share
+            image_tokens = int(details.get("image_tokens") or images * IMAGE_TOKEN_ESTIMATE)
+        else:
+            prompt_tokens = llm_service.estimate_prompt_tokens(data)
+            completion_tokens = len(content or "") // 4
+            total_tokens = prompt_tokens + completion_tokens
+            cached_tokens = 0
+            image_tokens = images * IMAGE_TOKEN_ESTIMATE
+
+        context = usage_context.get() or {}
+        key = (
+            datetime.now(timezone.utc).date(),
+            self._team_id(context),
+            self._user_id(context),
+            (context.get("endpoint") or "background")[:255],
+            backend,
+            (model or "unknown")[:64],
+        )
+        row = self._pending.get(key)
+        if row is None:
+            row = self._pending[key] = {name: 0 for name in COUNTERS + ("latency_ms_max",)}
+        latency_ms = latency * 1000
+        row["calls"] += 1
+        row["estimated_calls"] += 0 if usage else 1
+        row["prompt_tokens"] += prompt_tokens
+        row["completion_tokens"] += completion_tokens
+        row["image_tokens"] += image_tokens
+        row["cached_tokens"] += cached_tokens
+        row["total_tokens"] += total_tokens
+        row["latency_ms_total"] += latency_ms
+        row["latency_ms_max"] = max(row["latency_ms_max"], latency_ms)
+        row["cost"] += (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000
+        self.metrics["recorded"] += 1
+
+    @staticmethod
+    def _team_id(context: Dict[str, str]) -> int:
+        team_id = context.get("team_id") or ""
+        return int(team_id) if team_id.isdigit() else 0
+
+    @staticmethod
+    def _user_id(context: Dict[str, str]) -> str:
+        scheme, _, token = (context.get("authorization") or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return ""
+        # Imported lazily so services and scripts do not pull in the auth stack
+        from src.core.security import decode_access_token
+
+        return (decode_access_token(token) or "")[:64]
+
+    async def startup(self):
+        """Start flushing in the background, called from the app lifespan."""
+        if self.persistent and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def shutdown(self):
+        """Stop the background flush and write out what is left."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Upsert the pending aggregate into Postgres and return the rows written."""
+        if not self.persistent or not self._pending:
+            return 0
+        # Imported lazily so the database engine is only built when persistence is enabled
+        from src.db.session import AsyncSessionLocal
+
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            try:
+                async with AsyncSessionLocal() as db:
+                    rows = [
+                        {**dict(zip(KEY_COLUMNS, key)), **values}
+                        for key, values in self._attribute_teams(
+                            pending, await self._allowed_teams(db, pending)
+                        ).items()
+                    ]
+                    for start in range(0, len(rows), FLUSH_CHUNK_ROWS):
+                        stmt = insert(LLMUsageDaily).values(rows[start : start + FLUSH_CHUNK_ROWS])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=list(KEY_COLUMNS),
+                            set_={
+                                **{
+                                    name: getattr(LLMUsageDaily, name)
+                                    + getattr(stmt.excluded, name)
+                                    for name in COUNTERS
+                                },
+                                "latency_ms_max": func.greatest(
+                                    LLMUsageDaily.latency_ms_max, stmt.excluded.latency_ms_max
+                                ),
+                                "updated_at": func.now(),
+                            },
+                        )
+                        await db.execute(stmt)
+                    await db.commit()
+            except Exception as e:
+                # Keep the numbers and try again with the next flush
+                self.metrics["flush_errors"] += 1
+                print(f"Error flushing LLM usage: {str(e)}")
+                self._merge(pending)
+                return 0
+
+        self.metrics["flushes"] += 1
+        self.metrics["flushed_rows"] += len(rows)
+        return len(rows)
+
+    def _merge(self, pending: Dict[Tuple, Dict[str, float]]) -> None:
+        """
+        Put the rows of a failed flush back in front of those recorded since,
+        dropping the oldest once there are more than max_pending_rows.
+        """
+        merged = pending
+        for key, values in self._pending.items():
+            row = merged.get(key)
+            if row is None:
+                merged[key] = values
+                continue
+            for name in COUNTERS:
+                row[name] += values[name]
+            row["latency_ms_max"] = max(row["latency_ms_max"], values["latency_ms_max"])
+        overflow = len(merged) - max(0, self.max_pending_rows)
+        if overflow > 0:
+            for key in list(merged)[:overflow]:
+                del merged[key]
+            self.metrics["dropped_rows"] += overflow
+            print(f"Dropped {overflow} rows of LLM usage after failed flushes")
+        self._pending = merged
+
+    @staticmethod
+    async def _allowed_teams(db, pending: Dict[Tuple, Dict[str, float]]) -> Set[Tuple[int, str]]:
+        """Return the (team_id, user_id) pairs of the pending rows backed by a membership."""
+        claimed = {(key[1], key[2]) for key in pending if key[1] and key[2]}
+        if not claimed:
+            return set()
+        # Imported lazily so recording usage does not pull in the team models
+        from src.models.team import TeamMember
+        from src.models.user import User
+
+        result = await db.execute(
+            select(TeamMember.team_id, User.user_id)
+            .join(User, User.id == TeamMember.user_id)
+            .where(
+                TeamMember.team_id.in_({team_id for team_id, _ in claimed}),
+                User.user_id.in_({user_id for _, user_id in claimed}),
+            )
+        )
+        return {(team_id, user_id) for team_id, user_id in result.all()}
+
+    @staticmethod
+    def _attribute_teams(
+        pending: Dict[Tuple, Dict[str, float]], allowed: Set[Tuple[int, str]]
+    ) -> Dict[Tuple, Dict[str, float]]:
+        """
+        Move usage claimed for a team the caller is not a member of to team 0,
+        since X-Team-Id is sent by the client.
+        """
+        attributed: Dict[Tuple, Dict[str, float]] = {}
+        for key, values in pending.items():
+            if key[1] and (key[1], key[2]) not in allowed:
+                key = (key[0], 0) + key[2:]
+            row = attributed.get(key)
+            if row is None:
+                attributed[key] = dict(values)
+                continue
+            for name in COUNTERS:
+                row[name] += values[name]
+            row["latency_ms_max"] = max(row["latency_ms_max"], values["latency_ms_max"])
+        return attributed
+
+    async def rollup(
+        self,
+        start: date,
+        end: date,
+        group_by: str = "team",
+        team_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Sum usage per day and per team, user, endpoint, backend or model."""
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+        column = GROUP_COLUMNS[group_by]
+        totals: Dict[Tuple[date, str], Dict[str, float]] = {}
+
+        if self.persistent:
+            # Include calls that are still waiting for the next flush
+            await self.flush()
+            from src.db.session import AsyncSessionLocal
+
+            group = getattr(LLMUsageDaily, column)
+            stmt = (
+                select(
+                    LLMUsageDaily.day,
+                    group,
+                    *(func.sum(getattr(LLMUsageDaily, name)) for name in COUNTERS),
+                    func.max(LLMUsageDaily.latency_ms_max),
+                )
+                .where(LLMUsageDaily.day >= start, LLMUsageDaily.day <= end)
+                .group_by(LLMUsageDaily.day, group)
+            )
+            if team_id is not None:
+                stmt = stmt.where(LLMUsageDaily.team_id == team_id)
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(stmt)
+                for day, value, *sums in result.all():
+                    totals[(day, str(value))] = dict(
+                        zip(COUNTERS + ("latency_ms_max",), (float(s or 0) for s in sums))
+                    )
+        else:
+            pending = dict(self._pending)
+            try:
+                from src.db.session import AsyncSessionLocal
+
+                async with AsyncSessionLocal() as db:
+                    allowed = await self._allowed_teams(db, pending)
+            except Exception as e:
+                # Without the database no team claim can be confirmed
+                print(f"Error checking team memberships: {str(e)}")
+                allowed = set()
+            for key, values in self._attribute_teams(pending, allowed).items():
+                fields = dict(zip(KEY_COLUMNS, key))
+                if not start <= fields["day"] <= end:
+                    continue
+                if team_id is not None and fields["team_id"] != team_id:
+                    continue
+                row = totals.setdefault(
+                    (fields["day"], str(fields[column])),
+                    {name: 0 for name in COUNTERS + ("latency_ms_max",)},
+                )
+                for name in COUNTERS:
+                    row[name] += values[name]
+                row["latency_ms_max"] = max(row["latency_ms_max"], values["latency_ms_max"])
+
+        return [
+            {
+                "day": day,
+                "group": value,
+                **{
+                    name: int(row[name])
+                    for name in COUNTERS
+                    if name not in ("latency_ms_total", "cost")
+                },
+                "avg_latency_ms": row["latency_ms_total"] / row["calls"] if row["calls"] else 0.0,
+                "max_latency_ms": row["latency_ms_max"],
+                "cost": round(row["cost"], 6),
+            }
+            for (day, value), row in sorted(totals.items())
+        ]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return recording and flush counters."""
+        return {
+            **self.metrics,
+            "persistent": self.persistent,
+            "pending_rows": len(self._pending),
+        }
+
+
+llm_usage_service = LLMUsageService()
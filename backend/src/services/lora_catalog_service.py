@@ -0,0 +1,134 @@
+"""Module for the cached LoRA catalog of the ComfyUI server"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Optional, Dict, Any, Tuple
+import httpx
+from src.core.config import load_env
+
+load_env()
+
+
+class LoraCatalogService:
+    """
+    LoRA names listed by ComfyUI, kept in memory.
+    The last good copy is served right away; once it is older than ttl it is
+    refreshed in the background (stale-while-revalidate), so a slow or
+    unreachable ComfyUI server never holds up the styles page.
+    """
+
+    def __init__(self):
+        self.url = os.getenv("LORA_URL")
+        self.timeout = float(os.getenv("LORA_CATALOG_TIMEOUT", "5"))
+        self.ttl = float(os.getenv("LORA_CATALOG_TTL", "60"))
+        # Wait this long after a failed refresh before trying again
+        self.retry_interval = float(os.getenv("LORA_CATALOG_RETRY_INTERVAL", "10"))
+        self._styles: Optional[Tuple[Dict[str, str], ...]] = None
+        self.etag: Optional[str] = None
+        self._upstream_etag: Optional[str] = None
+        self._fetched_at = 0.0
+        self._retry_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.metrics = {
+            "hits": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "not_modified": 0,
+            "refresh_errors": 0,
+        }
+
+    async def get_styles(self) -> Tuple[Dict[str, str], ...]:
+        """Return the LoRA styles, waiting for ComfyUI only if none were loaded yet."""
+        if self._styles is None:
+            if self._refreshing is None and time.monotonic() < self._retry_at:
+                # Fail fast instead of making every request wait for a down server
+                raise ConnectionError("Could not connect to ComfyUI server, retrying shortly")
+            # Shielded so one client going away does not cancel the load for the others
+            await asyncio.shield(self._start_refresh())
+            self.metrics["hits"] += 1
+            return self._styles
+        if self.age > self.ttl:
+            self.metrics["stale_hits"] += 1
+            if time.monotonic() >= self._retry_at:
+                self._start_refresh()
+        else:
+            self.metrics["hits"] += 1
+        return self._styles
+
+    @property
+    def age(self) -> float:
+        """Seconds since the catalog was last confirmed by ComfyUI."""
+        return time.monotonic() - self._fetched_at if self._styles is not None else 0.0
+
+    async def startup(self):
+        """Open the HTTP client and start loading the catalog without waiting for it."""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout))
+        if self.url and self._styles is None:
+            self._start_refresh()
+
+    async def shutdown(self):
+        """Cancel a running refresh and close the HTTP client."""
+        if self._refreshing is not None:
+            self._refreshing.cancel()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is running, and return it."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            self._refreshing.add_done_callback(self._refresh_done)
+        return self._refreshing
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshing = None
+        # The error is already logged and counted; requests retry after retry_interval
+        if task.cancelled() or task.exception() is not None:
+            self._retry_at = time.monotonic() + self.retry_interval
+
+    async def _refresh(self) -> None:
+        """Fetch the LoRA list, sending the last upstream ETag if ComfyUI gave one."""
+        if not self.url:
+            raise ConnectionError("LORA_URL is not configured")
+        if self.client is None or self.client.is_closed:
+            await self.startup()
+        headers = {"If-None-Match": self._upstream_etag} if self._upstream_etag else {}
+        try:
+            response = await self.client.get(self.url, headers=headers)
+            if response.status_code == 304 and self._styles is not None:
+                self.metrics["not_modified"] += 1
+                self._fetched_at = time.monotonic()
+                return
+            response.raise_for_status()
+            loras = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.metrics["refresh_errors"] += 1
+            print(f"Error refreshing LoRA catalog: {str(e)}")
+            raise ConnectionError(f"Could not connect to ComfyUI server: {e}") from e
+
+        styles = tuple({"id": lora, "name": lora, "styleType": "lora"} for lora in loras)
+        self.etag = hashlib.sha256(
+            json.dumps(loras, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        self._styles = styles
+        self._upstream_etag = response.headers.get("ETag")
+        self._fetched_at = time.monotonic()
+        self.metrics["refreshes"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return cache counters and the age of the catalog."""
+        return {
+            **self.metrics,
+            "size": len(self._styles or ()),
+            "age_seconds": self.age,
+            "refreshing": self._refreshing is not None,
+        }
+
+
+lora_catalog_service = LoraCatalogService()
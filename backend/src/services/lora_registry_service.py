@@ -0,0 +1,120 @@
+"""Module for keeping the LoRA registry in sync with ComfyUI"""
+
+import os
+import time
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import select
+from src.crud.lora import lora as lora_crud
+from src.models.lora import Lora
+from src.services.lora_catalog_service import lora_catalog_service
+
+
+class LoraRegistryService:
+    """
+    Reconcile the lora.loras table with the ComfyUI LoRA list in the background,
+    and keep the metadata generation needs, such as trigger words, in memory.
+    The table is created by utils/create_tables.py.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LORA_REGISTRY_ENABLED", "false").lower() == "true"
+        self.interval = float(os.getenv("LORA_RECONCILE_INTERVAL", "300"))
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_reconciled: Optional[float] = None
+        self.metrics = {"reconciles": 0, "added": 0, "availability_changes": 0, "errors": 0}
+
+    async def startup(self):
+        """Start reconciling in the background, called from the app lifespan."""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._reconcile_periodically())
+
+    async def shutdown(self):
+        """Stop the background reconciler."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reconcile_periodically(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                # ComfyUI or the database may be down; try again next round
+                self.metrics["errors"] += 1
+                print(f"Error reconciling LoRA registry: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def reconcile(self) -> Tuple[int, int]:
+        """Sync the table with ComfyUI and reload the metadata, return (added, changed)."""
+        # Imported lazily so the database engine is only built when the registry is used
+        from src.db.session import AsyncSessionLocal
+
+        names = [style["name"] for style in await lora_catalog_service.get_styles()]
+        async with AsyncSessionLocal() as db:
+            added, changed = (0, 0)
+            # An empty list is more likely a ComfyUI hiccup than every LoRA being removed
+            if names:
+                added, changed = await lora_crud.sync_names(db, names=names)
+            await self._load(db)
+
+        self.last_reconciled = time.monotonic()
+        self.metrics["reconciles"] += 1
+        self.metrics["added"] += added
+        self.metrics["availability_changes"] += changed
+        return added, changed
+
+    async def _load(self, db) -> None:
+        result = await db.execute(
+            select(Lora.name, Lora.trigger_words, Lora.base_strength, Lora.clip_skip).where(
+                Lora.available.is_(True)
+            )
+        )
+        self._metadata = {
+            name: {
+                "trigger_words": trigger_words,
+                "base_strength": base_strength,
+                "clip_skip": clip_skip,
+            }
+            for name, trigger_words, base_strength, clip_skip in result.all()
+        }
+
+    def update_entry(self, lora: Lora) -> None:
+        """Apply edited metadata right away instead of at the next reconcile."""
+        if not lora.available:
+            self._metadata.pop(lora.name, None)
+            return
+        self._metadata[lora.name] = {
+            "trigger_words": lora.trigger_words,
+            "base_strength": lora.base_strength,
+            "clip_skip": lora.clip_skip,
+        }
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the cached metadata of a LoRA, if it is registered."""
+        return self._metadata.get(name)
+
+    def trigger_words(self, names: List[str]) -> str:
+        """Return the trigger words of the given LoRAs, comma separated."""
+        words = [
+            (self._metadata.get(name) or {}).get("trigger_words") for name in names
+        ]
+        return ", ".join(w.strip() for w in words if w and w.strip())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return reconcile counters and the number of available LoRAs."""
+        return {
+            **self.metrics,
+            "size": len(self._metadata),
+            "seconds_since_reconcile": (
+                time.monotonic() - self.last_reconciled if self.last_reconciled else None
+            ),
+        }
+
+
+lora_registry_service = LoraRegistryService()
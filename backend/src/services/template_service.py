@@ -0,0 +1,204 @@
+"""Module for the in-memory template catalog"""
+
+import os
+import re
+import tempfile
+import threading
+from math import gcd
+from typing import Dict, List, Optional, Tuple
+from src.schemas.template import TemplateInfo
+from src.services.file_service import file_service
+from src.utils.image_utils import compute_alpha_regions
+
+# Thumbnail edge lengths served to the gallery and their encodings
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+THUMBNAIL_FORMATS = {"webp": ("WEBP", "image/webp"), "png": ("PNG", "image/png")}
+
+# Matches "<family>[_<w>_<h>][_optional]" template stems
+TEMPLATE_STEM_PATTERN = re.compile(
+    r"^(?P<family>.+?)(?:_(?P<w>\d+)_(?P<h>\d+))?(?:_optional)?$"
+)
+
+
+class TemplateService:
+    """Index of the PNG templates, rebuilt when the templates directory changes."""
+
+    def __init__(self, templates_dir: str):
+        self.templates_dir = templates_dir
+        self.thumbnail_dir = os.getenv(
+            "THUMBNAIL_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "adsgen-thumbnails"),
+        )
+        self._lock = threading.Lock()
+        self._entries: Dict[str, TemplateInfo] = {}
+        self._by_stem: Dict[str, TemplateInfo] = {}
+        self._dir_mtime: Optional[int] = None
+        self._alpha_regions: Dict[Tuple[str, int], List[Tuple[int, int, int, int]]] = {}
+
+    def refresh(self, force: bool = False) -> None:
+        """Rebuild the index if the templates directory changed since the last scan."""
+        dir_mtime = os.stat(self.templates_dir).st_mtime_ns
+        if not force and dir_mtime == self._dir_mtime:
+            return
+        with self._lock:
+            if not force and dir_mtime == self._dir_mtime:
+                return
+            entries = {}
+            with os.scandir(self.templates_dir) as it:
+                for dir_entry in it:
+                    if dir_entry.is_file() and dir_entry.name.lower().endswith(".png"):
+                        previous = self._entries.get(dir_entry.name)
+                        try:
+                            stat = dir_entry.stat()
+                            if previous and previous.mtime == stat.st_mtime_ns:
+                                entries[dir_entry.name] = previous
+                            else:
+                                entries[dir_entry.name] = self._build_entry(
+                                    dir_entry.name, dir_entry.path, stat
+                                )
+                        except OSError as e:
+                            # One corrupt or half-copied file must not hide the other templates
+                            print(f"Skipping unreadable template {dir_entry.name}: {str(e)}")
+            self._entries = dict(sorted(entries.items()))
+            self._by_stem = {entry.stem: entry for entry in self._entries.values()}
+            self._dir_mtime = dir_mtime
+
+    def list_templates(
+        self, family: Optional[str] = None, aspect: Optional[str] = None
+    ) -> List[TemplateInfo]:
+        """List templates, optionally filtered by family and aspect ratio."""
+        self.refresh()
+        aspect = aspect.replace("_", ":") if aspect else None
+        return [
+            entry
+            for entry in self._entries.values()
+            if (family is None or entry.family == family)
+            and (aspect is None or entry.aspect == aspect)
+        ]
+
+    def get_template(self, name: str) -> Optional[TemplateInfo]:
+        """Resolve a template by file name or stem."""
+        self.refresh()
+        entry = self._entries.get(name) or self._by_stem.get(name)
+        if entry is None:
+            return None
+        # Files overwritten in place do not bump the directory mtime
+        try:
+            stat = os.stat(entry.path)
+        except FileNotFoundError:
+            self.refresh(force=True)
+            return None
+        if stat.st_mtime_ns != entry.mtime:
+            with self._lock:
+                try:
+                    entry = self._build_entry(entry.name, entry.path, stat)
+                except OSError as e:
+                    print(f"Skipping unreadable template {entry.name}: {str(e)}")
+                    return None
+                self._entries[entry.name] = entry
+                self._by_stem[entry.stem] = entry
+        return entry
+
+    def get_alpha_regions(self, entry: TemplateInfo) -> List[Tuple[int, int, int, int]]:
+        """Return the cached non-transparent regions of a template."""
+        key = (entry.name, entry.mtime)
+        regions = self._alpha_regions.get(key)
+        if regions is None:
+            from PIL import Image
+
+            with Image.open(entry.path) as img:
+                regions = compute_alpha_regions(img.convert("RGBA"))
+            # Drop regions computed for older versions of the same file
+            for stale in [k for k in self._alpha_regions if k[0] == entry.name]:
+                del self._alpha_regions[stale]
+            self._alpha_regions[key] = regions
+        return regions
+
+    def get_thumbnail(
+        self, entry: TemplateInfo, size: int, output_format: str = "webp"
+    ) -> str:
+        """
+        Return the path of a cached thumbnail, rendering it on first request.
+        Cache files are keyed by the source mtime so edited templates get new thumbnails.
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(
+                f"Unsupported thumbnail size {size}, "
+                f"expected one of {', '.join(map(str, THUMBNAIL_SIZES))}"
+            )
+        if output_format not in THUMBNAIL_FORMATS:
+            raise ValueError(
+                f"Unsupported thumbnail format '{output_format}', "
+                f"expected one of {', '.join(THUMBNAIL_FORMATS)}"
+            )
+
+        thumb_path = os.path.join(
+            self.thumbnail_dir, f"{entry.stem}_{entry.mtime}_{size}.{output_format}"
+        )
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        from PIL import Image
+
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+        with Image.open(entry.path) as img:
+            img.thumbnail((size, size), reducing_gap=2.0)
+            # Write to a temp file first so concurrent readers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.thumbnail_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    img.save(f, format=THUMBNAIL_FORMATS[output_format][0])
+                os.replace(tmp_path, thumb_path)
+            finally:
+                # Only left behind when saving or the rename failed
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._remove_stale_thumbnails(entry)
+        return thumb_path
+
+    def _remove_stale_thumbnails(self, entry: TemplateInfo) -> None:
+        """Delete cached thumbnails rendered from older versions of a template."""
+        for fname in os.listdir(self.thumbnail_dir):
+            # Cache files are named "<stem>_<mtime>_<size>.<ext>"
+            parts = os.path.splitext(fname)[0].rsplit("_", 2)
+            if (
+                len(parts) == 3
+                and parts[0] == entry.stem
+                and parts[1] != str(entry.mtime)
+            ):
+                try:
+                    os.remove(os.path.join(self.thumbnail_dir, fname))
+                except OSError:
+                    pass
+
+    def _build_entry(self, name: str, path: str, stat: os.stat_result) -> TemplateInfo:
+        """Read the metadata for a single template file."""
+        stem = os.path.splitext(name)[0]
+        from PIL import Image
+
+        # Only the header is read here, pixel data stays on disk
+        with Image.open(path) as img:
+            width, height = img.size
+
+        match = TEMPLATE_STEM_PATTERN.match(stem)
+        family = match.group("family")
+        if match.group("w"):
+            aspect = f"{match.group('w')}:{match.group('h')}"
+        else:
+            divisor = gcd(width, height) or 1
+            aspect = f"{width // divisor}:{height // divisor}"
+
+        return TemplateInfo(
+            name=name,
+            path=path,
+            stem=stem,
+            family=family,
+            aspect=aspect,
+            width=width,
+            height=height,
+            size=stat.st_size,
+            mtime=stat.st_mtime_ns,
+        )
+
+
+template_service = TemplateService(file_service.psd_templates_dir)
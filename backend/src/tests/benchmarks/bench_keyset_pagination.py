@@ -0,0 +1,98 @@
+'''
+Benchmark offset against keyset pagination on a million-row prompts table
+
+Needs the Postgres database configured by the POSTGRES_* variables. The rows
+are written to a scratch "bench" schema, dropped afterwards unless BENCH_KEEP=1.
+Run from the backend directory:
+    python -m src.tests.benchmarks.bench_keyset_pagination
+'''
+import os
+import sys
+import time
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.crud.base import encode_cursor
+from src.crud.prompt import prompt as prompt_crud
+from src.db.session import engine
+from src.models.prompt import Prompt
+
+ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+PAGE_SIZE = int(os.getenv("BENCH_PAGE_SIZE", "50"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "5"))
+KEEP = os.getenv("BENCH_KEEP", "0") == "1"
+START = datetime(2024, 1, 1)
+# Run the CRUD queries against bench.prompts instead of prompt.prompts
+bench_engine = engine.execution_options(schema_translate_map={"prompt": "bench"})
+
+
+async def create_table():
+    """Fill bench.prompts with ROWS prompts, one second apart."""
+    async with bench_engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+        await conn.execute(text("CREATE SCHEMA bench"))
+        await conn.run_sync(lambda sync_conn: Prompt.__table__.create(sync_conn))
+        await conn.execute(
+            text(
+                "INSERT INTO bench.prompts (prompt_name, content, created_at) "
+                "SELECT 'prompt ' || g, repeat('x', 200), "
+                "timestamp '2024-01-01' + g * interval '1 second' "
+                "FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": ROWS},
+        )
+    async with bench_engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE bench.prompts"))
+
+
+async def time_page(db, **kwargs) -> float:
+    """Return the median time to fetch one page in milliseconds."""
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        items, _ = await prompt_crud.get_page(db, limit=PAGE_SIZE, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert len(items) == PAGE_SIZE
+    return sorted(timings)[len(timings) // 2]
+
+
+async def run_benchmark():
+    """Compare both strategies at increasing page depths and sort orders."""
+    print(f"Creating {ROWS:,} prompts...")
+    started = time.perf_counter()
+    await create_table()
+    print(f"Created in {time.perf_counter() - started:.1f}s\n")
+
+    last_page = ROWS - PAGE_SIZE
+    depths = [d for d in (0, 1_000, 10_000, 100_000, 500_000) if d < last_page] + [last_page]
+    try:
+        async with AsyncSession(bench_engine) as db:
+            print(f"{'order_by':<11} {'depth':>9} {'offset ms':>10} {'keyset ms':>10} {'speedup':>8}")
+            for order_by in ("id", "created_at"):
+                for depth in depths:
+                    # Rows are numbered from 1, so the row at this depth has id == depth
+                    values = [depth] if order_by == "id" else [START + timedelta(seconds=depth), depth]
+                    cursor = encode_cursor(order_by, False, values) if depth else None
+                    offset_ms = await time_page(db, skip=depth, order_by=order_by)
+                    keyset_ms = await time_page(db, cursor=cursor, order_by=order_by)
+                    print(
+                        f"{order_by:<11} {depth:>9,} {offset_ms:>10.2f} {keyset_ms:>10.2f} "
+                        f"{offset_ms / keyset_ms:>7.1f}x"
+                    )
+    finally:
+        if not KEEP:
+            async with bench_engine.begin() as conn:
+                await conn.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,128 @@
+'''
+Benchmark gpt_service throughput and tail latency under concurrency
+
+Runs against the bundled fake chat completions server, in-process by default.
+For numbers without the server competing for the GIL, start it separately and
+set BENCH_LLM_ENDPOINT to its URL.
+
+Run from the backend directory:
+    python -m src.tests.benchmarks.bench_llm_throughput
+'''
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.gpt_service import GPTService
+from src.tests.fake_llm_server import FakeLLMConfig, FakeLLMServer
+
+REQUESTS = int(os.getenv("BENCH_LLM_REQUESTS", "200"))
+CONCURRENCY = [int(c) for c in os.getenv("BENCH_LLM_CONCURRENCY", "1,8,16,32,64").split(",")]
+LATENCY = os.getenv("BENCH_LLM_LATENCY", "lognormal:0.2,0.5")
+ERROR_RATE = float(os.getenv("BENCH_LLM_ERROR_RATE", "0.02"))
+THROTTLE_RATE = float(os.getenv("BENCH_LLM_THROTTLE_RATE", "0.02"))
+ENDPOINT = os.getenv("BENCH_LLM_ENDPOINT")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def make_service(endpoint: str) -> GPTService:
+    """GPTService pointed at the fake endpoint, without quota limits or caching."""
+    service = GPTService()
+    backend = service.router.primary
+    backend.endpoint = endpoint
+    backend.rate_limiter = None
+    backend.resilience.base_delay = 0.05
+    backend.resilience.max_retry_after = 0.2
+    # Keep the benchmark from tripping the breaker on injected errors
+    backend.resilience.breaker.failure_threshold = 10**9
+    return service
+
+
+async def run_level(service: GPTService, concurrency: int, stream: bool):
+    """Issue REQUESTS calls with at most concurrency in flight, return the stats."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, first_tokens, errors = [], [], 0
+    data = {
+        "messages": [{"role": "user", "content": "Describe a fantasy game ad banner."}],
+        "max_tokens": 200,
+    }
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    first = None
+                    async for _ in service.stream_api_call(data, use_cache=False):
+                        if first is None:
+                            first = time.perf_counter() - start
+                    first_tokens.append(first or 0.0)
+                else:
+                    await service.make_api_call(data, use_cache=False)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "ttft_p50": percentile(first_tokens, 0.50) * 1000,
+        "errors": errors,
+    }
+
+
+async def run(endpoint: str):
+    service = make_service(endpoint)
+    try:
+        for stream in (False, True):
+            print(f"\n{'streaming' if stream else 'non-streaming'} ({REQUESTS} requests per level)")
+            print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                  f"{'ttft ms':>8} {'errors':>6}")
+            for concurrency in CONCURRENCY:
+                stats = await run_level(service, concurrency, stream)
+                print(
+                    f"{concurrency:>11} {stats['throughput']:>8.1f} {stats['p50']:>8.0f} "
+                    f"{stats['p95']:>8.0f} {stats['p99']:>8.0f} "
+                    f"{stats['ttft_p50'] if stream else float('nan'):>8.0f} {stats['errors']:>6}"
+                )
+        print(f"\nresilience: {service.resilience.get_metrics()}")
+    finally:
+        await service.shutdown()
+
+
+def main():
+    print(f"latency={LATENCY} error_rate={ERROR_RATE} throttle_rate={THROTTLE_RATE}")
+    if ENDPOINT:
+        asyncio.run(run(ENDPOINT))
+        return
+    config = FakeLLMConfig(
+        latency=LATENCY,
+        token_interval=0.002,
+        error_rate=ERROR_RATE,
+        throttle_rate=THROTTLE_RATE,
+        retry_after=0.1,
+        seed=42,
+    )
+    with FakeLLMServer(config) as server:
+        asyncio.run(run(server.url))
+        print(f"server: {config.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+'''
+Benchmark full-frame against region-limited template compositing
+
+Run from the backend directory:
+    python -m src.tests.benchmarks.bench_template_compositing
+'''
+import os
+import sys
+import time
+from pathlib import Path
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.utils.image_utils import compute_alpha_regions
+
+TEMPLATES_DIR = ROOT_DIR / "src" / "templates"
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20"))
+
+
+def time_it(func, iterations: int = ITERATIONS) -> float:
+    """Return the mean runtime of func in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def full_frame(base: Image.Image, template: Image.Image) -> Image.Image:
+    """Blend every pixel of the template, as the original implementation did."""
+    return Image.alpha_composite(base, template)
+
+
+def region_limited(canvas, template, regions):
+    """Blend only the non-transparent regions of the template, in place."""
+    for region in regions:
+        canvas.alpha_composite(template, dest=region[:2], source=region)
+    return canvas
+
+
+def run_benchmark():
+    """Compare both strategies on every shipped template."""
+    print(f"{'template':<55} {'cover':>6} {'full ms':>8} {'region ms':>10} {'speedup':>8}")
+    total_full = total_region = 0.0
+    for path in sorted(TEMPLATES_DIR.glob("*.png")):
+        template = Image.open(path).convert("RGBA")
+        base = Image.new("RGBA", template.size, (40, 80, 120, 255))
+        regions = compute_alpha_regions(template)
+
+        # Results must be pixel-identical before timings mean anything
+        assert full_frame(base, template).tobytes() == region_limited(
+            base.copy(), template, regions
+        ).tobytes(), f"Region compositing differs for {path.name}"
+
+        # In the service the canvas is the freshly decoded base image, so the
+        # region path blends into it in place instead of allocating an output
+        canvas = base.copy()
+        full_ms = time_it(lambda: full_frame(base, template))
+        region_ms = time_it(lambda: region_limited(canvas, template, regions))
+        covered = sum((r[2] - r[0]) * (r[3] - r[1]) for r in regions)
+        coverage = covered / (template.width * template.height)
+        total_full += full_ms
+        total_region += region_ms
+        print(
+            f"{path.name:<55} {coverage:>6.1%} {full_ms:>8.2f} {region_ms:>10.2f} "
+            f"{full_ms / region_ms:>7.1f}x"
+        )
+
+    detect_ms = time_it(
+        lambda: compute_alpha_regions(template), iterations=max(1, ITERATIONS // 4)
+    )
+    print("-" * 91)
+    print(
+        f"{'total':<62} {total_full:>8.2f} {total_region:>10.2f} "
+        f"{total_full / total_region:>7.1f}x"
+    )
+    print(f"Region detection (uncached, last template): {detect_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,90 @@
+'''
+Shared fixtures for tests that talk to local stand-in HTTP servers
+'''
+import sys
+import asyncio
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+from http.server import ThreadingHTTPServer
+import pytest
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.tests.fake_llm_server import FakeCompletionHandler, FakeLLMServer
+
+
+class Stubs:
+    """Local servers and the services pointed at them, all stopped after the test."""
+
+    def __init__(self):
+        self._exit_stack = ExitStack()
+
+    def serve(self, handler) -> str:
+        """Serve a request handler class in the background and return its base URL."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._exit_stack.callback(server.server_close)
+        self._exit_stack.callback(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    def scripted(self, script):
+        """
+        Serve chat completions answering with the scripted (status, headers, delay)
+        entries. Returns the base URL and the handler class, which counts requests.
+        """
+        handler = type(
+            "ScriptedHandler", (FakeCompletionHandler,), {"script": script, "requests_seen": 0}
+        )
+        return self.serve(handler), handler
+
+    def fake_llm(self, config) -> str:
+        """Serve the configurable fake LLM and return its chat completions URL."""
+        return self._exit_stack.enter_context(FakeLLMServer(config)).url
+
+    def gpt_service(self, endpoint=None, **resilience):
+        """GPTService sending completions to endpoint, with fast retries and optional overrides."""
+        from src.services.gpt_service import GPTService
+
+        service = GPTService()
+        if endpoint:
+            service.router.primary.endpoint = endpoint
+        service.resilience.base_delay = 0.01
+        for key, value in resilience.items():
+            if key in ("failure_threshold", "reset_timeout"):
+                setattr(service.resilience.breaker, key, value)
+            else:
+                setattr(service.resilience, key, value)
+        return service
+
+    def run(self, service, coro_factory):
+        """Run coro_factory(service) in a fresh event loop and shut the service down in it."""
+        async def run():
+            try:
+                return await coro_factory(service)
+            finally:
+                await service.shutdown()
+
+        return asyncio.run(run())
+
+    def run_scripted(self, script, coro_factory, **resilience):
+        """Run one GPTService call against a scripted endpoint, return the service and result."""
+        url, _ = self.scripted(script)
+        service = self.gpt_service(f"{url}/chat/completions", **resilience)
+        return service, self.run(service, coro_factory)
+
+    def run_fake_llm(self, config, coro_factory):
+        """Run one GPTService call against a fresh fake LLM server."""
+        return self.run(self.gpt_service(self.fake_llm(config)), coro_factory)
+
+    def close(self):
+        self._exit_stack.close()
+
+
+@pytest.fixture
+def stubs():
+    stubs = Stubs()
+    yield stubs
+    stubs.close()
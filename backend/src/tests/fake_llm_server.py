@@ -0,0 +1,342 @@
+'''
+Fake OpenAI/Azure chat completions server for offline tests and benchmarks
+
+Run from the backend directory, then point AZURE_GPT_API_ENDPOINT at it:
+    python -m src.tests.fake_llm_server --port 8099 --latency lognormal:0.3,0.5 --error-rate 0.02
+    AZURE_GPT_API_ENDPOINT=http://127.0.0.1:8099/chat/completions
+'''
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+
+class LatencyDistribution:
+    """
+    Latency in seconds drawn from a spec such as fixed:0.2, uniform:0.1,0.5,
+    normal:0.3,0.05, lognormal:0.3,0.5 (median, sigma) or exponential:0.3 (mean).
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        kind, _, params = spec.partition(":")
+        if kind not in LATENCY_KINDS:
+            raise ValueError(
+                f"Unknown latency distribution {kind!r}, expected one of {LATENCY_KINDS}"
+            )
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                value = self.params[0] if self.params else 0.0
+            elif self.kind == "uniform":
+                value = self.random.uniform(*self.params[:2])
+            elif self.kind == "normal":
+                value = self.random.gauss(*self.params[:2])
+            elif self.kind == "lognormal":
+                value = self.random.lognormvariate(math.log(self.params[0]), self.params[1])
+            else:
+                value = self.random.expovariate(1 / self.params[0])
+        return max(0.0, value)
+
+
+def sample_from_schema(schema: Dict[str, Any], index: int = 0) -> Any:
+    """Build a canned value that conforms to a (strict mode) JSON schema."""
+    if "enum" in schema:
+        return schema["enum"][index % len(schema["enum"])]
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: sample_from_schema(prop, index)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        # One item per enum value, e.g. one prompt per requested style
+        enums = [p["enum"] for p in items.get("properties", {}).values() if "enum" in p]
+        count = len(enums[0]) if enums else 5
+        return [sample_from_schema(items, i) for i in range(count)]
+    if kind == "string":
+        return f"keyword {index + 1}"
+    if kind == "integer":
+        return index + 1
+    if kind == "number":
+        return float(index + 1)
+    if kind == "boolean":
+        return True
+    return None
+
+
+class FakeLLMConfig:
+    """Behaviour of the fake server, shared by all handler threads."""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        token_interval: float = 0.0,
+        completion_words: int = 60,
+        error_rate: float = 0.0,
+        error_statuses: List[int] = (500, 503),
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        model: str = "gpt-4o-mini-fake",
+        seed: Optional[int] = None,
+    ):
+        self.latency = LatencyDistribution(latency, seed)
+        self.token_interval = token_interval
+        self.completion_words = completion_words
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.model = model
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "streams": 0, "errors": 0, "throttled": 0}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def pick_failure(self) -> Optional[int]:
+        """Return an injected status code for this request, if any."""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return self.error_statuses[int(roll * 1000) % len(self.error_statuses)]
+        return None
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Answer chat completion POSTs according to the server's FakeLLMConfig."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        config: FakeLLMConfig = self.server.config
+        config.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        # Time to first byte, for streams this is the time to first token
+        time.sleep(config.latency.sample())
+
+        status = config.pick_failure()
+        if status == 429:
+            config.count("throttled")
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": "Rate limit is exceeded"}},
+                {"Retry-After": f"{config.retry_after:g}"},
+            )
+            return
+        if status:
+            config.count("errors")
+            self._send_json(status, {"error": {"message": "Injected upstream error"}})
+            return
+
+        content = self._content(request)
+        prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+        completion_tokens = max(1, len(content) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if request.get("stream"):
+            config.count("streams")
+            self._stream(content, usage, config)
+            return
+        self._send_json(
+            200,
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "model": config.model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            },
+        )
+
+    def _content(self, request: Dict[str, Any]) -> str:
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format.get("json_schema", {}).get("schema", {})
+            return json.dumps(sample_from_schema(schema))
+        if response_format.get("type") == "json_object":
+            return json.dumps({"result": "fake"})
+        words = self.server.config.completion_words
+        return " ".join(f"word{i}" for i in range(words))
+
+    def _stream(self, content: str, usage: Dict[str, int], config: FakeLLMConfig) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        # Azure opens with a content filter chunk that has no choices
+        words = content.split(" ")
+        pieces = [word + " " for word in words[:-1]] + words[-1:]
+        chunks = [{"choices": [], "prompt_filter_results": []}]
+        chunks += [
+            {"model": config.model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+            for piece in pieces
+        ]
+        chunks.append({"model": config.model, "choices": [], "usage": usage})
+        try:
+            for chunk in chunks:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                if config.token_interval:
+                    time.sleep(config.token_interval)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    """Answer each POST with the next scripted (status, headers, delay) entry, for failure injection tests."""
+
+    script = []
+    requests_seen = 0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        cls = type(self)
+        index = cls.requests_seen
+        cls.requests_seen += 1
+        status, headers, delay = cls.script[min(index, len(cls.script) - 1)]
+        time.sleep(delay)
+        if status == 200 and request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            chunks = [{"choices": []}] + [
+                {"choices": [{"delta": {"content": word}}]}
+                for word in ("reply ", str(index))
+            ]
+            for chunk in chunks:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        body = json.dumps(
+            {
+                "choices": [{"message": {"content": f"reply {index}"}}],
+                "model": "fake-model",
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+            }
+            if status == 200
+            else {"error": "injected"}
+        ).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded fake server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+    # Benchmarks open many connections at once
+    request_queue_size = 256
+
+    def __init__(
+        self, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        super().__init__((host, port), FakeLLMHandler)
+        self.config = config or FakeLLMConfig()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/chat/completions"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="lognormal:0.3,0.5")
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--completion-words", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", default="500,503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        token_interval=args.token_interval,
+        completion_words=args.completion_words,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",")],
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = FakeLLMServer(config, args.host, args.port)
+    print(f"Fake chat completions server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
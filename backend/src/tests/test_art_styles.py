@@ -0,0 +1,45 @@
+'''
+Test the cached art style catalog
+'''
+import os
+import sys
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.art_style_service import ArtStyleService
+
+
+def write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_serves_catalog_from_memory_until_file_changes(tmp_path):
+    """The CSV is parsed once, then again only after its mtime changes."""
+    path = tmp_path / "styles.csv"
+    write(path, "\ufeffPixel Art\n\nWatercolor\n", 1_000_000_000)
+    service = ArtStyleService(str(path))
+    service.reload_interval = 0
+
+    styles = service.get_styles()
+    assert [s["name"] for s in styles] == ["Pixel Art", "Watercolor"]
+    assert styles[0] == {"id": "Pixel Art", "name": "Pixel Art", "styleType": "art"}
+    assert service.get_styles() is styles
+
+    write(path, "Pixel Art\nWatercolor\nLow Poly\n", 2_000_000_000)
+    assert [s["name"] for s in service.get_styles()] == ["Pixel Art", "Watercolor", "Low Poly"]
+
+
+def test_keeps_previous_catalog_when_file_disappears(tmp_path):
+    """A missing file on reload keeps serving the last good catalog."""
+    path = tmp_path / "styles.csv"
+    write(path, "Pixel Art\n", 1_000_000_000)
+    service = ArtStyleService(str(path))
+    service.reload_interval = 0
+    styles = service.get_styles()
+
+    path.unlink()
+    assert service.get_styles() is styles
@@ -0,0 +1,62 @@
+'''
+Test the database engine settings and the query latency instrumentation
+'''
+import sys
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine, text
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.db.session import engine_options
+from src.db.instrumentation import QueryMetrics, normalize_statement
+
+
+def test_engine_options_come_from_environment(monkeypatch):
+    """Pool and statement cache settings are configurable and echo is off by default."""
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+    monkeypatch.delenv("DB_ECHO", raising=False)
+    options = engine_options()
+    assert options["echo"] is False
+    assert options["pool_size"] == 20 and options["pool_pre_ping"] is True
+    assert options["connect_args"] == {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+    }
+
+
+def test_records_latency_per_statement_and_logs_only_slow_queries(capsys):
+    """Every statement lands in a histogram; only slow ones are printed."""
+    metrics = QueryMetrics()
+    metrics.slow_query_ms = 50
+    engine = create_engine("sqlite://")
+    metrics.instrument(engine)
+    metrics.instrument(engine)
+
+    with engine.connect() as conn:
+        for i in range(3):
+            conn.execute(text("SELECT :x"), {"x": i})
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing"))
+    metrics.record("SELECT pg_sleep(1)", 1000.0)
+
+    result = metrics.get_metrics()
+    by_statement = {s["statement"]: s for s in result["statements"]}
+    assert by_statement["SELECT ?"]["count"] == 3
+    assert result["errors"] == 1
+    assert result["slow"] == 1 and result["recent_slow"][0]["statement"] == "SELECT pg_sleep(1)"
+    assert result["overall"]["p99_ms"] == 1000.0
+    assert capsys.readouterr().out.count("Slow query") == 1
+
+
+def test_statements_differing_in_list_length_share_an_entry():
+    """Expanded IN lists and multi-row inserts are grouped by shape."""
+    assert normalize_statement("SELECT * FROM t WHERE id IN ($1, $2,\n $3)") == normalize_statement(
+        "SELECT * FROM t WHERE id IN ($1, $2)"
+    )
+    assert normalize_statement(
+        "INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4)"
+    ) == "INSERT INTO t (a, b) VALUES ($1, ...), ..."
@@ -0,0 +1,57 @@
+'''
+Test GPTService end to end against the bundled fake chat completions server
+'''
+import sys
+import base64
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.tests.fake_llm_server import FakeLLMConfig, LatencyDistribution
+
+
+def test_keywords_follow_the_requested_schema(stubs):
+    """Structured output requests get canned JSON that matches their schema."""
+    keywords = stubs.run_fake_llm(
+        FakeLLMConfig(), lambda service: service.extract_keywords(use_cache=False)
+    )
+    assert keywords and all(isinstance(k, str) for k in keywords)
+
+
+def test_analysis_returns_prompt_and_keywords_from_one_call(stubs):
+    """The combined analysis sends the image once and fills both fields."""
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), (20, 120, 200)).save(buffer, format="PNG")
+    image_base64 = base64.b64encode(buffer.getvalue()).decode()
+    config = FakeLLMConfig()
+    analysis = stubs.run_fake_llm(
+        config,
+        lambda service: service.analyze_image("a castle", image_base64, use_cache=False),
+    )
+    assert analysis["generated_prompt"]
+    assert analysis["keywords"] and all(isinstance(k, str) for k in analysis["keywords"])
+    assert config.stats["requests"] == 1
+
+
+def test_streams_prompt_and_recovers_from_throttling(stubs):
+    """Injected 429s are retried and the prompt streams in several deltas."""
+    config = FakeLLMConfig(throttle_rate=0.5, retry_after=0.01, completion_words=5, seed=1)
+
+    async def stream(service):
+        return [d async for d in await service.stream_prompt("a castle", use_cache=False)]
+
+    deltas = stubs.run_fake_llm(config, stream)
+    assert "".join(deltas) == "word0 word1 word2 word3 word4"
+    assert config.stats["requests"] == config.stats["throttled"] + 1
+
+
+def test_latency_distributions():
+    """Latency specs parse and never produce negative delays."""
+    specs = ("fixed:0.1", "uniform:0,0.2", "normal:0.1,0.5", "lognormal:0.1,0.5", "exponential:0.1")
+    for spec in specs:
+        samples = [LatencyDistribution(spec, seed=3).sample() for _ in range(50)]
+        assert min(samples) >= 0
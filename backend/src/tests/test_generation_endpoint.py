@@ -0,0 +1,65 @@
+'''
+Test the streaming mode of the prompt generation endpoint
+'''
+import sys
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api.v1.endpoints import generation
+from src.services.gpt_service import gpt_service
+from src.services.image_preprocess_service import image_preprocess_service
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(generation.router, prefix="/api/generate")
+    return TestClient(app)
+
+
+def stream_prompt(client, **form):
+    return client.post("/api/generate/prompt/", data={"description": "a castle", "stream": "true", **form})
+
+
+def test_invalid_image_url_fails_before_the_stream(client, monkeypatch):
+    """A rejected image URL is a 400 response, not an event in a 200 stream."""
+    async def reject(image_url):
+        raise ValueError("Image URL is not accessible")
+
+    monkeypatch.setattr(image_preprocess_service, "validate_url", reject)
+    response = stream_prompt(client, image_url="http://example.invalid/a.png")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Image URL is not accessible"
+
+
+def test_upstream_failure_is_sent_as_an_error_event(client, monkeypatch):
+    """Once deltas have been sent, a failing completion ends the stream with an error event."""
+    async def fail_midway(data, use_cache=True):
+        yield "A tall "
+        raise RuntimeError("API stream failed")
+
+    monkeypatch.setattr(gpt_service, "stream_api_call", fail_midway)
+    response = stream_prompt(client)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'data: {"delta": "A tall "}\n\n'
+        'event: error\ndata: {"detail": "API stream failed"}\n\n'
+    )
+
+
+def test_stream_ends_with_the_full_prompt(client, monkeypatch):
+    async def complete(data, use_cache=True):
+        for delta in ("A tall ", "castle"):
+            yield delta
+
+    monkeypatch.setattr(gpt_service, "stream_api_call", complete)
+    response = stream_prompt(client)
+    assert response.status_code == 200
+    assert response.text.endswith('event: done\ndata: {"generated_prompt":"A tall castle"}\n\n')
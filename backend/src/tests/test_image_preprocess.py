@@ -0,0 +1,139 @@
+'''
+Test pre-processing of uploaded images and image URL checks before vision LLM calls
+'''
+import sys
+import base64
+import asyncio
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+import pytest
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.image_preprocess_service import ImagePreprocessService
+from src.services.llm_service import llm_service
+
+
+def encode(img, fmt, **params):
+    buffer = BytesIO()
+    img.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def decode(image_base64):
+    return Image.open(BytesIO(base64.b64decode(image_base64)))
+
+
+def test_downscales_large_photo_to_vision_resolution():
+    """A 4000x3000 photo is shrunk so its short side is 768px and sent as JPEG."""
+    service = ImagePreprocessService()
+    contents = encode(Image.new("RGB", (4000, 3000), (200, 30, 30)), "PNG")
+    result = decode(asyncio.run(service.prepare(contents)))
+    assert result.format == "JPEG"
+    assert result.size == (1024, 768)
+
+
+def test_keeps_small_images_and_transparency():
+    """Small supported uploads pass through, large transparent ones stay PNG."""
+    service = ImagePreprocessService()
+    small = encode(Image.new("RGB", (64, 64)), "WEBP")
+    assert base64.b64decode(asyncio.run(service.prepare(small))) == small
+
+    transparent = encode(Image.new("RGBA", (3000, 1000), (0, 0, 0, 0)), "PNG")
+    result = decode(asyncio.run(service.prepare(transparent)))
+    assert result.format == "PNG" and result.mode == "RGBA"
+    assert result.size == (2048, 683)
+
+
+def test_reuses_results_for_identical_uploads():
+    """The second upload of the same bytes is answered from the cache."""
+    service = ImagePreprocessService()
+    contents = encode(Image.new("RGB", (3000, 3000)), "JPEG")
+    first = asyncio.run(service.prepare(contents))
+    second = asyncio.run(service.prepare(contents))
+    assert first == second
+    assert service.metrics["hits"] == 1 and service.metrics["misses"] == 1
+
+
+def test_rejects_non_images():
+    """Arbitrary bytes raise a ValueError instead of reaching the LLM."""
+    service = ImagePreprocessService()
+    try:
+        asyncio.run(service.prepare(b"not an image"))
+    except ValueError:
+        return
+    assert False, "expected ValueError"
+
+
+def test_rejects_truncated_and_oversized_images(monkeypatch):
+    """Corrupt or decompression bomb uploads are a ValueError, not a server error."""
+    service = ImagePreprocessService()
+    contents = encode(Image.effect_noise((3000, 3000), 64).convert("RGB"), "JPEG")
+    with pytest.raises(ValueError, match="truncated"):
+        asyncio.run(service.prepare(contents[: len(contents) // 2]))
+
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(ValueError, match="too many pixels"):
+        asyncio.run(service.prepare(encode(Image.new("RGB", (100, 100)), "PNG")))
+
+
+def test_message_uses_sniffed_mime_type():
+    """Data URIs carry the real image format rather than assuming JPEG."""
+    png = base64.b64encode(encode(Image.new("RGB", (8, 8)), "PNG")).decode()
+    messages = llm_service.create_message("describe", image_base64=png)
+    assert messages[1]["content"][1]["image_url"]["url"].startswith("data:image/png;base64,")
+
+
+def run_url_checks(stubs, handler_status, urls_factory):
+    """Serve one status for every request and run checks against the local server."""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            requests_seen.append(self.path)
+            self.send_response(handler_status)
+            self.send_header("Content-Length", "1024")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    url = f"{stubs.serve(Handler)}/a.png"
+    service = ImagePreprocessService()
+    return service, requests_seen, stubs.run(service, lambda service: urls_factory(service, url))
+
+
+def test_caches_url_checks_including_failures(stubs):
+    """Good and bad URLs are each requested once within their TTL."""
+    async def check_twice(service, url):
+        errors = []
+        for _ in range(2):
+            try:
+                await service.validate_url(url)
+            except ValueError as e:
+                errors.append(e)
+        return errors
+
+    _, seen, errors = run_url_checks(stubs, 200, check_twice)
+    assert errors == [] and len(seen) == 1
+
+    service, seen, errors = run_url_checks(stubs, 404, check_twice)
+    assert len(errors) == 2 and len(seen) == 1
+    assert service.metrics["url_negative_hits"] == 1
+
+
+def test_stale_good_url_revalidates_in_background(stubs):
+    """A known good URL past its TTL is accepted at once and checked again."""
+    async def check_stale(service, url):
+        await service.validate_url(url)
+        service.url_ttl = 0
+        await service.validate_url(url)
+        await asyncio.gather(*service._revalidating.values())
+
+    service, seen, _ = run_url_checks(stubs, 200, check_stale)
+    assert len(seen) == 2
+    assert service.metrics["url_revalidations"] == 1
@@ -0,0 +1,42 @@
+'''
+Test that importing the API stays cheap, so workers start fast
+'''
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+# Modules that are only needed once a request uses them
+DEFERRED_MODULES = ("comfy_script", "PIL", "pandas", "requests")
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+
+def import_main():
+    """Import src.main in a fresh interpreter and return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_startup_import_skips_heavy_modules():
+    """Optional heavy packages are loaded on first use, not at import."""
+    modules = import_main()
+    loaded = {name.split(".")[0] for name in modules} & set(DEFERRED_MODULES)
+    assert not loaded
+    assert modules["src.main"] / 1000 < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,82 @@
+'''
+Test the preloaded LLM instruction templates
+'''
+import os
+import sys
+from pathlib import Path
+import pytest
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services import instruction_service as instruction_module
+from src.services.instruction_service import InstructionService, REQUIRED_INSTRUCTIONS
+
+
+@pytest.fixture
+def instructions(tmp_path):
+    """A service over a directory holding every required instruction."""
+    for name in REQUIRED_INSTRUCTIONS:
+        (tmp_path / name).write_text(f"Instructions of {name}")
+    service = InstructionService(str(tmp_path))
+    service.load()
+    return service
+
+
+def touch(path, text):
+    """Rewrite a file and move its mtime forward, even on coarse clocks."""
+    stat = os.stat(path)
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_preloaded_instructions_are_served(instructions):
+    assert instructions.get("image_prompt.txt") == "Instructions of image_prompt.txt"
+    with pytest.raises(Exception, match="was not found"):
+        instructions.get("unknown.txt")
+
+
+def test_missing_required_instruction_fails_the_load(tmp_path):
+    (tmp_path / "image_prompt.txt").write_text("Describe the image")
+    with pytest.raises(Exception, match="Missing instruction templates"):
+        InstructionService(str(tmp_path)).load()
+
+
+def test_edited_instruction_is_reloaded(instructions, tmp_path):
+    """Files are re-read once their mtime changes and the reload interval passed."""
+    touch(tmp_path / "text_prompt.txt", "Updated instructions")
+    # Still inside the reload interval, so the loaded copy is served
+    assert instructions.get("text_prompt.txt") == "Instructions of text_prompt.txt"
+
+    instructions.reload_interval = 0
+    instructions.reload_if_changed()
+    assert instructions.get("text_prompt.txt") == "Updated instructions"
+
+
+def test_empty_edit_keeps_the_previous_text(instructions, tmp_path):
+    """A half-written file does not replace the last good copy."""
+    instructions.reload_interval = 0
+    touch(tmp_path / "text_prompt.txt", "")
+    instructions.reload_if_changed()
+    assert instructions.get("text_prompt.txt") == "Instructions of text_prompt.txt"
+
+
+def test_file_deleted_while_scanning_is_skipped(instructions, tmp_path, monkeypatch):
+    """A file listed but gone before it is read is left out, required ones are kept."""
+    (tmp_path / "extra.txt").write_text("Extra instructions")
+    instructions.reload_interval = 0
+    instructions.reload_if_changed()
+    assert instructions.get("extra.txt") == "Extra instructions"
+
+    stat = os.stat
+
+    def vanished(path, *args, **kwargs):
+        if os.path.basename(path) in ("extra.txt", "keyword_prompt.txt"):
+            raise FileNotFoundError(path)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(instruction_module.os, "stat", vanished)
+    with pytest.raises(Exception, match="was not found"):
+        instructions.get("extra.txt")
+    assert instructions.get("keyword_prompt.txt") == "Instructions of keyword_prompt.txt"
@@ -0,0 +1,70 @@
+'''
+Test coalescing of concurrent identical LLM calls
+'''
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.llm_cache_service import llm_cache_service
+from src.tests.fake_llm_server import FakeLLMConfig
+from src.utils.singleflight import SingleFlight
+
+
+def test_identical_prompts_share_one_upstream_call(stubs):
+    """Ten users generating the same prompt at once cost one completion."""
+    llm_cache_service.clear()
+    config = FakeLLMConfig(latency="fixed:0.2", seed=1)
+
+    async def generate(service):
+        same = [service.generate_with_prompt("A knight at dawn") for _ in range(10)]
+        fresh = service.generate_with_prompt("A knight at dawn", use_cache=False)
+        results = await asyncio.gather(*same, fresh)
+        return results, service.singleflight.get_metrics()
+
+    results, metrics = stubs.run_fake_llm(config, generate)
+    assert len(set(results[:10])) == 1
+    # The shared call plus the regeneration that opted out of sharing
+    assert config.stats["requests"] == 2
+    assert metrics["coalesced"] == 9
+    assert metrics["in_flight"] == 0
+
+
+def test_timeout_and_cancellation_are_per_key():
+    """A slow key times out for all its callers; one caller leaving does not cancel it."""
+    async def run():
+        flight = SingleFlight(timeout=0.1)
+        calls = []
+
+        async def slow(value, delay):
+            calls.append(value)
+            await asyncio.sleep(delay)
+            return value
+
+        waiters = [
+            asyncio.ensure_future(flight.do("slow", lambda: slow("a", 1)))
+            for _ in range(3)
+        ]
+        fast = [flight.do("fast", lambda: slow("b", 0.05), timeout=1) for _ in range(2)]
+        leaving = asyncio.ensure_future(flight.do("kept", lambda: slow("c", 0.05)))
+        staying = asyncio.ensure_future(flight.do("kept", lambda: slow("c", 0.05)))
+        await asyncio.sleep(0)
+        leaving.cancel()
+
+        assert await asyncio.gather(*fast) == ["b", "b"]
+        assert await staying == "c"
+        for waiter in waiters:
+            with pytest.raises(asyncio.TimeoutError):
+                await waiter
+        return calls, flight.get_metrics()
+
+    calls, metrics = asyncio.run(run())
+    assert sorted(calls) == ["a", "b", "c"]
+    assert metrics["timeouts"] == 1
+    assert metrics["coalesced"] == 4
+    assert metrics["in_flight"] == 0
@@ -0,0 +1,163 @@
+'''
+Test retries, circuit breaker and hedging of LLM calls against a local fake endpoint
+'''
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.utils.rate_limiter import RateLimiter
+from src.utils.resilience import CircuitOpenError, ResilientCaller, RetryableError
+
+
+def call(service):
+    """Issue one uncached completion request."""
+    return service.make_api_call({"messages": []}, use_cache=False)
+
+
+def test_retries_transient_errors(stubs):
+    """A 503 followed by a 200 succeeds after one retry."""
+    service, result = stubs.run_scripted([(503, {}, 0), (200, {}, 0)], call)
+    assert result == "reply 1"
+    assert service.resilience.metrics["retries"] == 1
+
+
+def test_retries_draw_quota_once(stubs):
+    """A retried call is one logical request for the rate limiter."""
+    url, _ = stubs.scripted([(503, {}, 0), (503, {}, 0), (200, {}, 0)])
+    service = stubs.gpt_service(f"{url}/chat/completions")
+    limiter = RateLimiter("test", requests_per_minute=600, tokens_per_minute=0)
+    service.router.primary.rate_limiter = limiter
+    assert stubs.run(service, call) == "reply 2"
+    assert limiter.metrics["acquired"] == 1
+
+
+def test_honours_retry_after(stubs):
+    """A 429 waits at least as long as the Retry-After header asks."""
+    start = time.monotonic()
+    service, result = stubs.run_scripted(
+        [(429, {"Retry-After": "0.3"}, 0), (200, {}, 0)], call
+    )
+    assert result == "reply 1"
+    assert time.monotonic() - start >= 0.3
+    # Throttling is not a sign of an unhealthy endpoint
+    assert service.resilience.breaker.consecutive_failures == 0
+
+
+def test_does_not_retry_client_errors(stubs):
+    """A 400 fails immediately without retries."""
+    async def expect_failure(service):
+        try:
+            await call(service)
+        except RuntimeError as e:
+            return e
+        return None
+
+    service, error = stubs.run_scripted([(400, {}, 0)], expect_failure)
+    assert error is not None and not isinstance(error, RetryableError)
+    assert service.resilience.metrics["attempts"] == 1
+
+
+def test_circuit_opens_and_fails_fast(stubs):
+    """Repeated 5xx responses open the circuit, later calls skip the endpoint."""
+    async def call_twice(service):
+        errors = []
+        for _ in range(2):
+            try:
+                await call(service)
+            except RuntimeError as e:
+                errors.append(e)
+        return errors
+
+    url, handler = stubs.scripted([(500, {}, 0)])
+    service = stubs.gpt_service(
+        f"{url}/chat/completions", max_retries=2, failure_threshold=3
+    )
+    errors = stubs.run(service, call_twice)
+    assert isinstance(errors[0], RetryableError)
+    assert isinstance(errors[1], CircuitOpenError)
+    assert handler.requests_seen == 3
+    assert service.resilience.breaker.state == "open"
+
+
+def test_hedged_request_beats_slow_first_attempt(stubs):
+    """A hedge sent after the delay wins over a slow first request."""
+    start = time.monotonic()
+    service, result = stubs.run_scripted(
+        [(200, {}, 1.0), (200, {}, 0)], call, hedge_delay=0.1
+    )
+    assert result == "reply 1"
+    assert time.monotonic() - start < 0.9
+    assert service.resilience.metrics["hedge_wins"] == 1
+
+
+def test_stream_retries_before_first_token(stubs):
+    """A streamed completion retries a failed open and relays every delta."""
+    async def collect(service):
+        return [delta async for delta in service.stream_api_call({"messages": []}, use_cache=False)]
+
+    service, deltas = stubs.run_scripted([(503, {}, 0), (200, {}, 0)], collect)
+    assert deltas == ["reply ", "1"]
+    assert service.resilience.metrics["retries"] == 1
+    # A successful open feeds the routing averages like a plain completion
+    backend = service.router.primary
+    assert backend.metrics == {"requests": 1, "failures": 0}
+    assert backend.latency_ewma is not None and backend.error_ewma == 0.0
+
+
+def test_cancelled_half_open_probe_releases_the_circuit():
+    """A probe cancelled by a timeout does not leave the circuit stuck half open."""
+    caller = ResilientCaller(max_retries=0, failure_threshold=1, reset_timeout=0)
+
+    async def fail():
+        raise RetryableError("down")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        try:
+            await caller.call(fail)
+        except RetryableError:
+            pass
+        try:
+            await asyncio.wait_for(caller.call(slow), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        return await caller.call(ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_hedge_loser_response_is_closed():
+    """A response that finishes after losing the hedge race is released."""
+    caller = ResilientCaller(hedge_delay=0.05)
+    closed = []
+
+    class Response:
+        async def aclose(self):
+            closed.append(self)
+
+    async def run():
+        ready = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.1, ready.set)
+
+        async def open_response():
+            # Both attempts finish together, so one result is left over
+            await ready.wait()
+            return Response()
+
+        winner = await caller.call(open_response, discard=lambda r: r.aclose())
+        await asyncio.sleep(0)
+        return winner
+
+    winner = asyncio.run(run())
+    assert len(closed) == 1 and closed[0] is not winner
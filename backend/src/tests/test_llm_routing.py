@@ -0,0 +1,87 @@
+'''
+Test routing between the Azure backend and a local OpenAI-compatible fallback
+'''
+import sys
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.llm_cache_service import llm_cache_service
+from src.utils.resilience import RetryableError
+
+
+def run_routed(stubs, monkeypatch, azure_script, local_script, coro_factory, **router):
+    """Run calls against an Azure stub with a local stub configured as fallback."""
+    monkeypatch.setenv("LLM_BACKENDS", "azure,lm_studio")
+    azure_url, azure_handler = stubs.scripted(azure_script)
+    local_url, local_handler = stubs.scripted(local_script)
+    monkeypatch.setenv("LM_STUDIO_BASE_URL", f"{local_url}/v1")
+    service = stubs.gpt_service(f"{azure_url}/chat")
+    for backend in service.router.backends:
+        backend.resilience.max_retries = 0
+    for key, value in router.items():
+        setattr(service.router, key, value)
+    return service, stubs.run(service, coro_factory), azure_handler, local_handler
+
+
+def text_request(content="hello"):
+    return {"messages": [{"role": "user", "content": content}]}
+
+
+def test_falls_back_to_local_backend_without_caching(monkeypatch, stubs):
+    """When Azure fails the local server answers, and the answer is not cached."""
+    stores = llm_cache_service.metrics["stores"]
+    service, result, azure, local = run_routed(
+        stubs,
+        monkeypatch,
+        [(503, {}, 0)],
+        [(200, {}, 0)],
+        lambda service: service.make_api_call(text_request("fallback")),
+    )
+    assert result == "reply 0"
+    assert azure.requests_seen == 1 and local.requests_seen == 1
+    assert service.router.metrics["fallbacks"] == 1
+    assert llm_cache_service.metrics["stores"] == stores
+
+
+def test_routes_around_slow_azure(monkeypatch, stubs):
+    """Once Azure is slower than the threshold, new requests go to the local server first."""
+    async def call_twice(service):
+        first = await service.make_api_call(text_request(), use_cache=False)
+        second = await service.make_api_call(text_request(), use_cache=False)
+        return first, second
+
+    service, _, azure, local = run_routed(
+        stubs,
+        monkeypatch, [(200, {}, 0.3)], [(200, {}, 0)], call_twice, slow_threshold=0.2
+    )
+    assert azure.requests_seen == 1 and local.requests_seen == 1
+    assert service.router.metrics["rerouted"] == 1
+
+
+def test_image_requests_skip_text_only_backends(monkeypatch, stubs):
+    """A local backend without vision support is never sent image input."""
+    image_request = {
+        "messages": [
+            {
+                "role": "user",
+                "content": [{"type": "image_url", "image_url": {"url": "data:image/png;base64,"}}],
+            }
+        ]
+    }
+
+    async def expect_failure(service):
+        try:
+            await service.make_api_call(image_request, use_cache=False)
+        except RetryableError as e:
+            return e
+        return None
+
+    _, error, azure, local = run_routed(
+        stubs,
+        monkeypatch, [(503, {}, 0)], [(200, {}, 0)], expect_failure
+    )
+    assert error is not None
+    assert azure.requests_seen == 1 and local.requests_seen == 0
@@ -0,0 +1,157 @@
+'''
+Test token usage accounting of LLM calls
+'''
+import sys
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api.v1.endpoints import metrics
+from src.api.v1.endpoints.auth import get_current_user
+from src.core.security import create_access_token
+from src.db.session import get_db
+from src.services.llm_usage_service import llm_usage_service, usage_context
+
+
+def rollup(group_by):
+    today = datetime.now(timezone.utc).date()
+    return asyncio.run(llm_usage_service.rollup(today, today, group_by))
+
+
+def allow_teams(monkeypatch, allowed):
+    """Answer the membership check without a database."""
+    async def allowed_teams(db, pending):
+        return allowed
+
+    monkeypatch.setattr(llm_usage_service, "_allowed_teams", allowed_teams)
+
+
+def test_rolls_up_usage_per_team_and_endpoint(monkeypatch, stubs):
+    """Reported usage is attributed to the team header and endpoint of the request."""
+    monkeypatch.setattr(llm_usage_service, "persistent", False)
+    monkeypatch.setattr(llm_usage_service, "_pending", {})
+    allow_teams(monkeypatch, {(7, "u1")})
+
+    async def call_for_team(service):
+        usage_context.set(
+            {
+                "endpoint": "/api/generate/prompt/",
+                "team_id": "7",
+                "authorization": f"Bearer {create_access_token('u1')}",
+            }
+        )
+        await service.make_api_call({"messages": []}, use_cache=False)
+        await service.make_api_call({"messages": []}, use_cache=False)
+
+    stubs.run_scripted([(200, {}, 0)], call_for_team)
+
+    [team] = rollup("team")
+    assert team["group"] == "7"
+    assert team["calls"] == 2 and team["estimated_calls"] == 0
+    assert team["prompt_tokens"] == 200 and team["completion_tokens"] == 40
+    assert team["cost"] > 0
+
+    [endpoint] = rollup("endpoint")
+    assert endpoint["group"] == "/api/generate/prompt/"
+    [model] = rollup("model")
+    assert model["group"] == "fake-model"
+
+
+def test_estimates_streams_without_usage(monkeypatch, stubs):
+    """Streamed completions without a usage block are counted as estimates."""
+    monkeypatch.setattr(llm_usage_service, "persistent", False)
+    monkeypatch.setattr(llm_usage_service, "_pending", {})
+
+    async def stream(service):
+        return [d async for d in service.stream_api_call({"messages": []}, use_cache=False)]
+
+    stubs.run_scripted([(200, {}, 0)], stream)
+
+    [row] = rollup("endpoint")
+    assert row["group"] == "background"
+    assert row["estimated_calls"] == 1 and row["completion_tokens"] == len("reply 0") // 4
+
+
+def test_team_header_without_membership_is_not_billed_to_the_team(monkeypatch, stubs):
+    """A caller cannot charge usage to a team it does not belong to."""
+    monkeypatch.setattr(llm_usage_service, "persistent", False)
+    monkeypatch.setattr(llm_usage_service, "_pending", {})
+    allow_teams(monkeypatch, set())
+
+    async def call_for_other_team(service):
+        usage_context.set({"endpoint": "/x", "team_id": "7", "authorization": ""})
+        await service.make_api_call({"messages": []}, use_cache=False)
+
+    stubs.run_scripted([(200, {}, 0)], call_for_other_team)
+    [team] = rollup("team")
+    assert team["group"] == "0" and team["calls"] == 1
+
+
+def test_usage_rollup_requires_team_membership(monkeypatch):
+    """The rollup needs a login, and non-superusers only see their own teams."""
+    app = FastAPI()
+    app.include_router(metrics.router, prefix="/api/metrics")
+    client = TestClient(app)
+    assert client.get("/api/metrics/llm/usage").status_code == 401
+
+    async def no_membership(db, team_id, user_id):
+        return None
+
+    monkeypatch.setattr(metrics.team_member_crud, "get_by_team_and_user", no_membership)
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, is_superuser=False)
+    assert client.get("/api/metrics/llm/usage", params={"team_id": 7}).status_code == 403
+    assert client.get("/api/metrics/llm/usage").status_code == 403
+
+
+def test_runtime_metrics_require_a_superuser():
+    """The LLM and database metrics need a login with superuser rights."""
+    app = FastAPI()
+    app.include_router(metrics.router, prefix="/api/metrics")
+    client = TestClient(app)
+    assert client.get("/api/metrics/llm").status_code == 401
+    assert client.get("/api/metrics/db").status_code == 401
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, is_superuser=False)
+    assert client.get("/api/metrics/llm").status_code == 403
+    assert client.get("/api/metrics/db").status_code == 403
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, is_superuser=True)
+    assert client.get("/api/metrics/llm").json()["usage"]["persistent"] in (True, False)
+    assert "pool" in client.get("/api/metrics/db").json()
+
+
+def test_failed_flushes_keep_a_bounded_backlog(monkeypatch):
+    """Rows of failed flushes are kept up to the cap, the oldest are dropped first."""
+    monkeypatch.setattr(llm_usage_service, "persistent", True)
+    monkeypatch.setattr(llm_usage_service, "max_pending_rows", 3)
+    monkeypatch.setattr(llm_usage_service, "_pending", {})
+    monkeypatch.setitem(llm_usage_service.metrics, "dropped_rows", 0)
+
+    async def unreachable(db, pending):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(llm_usage_service, "_allowed_teams", unreachable)
+
+    def record(endpoint):
+        usage_context.set({"endpoint": endpoint, "team_id": "", "authorization": ""})
+        llm_usage_service.record("primary", "m", {"messages": []}, "", {"total_tokens": 1}, 0.1)
+
+    for endpoint in ("/a", "/b"):
+        record(endpoint)
+    asyncio.run(llm_usage_service.flush())
+    for endpoint in ("/b", "/c", "/d"):
+        record(endpoint)
+    asyncio.run(llm_usage_service.flush())
+
+    endpoints = [key[3] for key in llm_usage_service._pending]
+    assert endpoints == ["/b", "/c", "/d"]
+    assert llm_usage_service._pending[next(iter(llm_usage_service._pending))]["calls"] == 2
+    assert llm_usage_service.get_metrics()["dropped_rows"] == 1
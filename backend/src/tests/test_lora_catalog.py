@@ -0,0 +1,107 @@
+'''
+Test the cached LoRA catalog and the styles endpoint ETag
+'''
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api.v1.endpoints import styles
+from src.services.lora_catalog_service import LoraCatalogService
+
+
+def run_catalog(script, catalog_factory):
+    """Answer each GET with the next scripted (status, loras, delay) entry."""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, loras, delay = script[min(len(requests_seen), len(script) - 1)]
+            requests_seen.append(self.headers.get("If-None-Match"))
+            time.sleep(delay)
+            body = json.dumps(loras).encode() if status == 200 else b""
+            self.send_response(status)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    service = LoraCatalogService()
+    service.url = f"http://127.0.0.1:{server.server_port}/loras"
+
+    async def run():
+        try:
+            return await catalog_factory(service)
+        finally:
+            await service.shutdown()
+
+    try:
+        return service, requests_seen, asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_serves_stale_copy_while_refreshing():
+    """A stale catalog is returned at once even when ComfyUI is slow or down."""
+    async def read(service):
+        first = await service.get_styles()
+        service.ttl = 0
+        start = time.monotonic()
+        stale = await service.get_styles()
+        elapsed = time.monotonic() - start
+        await service._refreshing
+        after_304 = await service.get_styles()
+        await asyncio.sleep(0.05)
+        kept = await service.get_styles()
+        return first, stale, elapsed, after_304, kept
+
+    service, seen, (first, stale, elapsed, after_304, kept) = run_catalog(
+        [(200, ["a.safetensors"], 0), (304, None, 0.3), (500, None, 0)], read
+    )
+    assert [s["name"] for s in first] == ["a.safetensors"]
+    assert stale is first and elapsed < 0.1
+    assert after_304 is first and kept is first
+    # The second request revalidated with the upstream ETag
+    assert seen[:2] == [None, '"v1"']
+    assert service.metrics["not_modified"] == 1
+    assert service.metrics["refresh_errors"] == 1
+
+
+def test_styles_endpoint_answers_304_for_matching_etag(monkeypatch):
+    """The frontend gets 304 while neither catalog changed."""
+    app = FastAPI()
+    app.include_router(styles.router, prefix="/api/styles")
+    client = TestClient(app)
+
+    def fetch(service):
+        async def loaded():
+            await service.get_styles()
+        return loaded()
+
+    service, _, _ = run_catalog([(200, ["a.safetensors"], 0)], fetch)
+    monkeypatch.setattr(styles, "lora_catalog_service", service)
+
+    response = client.get("/api/styles/")
+    assert response.status_code == 200
+    assert response.json()["loraStyles"][0]["id"] == "a.safetensors"
+    assert response.json()["artStyles"]
+    assert "catalogAge" in response.json()
+
+    etag = response.headers["ETag"]
+    assert client.get("/api/styles/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/styles/", headers={"If-None-Match": '"old"'}).status_code == 200
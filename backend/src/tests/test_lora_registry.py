@@ -0,0 +1,96 @@
+'''
+Test the LoRA registry queries and the cached generation metadata
+'''
+import sys
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.crud.lora import lora as lora_crud
+from src.schemas.lora import LoraUpdate
+from src.services.lora_registry_service import LoraRegistryService
+
+
+class RecordingSession:
+    """Stand-in session that records the SQL it is given."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, stmt):
+        self.statements.append(
+            str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        )
+
+    async def scalar(self, stmt):
+        self._record(stmt)
+        return 0
+
+    async def execute(self, stmt):
+        self._record(stmt)
+        return SimpleNamespace(
+            scalars=lambda: SimpleNamespace(all=lambda: []), all=lambda: [], rowcount=0
+        )
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+def test_search_filters_by_name_tags_and_availability():
+    """Listing pages by name and uses the tag containment operator."""
+    db = RecordingSession()
+    asyncio.run(lora_crud.search(db, q="50%_cat", tags=["anime", "pixel"], skip=50, limit=25))
+    count, page = db.statements
+    assert "count(*)" in count
+    # Wildcards typed by the user are matched literally (% is doubled by the compiler)
+    assert "name ILIKE '%%50\\%%\\_cat%%' ESCAPE" in page
+    assert "lora.loras.tags @> ARRAY['anime', 'pixel']" in page
+    assert "lora.loras.available = true" in page
+    assert "ORDER BY lora.loras.name" in page and "LIMIT 25 OFFSET 50" in page
+
+
+def test_sync_inserts_new_names_and_flags_removed_ones():
+    """New ComfyUI files are inserted once; missing ones are marked unavailable."""
+    db = RecordingSession()
+    asyncio.run(lora_crud.sync_names(db, names=["b.safetensors", "a.safetensors"]))
+    insert, mark_available, mark_removed = db.statements
+    assert "ON CONFLICT (name) DO NOTHING" in insert
+    assert "SET available=true" in mark_available
+    assert "NOT IN ('a.safetensors', 'b.safetensors')" in mark_removed
+
+
+def test_trigger_words_come_from_memory():
+    """Edited metadata is used for prompts without a database lookup."""
+    service = LoraRegistryService()
+    service.update_entry(
+        SimpleNamespace(
+            name="a.safetensors", available=True, trigger_words=" pixel art ",
+            base_strength=0.7, clip_skip=2,
+        )
+    )
+    service.update_entry(
+        SimpleNamespace(
+            name="b.safetensors", available=True, trigger_words=None,
+            base_strength=None, clip_skip=None,
+        )
+    )
+    assert service.trigger_words(["a.safetensors", "b.safetensors", "c"]) == "pixel art"
+    assert service.get("a.safetensors")["base_strength"] == 0.7
+
+
+def test_update_skips_null_tags_and_stamps_updated_at():
+    """A null tags field leaves the tags alone, and every edit bumps updated_at."""
+    lora = SimpleNamespace(tags=["anime"], trigger_words=None, description="old", updated_at=None)
+    item_in = LoraUpdate(tags=None, trigger_words="pixel art", description=None)
+    asyncio.run(lora_crud.update(RecordingSession(), db_obj=lora, obj_in=item_in))
+    assert lora.tags == ["anime"]
+    assert lora.trigger_words == "pixel art" and lora.description is None
+    assert lora.updated_at is not None
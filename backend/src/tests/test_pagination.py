@@ -0,0 +1,114 @@
+'''
+Test keyset pagination in CRUDBase and the list endpoints
+'''
+import sys
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api.deps import get_db
+from src.api.v1.endpoints import prompts
+from src.crud.base import InvalidCursorError
+from src.crud.prompt import prompt as prompt_crud
+from src.models.prompt import Prompt
+
+
+class AsyncSessionAdapter:
+    """Lets the async CRUD code run against a synchronous SQLite session."""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+
+@pytest.fixture
+def db():
+    # One shared connection, since the TestClient runs requests in another thread
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+
+    @event.listens_for(engine, "connect")
+    def attach_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS prompt")
+
+    Prompt.__table__.create(engine)
+    with Session(engine) as session:
+        start = datetime(2024, 1, 1)
+        # Pairs of prompts share a creation time, so id has to break the tie
+        session.add_all(
+            Prompt(id=i, prompt_name=f"p{i}", content="c", created_at=start + timedelta(minutes=i // 2))
+            for i in range(1, 24)
+        )
+        session.commit()
+        yield AsyncSessionAdapter(session)
+
+
+def walk(db, **kwargs):
+    """Follow the cursors through every page, returning the ids and page sizes."""
+    ids, sizes, cursor = [], [], None
+    while True:
+        items, cursor = asyncio.run(prompt_crud.get_page(db, cursor=cursor, limit=5, **kwargs))
+        ids += [item.id for item in items]
+        sizes.append(len(items))
+        if cursor is None:
+            return ids, sizes
+
+
+def test_cursors_walk_every_row_once_in_a_stable_order(db):
+    """Each sort order visits all rows exactly once, ties broken by id."""
+    assert walk(db) == (list(range(1, 24)), [5, 5, 5, 5, 3])
+    ids, _ = walk(db, order_by="created_at", descending=True)
+    assert ids == list(range(23, 0, -1))
+
+
+def test_rows_without_created_at_are_paged_last(db):
+    """Legacy rows with a NULL created_at sort after every timestamp instead of vanishing."""
+    db.session.add_all(Prompt(id=i, prompt_name=f"p{i}", content="c") for i in range(24, 31))
+    db.session.flush()
+    # Overwrite the server default, like rows created before the column had one
+    db.session.execute(update(Prompt).where(Prompt.id >= 24).values(created_at=None))
+    db.session.commit()
+    # Pages end inside the NULL rows as well as on both sides of them
+    assert walk(db, order_by="created_at") == (list(range(1, 31)), [5, 5, 5, 5, 5, 5])
+    ids, _ = walk(db, order_by="created_at", descending=True)
+    assert ids == list(range(30, 0, -1))
+
+
+def test_rejects_tampered_or_mismatched_cursors(db):
+    """Cursors are opaque and only valid for the sort order that issued them."""
+    _, cursor = asyncio.run(prompt_crud.get_page(db, limit=5))
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(prompt_crud.get_page(db, cursor=cursor, order_by="created_at"))
+    with pytest.raises(InvalidCursorError):
+        asyncio.run(prompt_crud.get_page(db, cursor="not-a-cursor"))
+    with pytest.raises(ValueError):
+        asyncio.run(prompt_crud.get_page(db, order_by="content"))
+
+
+def test_list_endpoint_returns_next_cursor_header(db):
+    """The prompt list keeps its body and hands out the next page in a header."""
+    app = FastAPI()
+    app.include_router(prompts.router, prefix="/api/prompts")
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    first = client.get("/api/prompts/", params={"limit": 20})
+    assert [p["id"] for p in first.json()] == list(range(1, 21))
+    second = client.get("/api/prompts/", params={"limit": 20, "cursor": first.headers["X-Next-Cursor"]})
+    assert [p["id"] for p in second.json()] == [21, 22, 23]
+    assert "X-Next-Cursor" not in second.headers
+
+    assert client.get("/api/prompts/", params={"cursor": "bogus"}).status_code == 400
@@ -0,0 +1,71 @@
+'''
+Test the RPM/TPM rate limiter for LLM calls
+'''
+import sys
+import asyncio
+from pathlib import Path
+import pytest
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.utils.rate_limiter import RateLimiter, RateLimitExceeded
+
+
+def test_disabled_without_limits():
+    """No limits configured means every call goes straight through."""
+    limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=0)
+    assert not limiter.enabled
+    assert asyncio.run(limiter.acquire(10_000)) == 0.0
+
+
+def test_waiting_caller_does_not_hold_the_lock():
+    """A caller sleeping for quota leaves the lock free for the others."""
+    # One request per second with no burst beyond a single request
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=0, burst_seconds=1)
+
+    async def run():
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.1)
+        assert limiter.metrics["waiting"] == 1
+        assert not limiter._lock.locked()
+        waited = await queued
+        return waited
+
+    assert 0.5 < asyncio.run(run()) < 1.5
+
+
+def test_gives_up_after_max_wait():
+    """A caller that would queue past max_wait fails straight away."""
+    limiter = RateLimiter(
+        "test", requests_per_minute=60, tokens_per_minute=0, burst_seconds=1, max_wait=0.5
+    )
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire()
+
+    asyncio.run(run())
+    assert limiter.metrics["timeouts"] == 1
+
+
+def test_callers_are_served_in_arrival_order():
+    """Queued callers get quota first come, first served, each after its own wait."""
+    # Ten requests per second, bursts of one
+    limiter = RateLimiter("test", requests_per_minute=600, tokens_per_minute=0, burst_seconds=0.1)
+    served = []
+
+    async def take(name):
+        await limiter.acquire()
+        served.append(name)
+
+    async def run():
+        await asyncio.gather(*(take(name) for name in "abcde"))
+
+    asyncio.run(run())
+    assert served == list("abcde")
+    assert 0.35 < limiter.metrics["max_wait_seconds"] < 0.6
+    assert limiter.metrics["timeouts"] == 0
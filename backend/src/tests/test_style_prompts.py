@@ -0,0 +1,158 @@
+'''
+Test expanding several style prompts with one structured LLM call
+'''
+import sys
+import json
+import asyncio
+import threading
+from pathlib import Path
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.image_service import ImageService
+
+
+def make_service(stubs, answer_batch):
+    """GPTService whose completions are answered locally and recorded."""
+    service = stubs.gpt_service()
+    calls = []
+
+    async def generate_with_prompt(description, response_format=None, use_cache=True):
+        calls.append((description, response_format, use_cache))
+        if response_format:
+            return json.dumps(answer_batch(response_format))
+        return f"single {description}"
+
+    service.generate_with_prompt = generate_with_prompt
+    return service, calls
+
+
+def test_expands_all_styles_in_one_call(stubs):
+    """Ten styles take one request and come back in style order."""
+    def answer(response_format):
+        labels = response_format["json_schema"]["schema"]["properties"]["prompts"]["items"][
+            "properties"
+        ]["style"]["enum"]
+        return {"prompts": [{"style": l, "prompt": f"batch {l}"} for l in reversed(labels)]}
+
+    service, calls = make_service(stubs, answer)
+    styles = [f"lora{i}:0.8" for i in range(10)]
+    prompts = asyncio.run(service.expand_style_prompts("A cat in {art_style_list}", styles))
+    assert prompts == [f"batch {s}" for s in styles]
+    assert len(calls) == 1
+
+
+def test_falls_back_per_style_when_batch_is_incomplete(stubs):
+    """Styles missing from the structured answer are expanded one by one."""
+    service, calls = make_service(
+        stubs,
+        lambda _: {"prompts": [{"style": "a:1", "prompt": "batch a"}]}
+    )
+    prompts = asyncio.run(service.expand_style_prompts("{art_style_list}", ["a:1", "b:1", "a:1"]))
+    assert prompts == ["batch a", "single b:1", "batch a"]
+    assert len(calls) == 2
+
+
+def test_render_prompts_bypass_the_response_cache(stubs):
+    """Regenerating images asks the LLM again instead of reusing cached text."""
+    service, calls = make_service(
+        stubs,
+        lambda _: {"prompts": [{"style": "a:1", "prompt": "batch a"}]}
+    )
+    image_service = ImageService()
+    image_service.gpt_service = service
+    asyncio.run(image_service._style_prompts("{art_style_list}", ["a:1", "b:1"]))
+    image_service.batch_style_prompts = False
+    asyncio.run(image_service._style_prompts("{art_style_list}", ["a:1"]))
+    assert [use_cache for _, _, use_cache in calls] == [False, False, False]
+
+
+def test_each_render_gets_its_own_prompt(monkeypatch, stubs):
+    """Stacked LoRA and art renders of one prompt are sampled separately, as is."""
+    from src.services import comfy_service
+
+    service, calls = make_service(stubs, lambda _: {})
+    image_service = ImageService()
+    image_service.gpt_service = service
+    rendered = []
+    monkeypatch.setattr(
+        comfy_service, "comfy_call_stacked_lora",
+        lambda name, prompt, loras, batch_size: rendered.append(prompt) or [],
+    )
+    monkeypatch.setattr(
+        comfy_service, "comfy_call_stacked_art",
+        lambda name, prompt, batch_size: rendered.append(prompt) or [],
+    )
+    styles = [
+        {"id": "a", "styleType": "lora", "styleStrength": 1, "batchSize": 1},
+        {"id": "b", "styleType": "art", "styleStrength": 1, "batchSize": 1},
+    ]
+    asyncio.run(
+        image_service.generate_images(
+            json.dumps([{"name": "p", "content": "A cat"}]), json.dumps(styles), "", True
+        )
+    )
+    assert calls == [("A cat", None, False), ("A cat", None, False)]
+    assert len(rendered) == 2
+
+
+def test_render_prompts_are_paced(monkeypatch):
+    """At most prompt_concurrency prompt calls are in flight at once."""
+    from src.services import comfy_service
+
+    class PacedService:
+        in_flight = peak = 0
+
+        async def generate_with_prompt(self, description, response_format=None, use_cache=True):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return description
+
+    image_service = ImageService()
+    image_service.gpt_service = PacedService()
+    image_service.prompt_concurrency = 2
+    monkeypatch.setattr(
+        comfy_service, "comfy_call_single_art",
+        lambda name, prompt, style, batch_size: [prompt],
+    )
+    styles = [
+        {"id": f"s{i}", "styleType": "art", "styleStrength": 1, "batchSize": 1}
+        for i in range(6)
+    ]
+    results = asyncio.run(
+        image_service.generate_images(
+            json.dumps([{"name": "p", "content": "A cat"}]), json.dumps(styles), "", False
+        )
+    )
+    assert results == ["A cat"] * 6
+    assert image_service.gpt_service.peak == 2
+
+
+def test_renders_run_off_the_event_loop(monkeypatch):
+    """ComfyUI calls, including loading its runtime, happen in a worker thread."""
+    from src.services import comfy_service
+
+    class EchoService:
+        async def generate_with_prompt(self, description, response_format=None, use_cache=True):
+            return description
+
+    image_service = ImageService()
+    image_service.gpt_service = EchoService()
+    threads = []
+    monkeypatch.setattr(
+        comfy_service, "comfy_call_single_lora",
+        lambda name, prompt, lora, batch_size, style_strength: threads.append(
+            threading.get_ident()
+        ) or [],
+    )
+    styles = [{"id": "a", "styleType": "lora", "styleStrength": 1, "batchSize": 1}]
+    asyncio.run(
+        image_service.generate_images(
+            json.dumps([{"name": "p", "content": "A cat"}]), json.dumps(styles), "", False
+        )
+    )
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,94 @@
+'''
+Test the fit modes used when compositing a template over a base image
+'''
+import sys
+from pathlib import Path
+import pytest
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.image_service import ImageService
+
+RED, BLUE, GREEN, PAD = (220, 20, 20), (20, 20, 220), (20, 200, 20), (0, 0, 0)
+
+
+def close_to(pixel, color, tolerance=40):
+    return all(abs(a - b) <= tolerance for a, b in zip(pixel[:3], color))
+
+
+@pytest.fixture(params=["JPEG", "PNG"])
+def images(request, tmp_path):
+    """A 2:1 base, red on the left and blue on the right, and a square template
+    that is transparent except for a green top-left corner."""
+    # Large enough that JPEG bases are decoded at a reduced DCT scale
+    base = Image.new("RGB", (1600, 800), RED)
+    base.paste(BLUE, (800, 0, 1600, 800))
+    base_path = tmp_path / f"base.{request.param.lower()}"
+    base.save(base_path, format=request.param, quality=95)
+
+    template = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+    template.paste(GREEN + (255,), (0, 0, 10, 10))
+    template_path = tmp_path / "template.png"
+    template.save(template_path)
+    return str(base_path), str(template_path)
+
+
+def composite(images, fit_mode):
+    return ImageService().composite_template(*images, fit_mode=fit_mode)
+
+
+def test_stretch_keeps_the_base_size_by_default(images):
+    """The template is resized onto the full base image."""
+    result = ImageService().composite_template(*images)
+    assert result.size == (1600, 800)
+    assert close_to(result.getpixel((50, 50)), GREEN)
+    assert close_to(result.getpixel((400, 400)), RED)
+    assert close_to(result.getpixel((1200, 400)), BLUE)
+
+
+def test_fit_letterboxes_the_template_inside_the_base(images):
+    """The template keeps its aspect ratio, centred on the unscaled base."""
+    result = composite(images, "fit")
+    assert result.size == (1600, 800)
+    # Scaled to 800x800 and centred, so its green corner starts at x=400
+    assert close_to(result.getpixel((450, 50)), GREEN)
+    assert close_to(result.getpixel((50, 50)), RED)
+
+
+def test_cover_crops_the_centre_of_the_base(images):
+    """The output has the template size and shows the centred square of the base."""
+    result = composite(images, "cover")
+    assert result.size == (100, 100)
+    assert close_to(result.getpixel((5, 5)), GREEN)
+    # The centre crop spans x=400..1200 of the base, half red and half blue
+    assert close_to(result.getpixel((25, 50)), RED)
+    assert close_to(result.getpixel((75, 50)), BLUE)
+
+
+def test_pad_letterboxes_the_base_inside_the_template(images):
+    """The whole base is scaled to 100x50 and centred, the rest is padding."""
+    result = composite(images, "pad")
+    assert result.size == (100, 100)
+    assert close_to(result.getpixel((5, 5)), GREEN)
+    assert close_to(result.getpixel((50, 15)), PAD)
+    assert close_to(result.getpixel((50, 85)), PAD)
+    assert close_to(result.getpixel((25, 50)), RED)
+    assert close_to(result.getpixel((75, 50)), BLUE)
+
+
+def test_jpeg_draft_keeps_the_crop_box_in_place(tmp_path):
+    """Reduced-scale JPEG decoding rescales the crop box along with the image."""
+    # Only the base's right quarter is green, so a wrong box shows red
+    base = Image.new("RGB", (1600, 800), RED)
+    base.paste(GREEN, (1200, 0, 1600, 800))
+    base.save(tmp_path / "base.jpg", quality=95)
+    with Image.open(tmp_path / "base.jpg") as img:
+        scaled = ImageService()._load_scaled(img, (100, 200), box=(1200, 0, 1600, 800))
+        # draft picked a reduced DCT scale instead of decoding all 1600x800 pixels
+        assert img.size[0] < 1600
+    assert scaled.size == (100, 200) and scaled.mode == "RGBA"
+    assert close_to(scaled.getpixel((5, 100)), GREEN)
+    assert close_to(scaled.getpixel((95, 100)), GREEN)
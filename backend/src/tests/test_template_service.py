@@ -0,0 +1,22 @@
+'''
+Test the in-memory template catalog
+'''
+import sys
+from pathlib import Path
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.services.template_service import TemplateService
+
+
+def test_unreadable_template_is_skipped(tmp_path):
+    """A corrupt PNG is left out of the catalog instead of failing the listing."""
+    Image.new("RGBA", (160, 90)).save(tmp_path / "banner.png")
+    (tmp_path / "broken_1_1.png").write_bytes(b"not a png")
+    service = TemplateService(str(tmp_path))
+    templates = service.list_templates()
+    assert [t.name for t in templates] == ["banner.png"]
+    assert templates[0].aspect == "16:9"
@@ -0,0 +1,144 @@
+'''
+Test the template generation endpoint
+'''
+import os
+import sys
+import base64
+import zipfile
+from io import BytesIO
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+# add project root directory to Python import path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.api.v1.endpoints import templates
+from src.services.template_service import TemplateService
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(templates.router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """A catalog holding one 400x200 template, with thumbnails cached under tmp_path."""
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    Image.new("RGBA", (400, 200), (0, 0, 255, 255)).save(templates_dir / "banner_2_1.png")
+    monkeypatch.setenv("THUMBNAIL_CACHE_DIR", str(tmp_path / "thumbnails"))
+    service = TemplateService(str(templates_dir))
+    monkeypatch.setattr(templates, "template_service", service)
+    return service
+
+
+def png(size, color):
+    buffer = BytesIO()
+    Image.new("RGBA", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate(client, base_names=("base.png",), **form):
+    files = [("base_images", (name, png((64, 32), (200, 0, 0, 255)), "image/png")) for name in base_names]
+    files.append(("template_image", ("frame.png", png((32, 32), (0, 0, 0, 0)), "image/png")))
+    return client.post("/api/generate-template/", files=files, data=form)
+
+
+@pytest.mark.parametrize(
+    "output_format, mime_type",
+    [("png", "image/png"), ("webp", "image/webp"), ("jpeg", "image/jpeg"), ("JPG", "image/jpeg")],
+)
+def test_encodes_every_output_format(client, output_format, mime_type):
+    """Each format, and the jpg alias, comes back as a data URI of that type."""
+    response = generate(client, output_format=output_format, quality="70")
+    assert response.status_code == 200
+    [image] = response.json()["images"]
+    header, data = image["imageBase64"].split(",", 1)
+    assert header == f"data:{mime_type};base64"
+    decoded = Image.open(BytesIO(base64.b64decode(data)))
+    assert decoded.format == mime_type.split("/")[1].upper()
+    assert decoded.size == (64, 32)
+
+
+@pytest.mark.parametrize(
+    "form",
+    [
+        {"output_format": "gif"},
+        {"quality": "0"},
+        {"quality": "101"},
+        {"compress_level": "10"},
+        {"fit_mode": "zoom"},
+        {"response_mode": "tar"},
+    ],
+)
+def test_rejects_invalid_encoding_options(client, form):
+    assert generate(client, **form).status_code == 400
+
+
+def test_zip_response_deduplicates_file_names(client):
+    """Uploads sharing a name get numbered entries in the archive."""
+    response = generate(
+        client,
+        base_names=("shot.png", "shot.png", "other.png"),
+        output_format="webp",
+        response_mode="zip",
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["shot.webp", "shot_1.webp", "other.webp"]
+        with archive.open("shot_1.webp") as entry:
+            assert Image.open(entry).format == "WEBP"
+
+
+def test_thumbnail_is_rendered_and_revalidated(client, catalog):
+    """The first request renders the thumbnail, a matching ETag gets a 304."""
+    url = "/api/psd-templates/banner_2_1/thumbnail"
+    response = client.get(url, params={"size": 128, "format": "png"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert Image.open(BytesIO(response.content)).size == (128, 64)
+
+    etag = response.headers["etag"]
+    cached = client.get(url, params={"size": 128, "format": "png"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    # Another size is a different resource
+    other = client.get(url, params={"size": 64, "format": "png"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+@pytest.mark.parametrize("params", [{"size": 100}, {"format": "gif"}])
+def test_thumbnail_rejects_unsupported_options(client, catalog, params):
+    response = client.get("/api/psd-templates/banner_2_1/thumbnail", params=params)
+    assert response.status_code == 400
+
+
+def test_thumbnail_of_unknown_template_is_not_found(client, catalog):
+    assert client.get("/api/psd-templates/missing/thumbnail").status_code == 404
+
+
+def test_edited_template_replaces_stale_thumbnails(client, catalog):
+    """Overwriting a template changes its ETag and removes the old cache file."""
+    url = "/api/psd-templates/banner_2_1/thumbnail"
+    first = client.get(url)
+    assert first.status_code == 200
+    [stale] = os.listdir(catalog.thumbnail_dir)
+
+    path = catalog.get_template("banner_2_1").path
+    Image.new("RGBA", (400, 200), (255, 0, 0, 255)).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    second = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert stale not in os.listdir(catalog.thumbnail_dir)
+    assert len(os.listdir(catalog.thumbnail_dir)) == 1
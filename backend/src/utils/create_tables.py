@@ -231,6 +231,187 @@ def check_and_update_foreign_keys():
         if 'conn' in locals():
             conn.close()
 
+# Indexes backing keyset pagination of the list endpoints
+PAGINATION_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_user_users_created_at_id ON "user".users (created_at, id);',
+    "CREATE INDEX IF NOT EXISTS ix_prompt_prompts_created_at_id ON prompt.prompts (created_at, id);",
+    "CREATE INDEX IF NOT EXISTS ix_team_team_created_at_id ON team.team (created_at, id);",
+    "CREATE INDEX IF NOT EXISTS ix_team_team_members_team_id_id ON team.team_members (team_id, id);",
+    "CREATE INDEX IF NOT EXISTS ix_team_team_members_user_id_id ON team.team_members (user_id, id);",
+)
+
+def ensure_pagination_indexes():
+    """Create the indexes used for keyset pagination if they are missing"""
+    try:
+        # Connect to database
+        conn = psycopg2.connect(
+            database=DB_NAME,
+            user=DB_USER,
+            host=DB_HOST,
+            password=DB_PASSWORD,
+            port=DB_PORT,
+        )
+        
+        # Create cursor
+        with conn.cursor() as cur:
+            for statement in PAGINATION_INDEXES:
+                cur.execute(statement)
+            conn.commit()
+            print("All pagination indexes exist")
+            return True
+    
+    except Exception as e:
+        print(f"Error creating pagination indexes: {e}")
+        return False
+    
+    finally:
+        # Close connection
+        if 'conn' in locals():
+            conn.close()
+
+# LoRA registry table; the ALTERs add columns missing from tables created before them
+LORA_REGISTRY_DDL = (
+    "CREATE SCHEMA IF NOT EXISTS lora;",
+    """
+    CREATE TABLE IF NOT EXISTS lora.loras (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR(255) UNIQUE NOT NULL,
+        trigger_words VARCHAR(255),
+        clip_skip INTEGER,
+        base_strength DOUBLE PRECISION,
+        description TEXT,
+        tags VARCHAR(64)[] NOT NULL DEFAULT '{}',
+        available BOOLEAN NOT NULL DEFAULT TRUE,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    "ALTER TABLE lora.loras ADD COLUMN IF NOT EXISTS tags VARCHAR(64)[] NOT NULL DEFAULT '{}';",
+    "ALTER TABLE lora.loras ADD COLUMN IF NOT EXISTS available BOOLEAN NOT NULL DEFAULT TRUE;",
+    "ALTER TABLE lora.loras ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;",
+    "CREATE INDEX IF NOT EXISTS ix_lora_loras_id ON lora.loras (id);",
+    "CREATE INDEX IF NOT EXISTS ix_loras_tags ON lora.loras USING gin (tags);",
+    "CREATE INDEX IF NOT EXISTS ix_lora_loras_available ON lora.loras (available);",
+)
+
+# Substring search on LoRA names; needs the pg_trgm extension
+LORA_NAME_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX IF NOT EXISTS ix_loras_name_trgm ON lora.loras USING gin (name gin_trgm_ops);",
+)
+
+def ensure_lora_registry():
+    """Create the LoRA registry table and its indexes if they are missing"""
+    try:
+        # Connect to database
+        conn = psycopg2.connect(
+            database=DB_NAME,
+            user=DB_USER,
+            host=DB_HOST,
+            password=DB_PASSWORD,
+            port=DB_PORT,
+        )
+        
+        # Create cursor
+        with conn.cursor() as cur:
+            for statement in LORA_REGISTRY_DDL:
+                cur.execute(statement)
+            conn.commit()
+            print("LoRA registry table exists")
+            
+            # Creating an extension may need privileges the app user lacks
+            try:
+                for statement in LORA_NAME_SEARCH_DDL:
+                    cur.execute(statement)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"LoRA name search will not be indexed: {e}")
+            return True
+    
+    except Exception as e:
+        print(f"Error creating LoRA registry table: {e}")
+        return False
+    
+    finally:
+        # Close connection
+        if 'conn' in locals():
+            conn.close()
+
+# Tables of the optional LLM features: the persistent response cache, the rate
+# limit buckets shared by worker processes and the daily token usage rollup
+LLM_TABLES_DDL = (
+    "CREATE SCHEMA IF NOT EXISTS llm;",
+    """
+    CREATE TABLE IF NOT EXISTS llm.responses (
+        key VARCHAR(64) PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_llm_responses_expires_at ON llm.responses (expires_at);",
+    """
+    CREATE TABLE IF NOT EXISTS llm.rate_limit_buckets (
+        name VARCHAR(64) PRIMARY KEY,
+        tokens DOUBLE PRECISION NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm.usage_daily (
+        day DATE NOT NULL,
+        team_id INTEGER NOT NULL,
+        user_id VARCHAR(64) NOT NULL,
+        endpoint VARCHAR(255) NOT NULL,
+        backend VARCHAR(32) NOT NULL,
+        model VARCHAR(64) NOT NULL,
+        calls BIGINT NOT NULL DEFAULT 0,
+        estimated_calls BIGINT NOT NULL DEFAULT 0,
+        prompt_tokens BIGINT NOT NULL DEFAULT 0,
+        completion_tokens BIGINT NOT NULL DEFAULT 0,
+        image_tokens BIGINT NOT NULL DEFAULT 0,
+        cached_tokens BIGINT NOT NULL DEFAULT 0,
+        total_tokens BIGINT NOT NULL DEFAULT 0,
+        latency_ms_total DOUBLE PRECISION NOT NULL DEFAULT 0,
+        latency_ms_max DOUBLE PRECISION NOT NULL DEFAULT 0,
+        cost DOUBLE PRECISION NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (day, team_id, user_id, endpoint, backend, model)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_llm_usage_daily_team_id ON llm.usage_daily (team_id);",
+)
+
+def ensure_llm_tables():
+    """Create the tables used by the LLM features if they are missing"""
+    try:
+        # Connect to database
+        conn = psycopg2.connect(
+            database=DB_NAME,
+            user=DB_USER,
+            host=DB_HOST,
+            password=DB_PASSWORD,
+            port=DB_PORT,
+        )
+        
+        # Create cursor
+        with conn.cursor() as cur:
+            for statement in LLM_TABLES_DDL:
+                cur.execute(statement)
+            conn.commit()
+            print("LLM tables exist")
+            return True
+    
+    except Exception as e:
+        print(f"Error creating LLM tables: {e}")
+        return False
+    
+    finally:
+        # Close connection
+        if 'conn' in locals():
+            conn.close()
+
 def create_tables():
     """Create user and prompts tables, and check/update foreign key constraints"""
     # First check if tables exist
@@ -250,6 +431,9 @@ def create_tables():
         print("All tables already exist, no need to create")
         # Even if all tables exist, we still need to check foreign key constraints
         fk_check_result = check_and_update_foreign_keys()
+        ensure_pagination_indexes()
+        ensure_lora_registry()
+        ensure_llm_tables()
         print("**********DATABASE SELF-CHECKING END**********")
         return True
     
@@ -369,6 +553,9 @@ def create_tables():
             
             # After creating tables, check and update foreign key constraints
             check_and_update_foreign_keys()
+            ensure_pagination_indexes()
+            ensure_lora_registry()
+            ensure_llm_tables()
             return True
     
     except Exception as e:
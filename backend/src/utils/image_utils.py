@@ -1,28 +1,53 @@
 """Image utility functions"""
 
-from typing import Optional
+from typing import List, Tuple, TYPE_CHECKING
 import base64
-import requests
-from fastapi import UploadFile
 
+if TYPE_CHECKING:
+    from PIL import Image
 
 
-def validate_image_url(image_url):
-    """Function to validate image url"""
-    try:
-        response = requests.head(image_url, timeout=10)
-        response.raise_for_status()
-        content_length = response.headers.get("Content-Length")
-        if content_length and int(content_length) > 20971520:
-            raise ValueError("The image size is larger than 20 MB.")
-    except requests.exceptions.RequestException as e:
-        raise ValueError(f"Invalid or inaccessible image URL: {e}") from e
 
+def image_mime_type(image_base64: str) -> str:
+    """Sniff the MIME type of a base64 encoded image from its magic bytes."""
+    # 16 base64 characters decode to the first 12 bytes, enough for every signature
+    header = base64.b64decode(image_base64[:16] + "=" * (-len(image_base64[:16]) % 4))
+    if header.startswith(b"\x89PNG"):
+        return "image/png"
+    if header.startswith(b"GIF8"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
 
-async def process_image(image: Optional[UploadFile]) -> Optional[str]:
-    """Function to convert image to base64."""
-    if image:
-        contents = await image.read()
-        return base64.b64encode(contents).decode("utf-8")
-    return None
 
+def compute_alpha_regions(
+    image: "Image.Image", band_height: int = 16
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Find the boxes of an image that contain non-transparent pixels.
+    The image is scanned in horizontal bands and consecutive non-empty bands are
+    merged, so chrome at the top and bottom edges ends up in separate regions.
+    """
+    if "A" not in image.getbands():
+        return [(0, 0, *image.size)]
+
+    alpha = image.getchannel("A")
+    width, height = alpha.size
+    regions = []
+    current = None
+    for top in range(0, height, band_height):
+        bbox = alpha.crop((0, top, width, min(top + band_height, height))).getbbox()
+        if bbox is None:
+            if current:
+                regions.append(current)
+                current = None
+            continue
+        box = (bbox[0], top + bbox[1], bbox[2], top + bbox[3])
+        if current is None:
+            current = box
+        else:
+            current = (min(current[0], box[0]), current[1], max(current[2], box[2]), box[3])
+    if current:
+        regions.append(current)
+    return regions
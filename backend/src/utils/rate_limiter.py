@@ -0,0 +1,202 @@
+"""Token bucket rate limiting for outbound calls"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a caller would have to queue longer than max_wait."""
+
+
+class TokenBucket:
+    """In-process token bucket refilled continuously."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.refill_per_second
+        )
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount tokens are available."""
+        self._refill()
+        missing = amount - self.tokens
+        return 0.0 if missing <= 0 else missing / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter.
+    Callers are served in arrival order and wait for at most max_wait seconds.
+    With shared=True the buckets live in Postgres (llm.rate_limit_buckets, created
+    by utils/create_tables.py) so every worker process draws from the same quota.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        burst_seconds: float = 10.0,
+        max_wait: float = 30.0,
+        shared: bool = False,
+    ):
+        self.name = name
+        self.max_wait = max_wait
+        self.shared = shared
+        # Azure enforces quotas over short windows, so only allow a short burst
+        self.limits: Dict[str, Tuple[float, float]] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        for kind, per_minute in (("requests", requests_per_minute), ("tokens", tokens_per_minute)):
+            if per_minute > 0:
+                capacity = max(1.0, per_minute * burst_seconds / 60)
+                self.limits[kind] = (capacity, per_minute / 60)
+                self.buckets[kind] = TokenBucket(capacity, per_minute / 60)
+        self._lock = asyncio.Lock()
+        self._recent_waits = deque(maxlen=1000)
+        self.metrics = {
+            "acquired": 0,
+            "queued": 0,
+            "waiting": 0,
+            "timeouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "shared_errors": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limits)
+
+    async def acquire(self, tokens: float = 0) -> float:
+        """Wait until one request and the estimated tokens fit in the quota, return the wait."""
+        if not self.enabled:
+            return 0.0
+        amounts = {"requests": 1.0, "tokens": float(tokens)}
+        # A single request larger than the burst would otherwise never fit
+        amounts = {
+            kind: min(amounts[kind], capacity) for kind, (capacity, _) in self.limits.items()
+        }
+
+        start = time.monotonic()
+        self.metrics["waiting"] += 1
+        try:
+            # Quota is reserved in arrival order: each caller takes its tokens right
+            # away, letting the bucket go negative, and sleeps off the deficit it
+            # created. Later callers queue behind that deficit, so nobody is overtaken.
+            async with self._lock:
+                if self.shared:
+                    wait = await self._reserve_shared(amounts)
+                else:
+                    wait = self._reserve_local(amounts)
+            if wait is None:
+                self.metrics["timeouts"] += 1
+                raise RateLimitExceeded(
+                    f"Rate limit queue for {self.name} exceeded {self.max_wait}s"
+                )
+            if wait > 0:
+                await asyncio.sleep(wait)
+        finally:
+            self.metrics["waiting"] -= 1
+
+        waited = time.monotonic() - start
+        self.metrics["acquired"] += 1
+        if waited > 0.001:
+            self.metrics["queued"] += 1
+        self.metrics["total_wait_seconds"] += waited
+        self.metrics["max_wait_seconds"] = max(self.metrics["max_wait_seconds"], waited)
+        self._recent_waits.append(waited)
+        return waited
+
+    def _reserve_local(self, amounts: Dict[str, float]) -> Optional[float]:
+        """Reserve from the in-process buckets and return the wait, or None past max_wait."""
+        wait = max(self.buckets[kind].time_until(amount) for kind, amount in amounts.items())
+        if wait > self.max_wait:
+            return None
+        for kind, amount in amounts.items():
+            self.buckets[kind].consume(amount)
+        return wait
+
+    async def _reserve_shared(self, amounts: Dict[str, float]) -> Optional[float]:
+        """Reserve from the Postgres buckets, falling back to local ones if the database fails."""
+        # Imported lazily so the database engine is only built when sharing is enabled
+        from src.db.session import AsyncSessionLocal
+
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = {}
+                # Lock rows in a fixed order so concurrent workers cannot deadlock
+                for kind in sorted(amounts):
+                    capacity, _ = self.limits[kind]
+                    bucket_name = f"{self.name}:{kind}"
+                    await db.execute(
+                        text(
+                            "INSERT INTO llm.rate_limit_buckets (name, tokens, updated_at) "
+                            "VALUES (:name, :tokens, clock_timestamp()) "
+                            "ON CONFLICT (name) DO NOTHING"
+                        ),
+                        {"name": bucket_name, "tokens": capacity},
+                    )
+                    result = await db.execute(
+                        text(
+                            "SELECT tokens, EXTRACT(EPOCH FROM clock_timestamp() - updated_at) "
+                            "FROM llm.rate_limit_buckets WHERE name = :name FOR UPDATE"
+                        ),
+                        {"name": bucket_name},
+                    )
+                    stored, elapsed = result.first()
+                    rows[kind] = min(capacity, stored + float(elapsed) * self.limits[kind][1])
+
+                wait = max(
+                    0.0,
+                    *(
+                        (amount - rows[kind]) / self.limits[kind][1]
+                        for kind, amount in amounts.items()
+                    ),
+                )
+                reserved = wait <= self.max_wait
+                for kind in sorted(amounts):
+                    remaining = rows[kind] - amounts[kind] if reserved else rows[kind]
+                    await db.execute(
+                        text(
+                            "UPDATE llm.rate_limit_buckets "
+                            "SET tokens = :tokens, updated_at = clock_timestamp() "
+                            "WHERE name = :name"
+                        ),
+                        {"name": f"{self.name}:{kind}", "tokens": remaining},
+                    )
+                await db.commit()
+                return wait if reserved else None
+        except Exception as e:
+            # Never block LLM calls on the database; keep limiting per process instead
+            self.metrics["shared_errors"] += 1
+            print(f"Error using shared rate limit, falling back to local: {str(e)}")
+            return self._reserve_local(amounts)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return queue wait statistics."""
+        waits: List[float] = sorted(self._recent_waits)
+        return {
+            **self.metrics,
+            "enabled": self.enabled,
+            "shared": self.shared,
+            "limits_per_minute": {
+                kind: rate * 60 for kind, (_, rate) in self.limits.items()
+            },
+            "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+            "wait_p95_seconds": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
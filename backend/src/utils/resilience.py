@@ -0,0 +1,232 @@
+"""Retry, circuit breaker and request hedging helpers for outbound calls"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class RetryableError(RuntimeError):
+    """Failure worth retrying, e.g. a timeout, 429 or 5xx response."""
+
+    def __init__(
+        self,
+        message: str,
+        retry_after: Optional[float] = None,
+        counts_as_failure: bool = True,
+    ):
+        super().__init__(message)
+        self.retry_after = retry_after
+        # Throttling means the endpoint is alive, so it should not trip the breaker
+        self.counts_as_failure = counts_as_failure
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the endpoint while the circuit is open."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return whether a call may go out now."""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        # Half open: let exactly one probe through
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def is_open(self) -> bool:
+        """Return whether calls are currently refused, without claiming the probe."""
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        """Close the circuit after a call reached a healthy endpoint."""
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give up the half-open probe without a verdict, e.g. when it was cancelled."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit once the threshold is reached."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """Run an async call with jittered retries, a circuit breaker and optional hedging."""
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_retry_after: float = 30.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_delay: float = 0.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.hedge_delay = hedge_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+        }
+
+    def compute_delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2**retry)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Call func until it succeeds, raises a non-retryable error or retries run out.
+        discard releases a result that lost a hedge race, e.g. closes an open response.
+        """
+        self.metrics["calls"] += 1
+        retry = 0
+        while True:
+            if not self.breaker.allow_request():
+                self.metrics["short_circuited"] += 1
+                raise CircuitOpenError("LLM endpoint circuit is open, failing fast")
+
+            self.metrics["attempts"] += 1
+            try:
+                result = await self._hedged(func, discard)
+            except RetryableError as e:
+                if e.counts_as_failure:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if retry >= self.max_retries:
+                    self.metrics["failures"] += 1
+                    raise
+                self.metrics["retries"] += 1
+                await asyncio.sleep(self.compute_delay(retry, e.retry_after))
+                retry += 1
+                continue
+            except Exception:
+                # Non-retryable errors (e.g. 400) still prove the endpoint is reachable
+                self.breaker.record_success()
+                self.metrics["failures"] += 1
+                raise
+            except BaseException:
+                # Cancelled mid-attempt (timeout, client gone): let the next call probe
+                self.breaker.release_probe()
+                raise
+
+            self.breaker.record_success()
+            return result
+
+    async def _hedged(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> Any:
+        """Start a second identical request if the first is slower than hedge_delay."""
+        if not self.hedge_delay:
+            return await func()
+
+        first = asyncio.ensure_future(func())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+
+        self.metrics["hedges"] += 1
+        second = asyncio.ensure_future(func())
+        pending = {first, second}
+        winner = None
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        if task is second:
+                            self.metrics["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (first, second):
+                if task is not winner:
+                    task.cancel()
+                    task.add_done_callback(lambda t: self._discard_loser(t, discard))
+
+    @staticmethod
+    def _discard_loser(
+        task: asyncio.Future, discard: Optional[Callable[[Any], Awaitable[Any]]]
+    ) -> None:
+        """Release the result of a request that finished after losing the race."""
+        if task.cancelled() or task.exception() is not None:
+            return
+        if discard is not None:
+            asyncio.ensure_future(discard(task.result()))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return retry/hedge counters and the breaker state."""
+        return {
+            **self.metrics,
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+        }
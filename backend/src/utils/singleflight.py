@@ -0,0 +1,85 @@
+"""Coalescing of concurrent identical calls into one in-flight call"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Flight:
+    """One shared call and the number of callers still waiting for it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time. Callers that arrive while a call
+    for their key is in flight wait for it and get the same result or error.
+    The shared call is bounded by timeout seconds from its start, and is only
+    cancelled once every caller waiting for it has gone away.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._flights: Dict[str, _Flight] = {}
+        self.metrics = {"calls": 0, "coalesced": 0, "timeouts": 0, "errors": 0}
+
+    async def do(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Return the result of call(), sharing it with concurrent callers of key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            timeout = self.timeout if timeout is None else timeout
+            flight = _Flight(asyncio.ensure_future(self._run(key, call, timeout)))
+            self._flights[key] = flight
+            self.metrics["calls"] += 1
+        else:
+            self.metrics["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            # Shielded so one caller going away does not cancel the call for the others
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                self._release(key, flight.task)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _run(
+        self, key: str, call: Callable[[], Awaitable[Any]], timeout: Optional[float]
+    ) -> Any:
+        try:
+            if timeout:
+                return await asyncio.wait_for(call(), timeout)
+            return await call()
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            raise
+        except Exception:
+            self.metrics["errors"] += 1
+            raise
+        finally:
+            # Later callers start a fresh call, e.g. to retry after a failure
+            self._release(key, asyncio.current_task())
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return shared call counters and the number of keys in flight."""
+        total = self.metrics["calls"] + self.metrics["coalesced"]
+        return {
+            **self.metrics,
+            "in_flight": len(self._flights),
+            "coalesced_ratio": self.metrics["coalesced"] / total if total else 0.0,
+        }
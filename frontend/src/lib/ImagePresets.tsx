@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import { showToast } from "@/lib/ShowToast";
-import { ApiService, KeywordExtractionResponse } from "@/lib/api";
+import { ApiService } from "@/lib/api";
 
 export interface StyleSettings {
   id: string;
@@ -13,7 +13,17 @@ export interface StyleSettings {
 
 export const ImagePresets = () => {
   const [keyword, setKeyword] = useState("");
-  const [keywords, setKeywords] = useState<string[]>([]);
+  const [keywords, setKeywords] = useState<string[]>(() => {
+    const savedKeywords = localStorage.getItem("keywords");
+    if (savedKeywords) {
+      try {
+        return JSON.parse(savedKeywords);
+      } catch (e) {
+        console.error("Error parsing saved keywords:", e);
+      }
+    }
+    return [];
+  });
   const [stackLoRAs, setStackLoRAs] = useState(false);
 
   const [defaultSettings, setDefaultSettings] = useState(() => {
@@ -58,6 +68,10 @@ export const ImagePresets = () => {
     localStorage.setItem("styleSettings", JSON.stringify(styleSettings));
   }, [styleSettings]);
 
+  useEffect(() => {
+    localStorage.setItem("keywords", JSON.stringify(keywords));
+  }, [keywords]);
+
   const handleAddKeyword = (newKeyword: string) => {
     if (!newKeyword.trim()) return;
 
@@ -135,8 +149,8 @@ export const ImagePresets = () => {
   const handleKeywordImageUpload = async (file?: File, imageUrl?: string) => {
     try {
       setIsLoadingKeywords(true);
-      let response: KeywordExtractionResponse;
-      response = await ApiService.extractKeywords(
+      const response = await ApiService.analyzeImage(
+        "",
         file || null,
         imageUrl || null
       );
@@ -18,13 +18,20 @@ export const PromptGeneration = () => {
     }
     setIsGenerating(true);
     try {
-      const response = await ApiService.generatePrompt(
-        description,
-        imageFile,
-        imageUrl
-      );
-      //console.log(response);
-      setGeneratedPrompt(response.generated_prompt);
+      if (imageFile || imageUrl) {
+        // One vision call returns both the prompt and the image keywords
+        const response = await ApiService.analyzeImage(
+          description,
+          imageFile,
+          imageUrl
+        );
+        setGeneratedPrompt(response.generated_prompt);
+        // Picked up by the image generation tab, so the image is not sent again
+        localStorage.setItem("keywords", JSON.stringify(response.keywords));
+      } else {
+        const response = await ApiService.generatePrompt(description);
+        setGeneratedPrompt(response.generated_prompt);
+      }
       showToast("Your ad template prompt has been generated successfully.");
     } catch (error) {
       console.error("Error in handleGenerate:", error);
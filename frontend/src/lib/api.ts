@@ -20,7 +20,8 @@ export interface PromptGenerationResponse {
   generated_prompt: string;
 }
 
-export interface KeywordExtractionResponse {
+export interface ImageAnalysisResponse {
+  generated_prompt: string;
   keywords: string[];
 }
 
@@ -97,13 +98,15 @@ export class ApiService {
     }
   }
 
-  // Keyword Extraction
-  static async extractKeywords(
+  // Prompt Generation and Keyword Extraction from one image in a single request
+  static async analyzeImage(
+    description: string,
     image?: File | null,
     imageUrl?: string | null
-  ): Promise<KeywordExtractionResponse> {
+  ): Promise<ImageAnalysisResponse> {
     try {
       const formData = new FormData();
+      formData.append("description", description);
 
       if (image) {
         formData.append("image", image);
@@ -113,18 +116,18 @@ export class ApiService {
         throw new Error("No image provided");
       }
 
-      const response = await fetch(`${API_BASE_URL}/generate/keywords/`, {
+      const response = await fetch(`${API_BASE_URL}/generate/analyze/`, {
         method: "POST",
         body: formData,
       });
 
       if (!response.ok) {
-        throw new Error(`Failed to extract keywords: ${response.status}`);
+        throw new Error(`Failed to analyze image: ${response.status}`);
       }
 
       return await response.json();
     } catch (error) {
-      return handleApiError(error, "Failed to extract keywords");
+      return handleApiError(error, "Failed to analyze image");
     }
   }
 